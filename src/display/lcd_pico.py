@@ -258,6 +258,14 @@ class LcdApi:
         """Sleep for some time (given in microseconds)."""
         time.sleep_us(usecs)
 
+    def hal_flush(self):
+        """Send any writes the HAL is holding back.
+
+        It is expected that a derived HAL class that holds back writes
+        will implement this function.
+        """
+        pass
+
 
 """Implements a HD44780 character LCD connected via PCF8574 on I2C.
     The PCF8574 has a jumper selectable address: 0x20 - 0x27 """
@@ -275,68 +283,127 @@ SHIFT_DATA = 4
 class I2cLcd(LcdApi):
     """Implements a HD44780 character LCD connected via PCF8574 on I2C."""
 
-    def __init__(self, i2c, i2c_addr=DEFAULT_I2C_ADDR, num_lines=2, num_columns=16):
+    def __init__(self, i2c, i2c_addr=DEFAULT_I2C_ADDR, num_lines=2, num_columns=16, startup=None):
+        """Initializes the LCD. With a `Startup` the power up delays are
+        spent on other devices, and the LCD is ready after `startup.finish()`.
+        """
         self.i2c = i2c
         self.i2c_addr = i2c_addr
-        self.i2c.writeto(self.i2c_addr, bytearray([0]))
-        sleep(0.02)  # Allow LCD time to powerup
+        # A client of a bus arbiter queues the writes until they are flushed,
+        # and queues the delays between them as well
+        self._bus_flush = getattr(i2c, 'flush', None)
+        self._bus_delay = getattr(i2c, 'delay', None)
+        # Transfer buffer allocated once, so sending to the LCD doesn't allocate on the heap.
+        # A byte is sent as its two nibbles, each strobed on E, in a single 4-byte write.
+        self._buffer = bytearray(4)
+        view = memoryview(self._buffer)
+        self._buf1 = view[:1]
+        self._buf2 = view[:2]
+        self._buf4 = view[:4]
+        if startup is None:
+            for delay_us in self.init_steps(num_lines, num_columns):
+                self.hal_sleep_us(delay_us)
+        else:
+            startup.begin(self, 'LCD {:#x}'.format(i2c_addr), self.init_steps(num_lines, num_columns))
+
+    def init_steps(self, num_lines, num_columns):
+        """Initializes the LCD one step at a time. Yields the time in
+        microseconds the LCD needs before the next step.
+        """
+        self._buf1[0] = 0
+        self.i2c.writeto(self.i2c_addr, self._buf1)
+        self._send_queued()
+        yield 20000  # Allow LCD time to powerup
         # Send reset 3 times
         self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
-        sleep(0.005)  # need to delay at least 4.1 msec
+        yield 5000  # need to delay at least 4.1 msec
         self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
-        sleep(0.001)
+        yield 1000
         self.hal_write_init_nibble(self.LCD_FUNCTION_RESET)
-        sleep(0.001)
+        yield 1000
         # Put LCD into 4 bit mode
         self.hal_write_init_nibble(self.LCD_FUNCTION)
-        sleep(0.001)
+        yield 1000
         LcdApi.__init__(self, num_lines, num_columns)
         cmd = self.LCD_FUNCTION
         if num_lines > 1:
             cmd |= self.LCD_FUNCTION_2LINES
         self.hal_write_command(cmd)
+        self._send_queued()
 
     def hal_write_init_nibble(self, nibble):
         """Writes an initialization nibble to the LCD.
 
-        This particular function is only used during initialization.
+        This particular function is only used during initialization, and
+        every nibble is followed by a delay, so it is sent right away.
         """
         byte = ((nibble >> 4) & 0x0f) << SHIFT_DATA
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte]))
+        buf = self._buf2
+        buf[0] = byte | MASK_E
+        buf[1] = byte
+        self.i2c.writeto(self.i2c_addr, buf)
+        self._send_queued()
 
     def hal_backlight_on(self):
         """Allows the hal layer to turn the backlight on."""
-        self.i2c.writeto(self.i2c_addr, bytearray([1 << SHIFT_BACKLIGHT]))
+        self._buf1[0] = 1 << SHIFT_BACKLIGHT
+        self.i2c.writeto(self.i2c_addr, self._buf1)
 
     def hal_backlight_off(self):
         """Allows the hal layer to turn the backlight off."""
-        self.i2c.writeto(self.i2c_addr, bytearray([0]))
+        self._buf1[0] = 0
+        self.i2c.writeto(self.i2c_addr, self._buf1)
 
     def hal_write_command(self, cmd):
         """Writes a command to the LCD.
 
         Data is latched on the falling edge of E.
         """
-        byte = ((self.backlight << SHIFT_BACKLIGHT) | (((cmd >> 4) & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte]))
-        byte = ((self.backlight << SHIFT_BACKLIGHT) | ((cmd & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte]))
+        self.hal_write_byte(0, cmd)
         if cmd <= 3:
             # The home and clear commands require a worst case delay of 4.1 msec
-            sleep(0.005)
+            self.hal_sleep_us(5000)
 
     def hal_write_data(self, data):
         """Write data to the LCD."""
-        byte = (MASK_RS | (self.backlight << SHIFT_BACKLIGHT) | (((data >> 4) & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte]))
-        byte = (MASK_RS | (self.backlight << SHIFT_BACKLIGHT) | ((data & 0x0f) << SHIFT_DATA))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte | MASK_E]))
-        self.i2c.writeto(self.i2c_addr, bytearray([byte]))
+        self.hal_write_byte(MASK_RS, data)
+
+    def hal_write_byte(self, rs, value):
+        """Writes a byte to the LCD as two nibbles in a single transaction.
+
+        The PCF8574 outputs each byte of the write in turn, so E is pulsed
+        for each nibble without a transaction per edge.
+        """
+        byte = rs | (self.backlight << SHIFT_BACKLIGHT)
+        high = byte | (((value >> 4) & 0x0f) << SHIFT_DATA)
+        low = byte | ((value & 0x0f) << SHIFT_DATA)
+        buf = self._buf4
+        buf[0] = high | MASK_E
+        buf[1] = high
+        buf[2] = low | MASK_E
+        buf[3] = low
+        self.i2c.writeto(self.i2c_addr, buf)
+
+    def hal_flush(self):
+        """Starts sending the writes a bus arbiter client is queueing at the
+        end of a frame, as far as its budget allows. The rest is sent when
+        the bus is flushed from the main loop.
+        """
+        if self._bus_flush is not None:
+            self._bus_flush()
 
     def hal_sleep_us(self, usecs):
-        """Sleep for some time (given in microseconds)."""
-        sleep(float(usecs) / 1e6)
+        """Sleep for some time (given in microseconds). A bus arbiter client
+        queues the delay between the writes instead.
+        """
+        if self._bus_delay is not None:
+            self._bus_delay(usecs)
+        else:
+            sleep(float(usecs) / 1e6)
+
+    def _send_queued(self):
+        """Sends every write a bus arbiter client is queueing, so they reach
+        the LCD before the timed initialization delays.
+        """
+        if self._bus_flush is not None:
+            self._bus_flush(True)
@@ -1,8 +1,13 @@
+from typing import TYPE_CHECKING
+
 from machine import I2C
 import time
 from display.lcd_pico import I2cLcd
 from util import clamp, remap
 
+if TYPE_CHECKING:
+    from hardware.startup import Startup
+
 
 class LiquidGauge:
     ROWS = 2
@@ -89,11 +94,25 @@ class LiquidGauge:
         0b10000,
         0b10000]
 
-    def __init__(self, i2c: I2C, i2c_addr: int = 39):
-        self.lcd = I2cLcd(i2c=i2c, i2c_addr=i2c_addr, num_lines=self.ROWS, num_columns=self.COLS)
-        time.sleep_ms(100)
-        self.__custom_characters()
+    def __init__(self, i2c: I2C, i2c_addr: int = 39, startup: 'Startup' = None):
+        """
+        :param i2c: I2C bus the LCD backpack is connected to
+        :param i2c_addr: Address of the LCD backpack
+        :param startup: Initialize the LCD alongside the other devices of a `Startup`, the gauge is ready once the
+            startup finishes
+        """
+        self.lcd = I2cLcd(i2c=i2c, i2c_addr=i2c_addr, num_lines=self.ROWS, num_columns=self.COLS, startup=startup)
         self.position = 0
+        if startup is None:
+            for delay_us in self.__setup_steps():
+                time.sleep_us(delay_us)
+        else:
+            startup.then(self.lcd, self.__setup_steps())
+
+    def __setup_steps(self):
+        yield 100000
+        self.__custom_characters()
+        self.lcd.hal_flush()
 
     def __custom_characters(self):
         """ Set the custom characters used for the LCD to display stability. """
@@ -152,3 +171,4 @@ class LiquidGauge:
 
         self.lcd.putstr(top)
         self.lcd.putstr(bottom)
+        self.lcd.hal_flush()
@@ -1,8 +1,13 @@
+from typing import TYPE_CHECKING
+
 import machine
 import time
 from display.lcd_pico import I2cLcd
 from util import clamp, remap
 
+if TYPE_CHECKING:
+    from hardware.startup import Startup
+
 
 class Stability:
     """
@@ -95,11 +100,25 @@ class Stability:
         0b10000,
         0b10000]
 
-    def __init__(self, i2c: machine.I2C, i2c_addr: int):
-        self.lcd = I2cLcd(i2c=i2c, i2c_addr=i2c_addr, num_lines=self.ROWS, num_columns=self.COLS)
-        time.sleep_ms(100)
-        self.__custom_characters()
+    def __init__(self, i2c: machine.I2C, i2c_addr: int, startup: 'Startup' = None):
+        """
+        :param i2c: I2C bus the LCD backpack is connected to
+        :param i2c_addr: Address of the LCD backpack
+        :param startup: Initialize the LCD alongside the other devices of a `Startup`, the display is ready once the
+            startup finishes
+        """
+        self.lcd = I2cLcd(i2c=i2c, i2c_addr=i2c_addr, num_lines=self.ROWS, num_columns=self.COLS, startup=startup)
         self._position = 0
+        if startup is None:
+            for delay_us in self.__setup_steps():
+                time.sleep_us(delay_us)
+        else:
+            startup.then(self.lcd, self.__setup_steps())
+
+    def __setup_steps(self):
+        yield 100000
+        self.__custom_characters()
+        self.lcd.hal_flush()
 
     def __custom_characters(self):
         """ Set the custom characters used for the LCD to display stability. """
@@ -162,7 +181,9 @@ class Stability:
 
         self.lcd.putstr(top)
         self.lcd.putstr(bottom)
+        self.lcd.hal_flush()
 
     def debug(self):
         self.lcd.clear()
         self.lcd.putstr(f'Stability {self.position}\n')
+        self.lcd.hal_flush()
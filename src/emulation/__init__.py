@@ -0,0 +1,28 @@
+"""
+Host emulation of the shuttle control module hardware. Installing the emulation lets the modules that import the
+MicroPython `machine` module and the MicroPython `time` functions run on a desktop Python interpreter.
+
+... code-block:: python
+
+    import emulation
+    emulation.install()
+
+    from hardware.pin_manager import PinManager
+"""
+import sys
+import time
+
+from . import clock, machine
+
+
+def install() -> None:
+    """
+    Register the emulated modules in place of the MicroPython modules. This needs to run before importing any module
+    that uses the hardware.
+    """
+    sys.modules['machine'] = machine
+
+    # The MicroPython additions to the time module and `time.sleep` run on the virtual clock, so waiting on the
+    # hardware takes no host time. Modules that import `sleep` by name have to be imported after this.
+    for name in ('ticks_us', 'ticks_ms', 'ticks_add', 'ticks_diff', 'sleep_us', 'sleep_ms', 'sleep'):
+        setattr(time, name, getattr(clock, name))
@@ -0,0 +1,77 @@
+"""
+Scripted analog signals for the emulated ADC channels and analog multiplexer channels. A script is a list of
+`(time_ms, value)` points on the virtual clock that the signal steps or ramps between.
+"""
+import random
+from typing import Sequence, Tuple
+
+from . import clock
+
+
+class AdcScript:
+    """
+    Analog signal that follows a script on the virtual clock. It is called for every reading, so it can be used as the
+    source of an ADC channel or as the value of a multiplexer channel.
+
+    ... code-block:: python
+
+        # Throttle pushed from idle to full over half a second, with some ADC noise
+        throttle = AdcScript([(0, 0), (100, 0), (600, 65535)], ramp=True, noise=200)
+        machine.set_adc_source(1, throttle)
+        mux.channels[4] = throttle
+    """
+
+    def __init__(self, points: Sequence[Tuple[int, int]], ramp: bool = False, repeat: bool = False, noise: int = 0,
+                 seed: int = 0):
+        """
+        :param points: `(time_ms, value)` points in time order. Before the first point the signal has the value of
+            the first point and after the last point it holds the value of the last point.
+        :param ramp: Ramp linearly from one point to the next, otherwise the signal steps at each point
+        :param repeat: Start the script over after the last point
+        :param noise: Largest random offset added to each reading
+        :param seed: Seed of the noise, the same seed gives the same readings on every run
+        """
+        if not points:
+            raise ValueError('An ADC script needs at least one point')
+
+        self.points = [(int(time_ms * 1000), value) for time_ms, value in points]
+        self.ramp = ramp
+        self.repeat = repeat
+        self.noise = noise
+        self.reads = 0
+
+        self._random = random.Random(seed)
+        self._start_us = clock.ticks_us()
+
+    def restart(self) -> None:
+        """ Start the script from its first point at the current time. """
+        self._start_us = clock.ticks_us()
+
+    def value_at(self, elapsed_us: int) -> int:
+        """
+        :param elapsed_us: Time since the start of the script
+        :return: The value of the signal without noise
+        """
+        points = self.points
+        if self.repeat and points[-1][0] > 0:
+            elapsed_us %= points[-1][0]
+
+        if elapsed_us < points[0][0]:
+            return points[0][1]
+
+        for index in range(len(points) - 1):
+            start, value = points[index]
+            end, next_value = points[index + 1]
+            if elapsed_us < end:
+                if not self.ramp or end == start:
+                    return value
+                return value + (next_value - value) * (elapsed_us - start) // (end - start)
+
+        return points[-1][1]
+
+    def __call__(self) -> int:
+        self.reads += 1
+        value = self.value_at(clock.ticks_diff(clock.ticks_us(), self._start_us))
+        if self.noise:
+            value += self._random.randint(-self.noise, self.noise)
+        return min(max(value, 0), 0xFFFF)
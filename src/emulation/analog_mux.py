@@ -0,0 +1,58 @@
+"""
+Model of a 16 channel analog multiplexer, like the CD74HC4067, in front of an emulated ADC channel.
+"""
+from typing import Callable, List, Sequence, Union
+
+from . import clock, machine
+
+
+class AnalogMuxModel:
+    """
+    Emulated analog multiplexer. The select lines are followed as the microcontroller drives them and the output takes
+    `settle_us` to settle after a channel change. Until then it still reads the channel that was selected before.
+
+    ... code-block:: python
+
+        mux = AnalogMuxModel(adc_channel=0, select_pins=(10, 11, 12, 13), settle_us=20)
+        mux.channels[3] = 32768
+        mux.channels[4] = AdcScript([(0, 0), (500, 65535)], ramp=True)
+    """
+
+    def __init__(self, adc_channel: int, select_pins: Sequence[int], settle_us: int = 0):
+        """
+        :param adc_channel: ADC channel that the common pin is connected to
+        :param select_pins: Pins connected to the select lines S0 -> S3
+        :param settle_us: Time the output takes to settle after changing channels
+        """
+        self.channels: List[Union[int, Callable[[], int]]] = [0] * 16
+        self.settle_us = settle_us
+        self.select_changes = 0
+
+        self._select_pins = tuple(select_pins)
+        self._selected = self._read_select()
+        self._previous = self._selected
+        self._changed_at = clock.ticks_us()
+
+        for pin_id in self._select_pins:
+            machine.watch_pin(pin_id, self._on_select)
+        machine.set_adc_source(adc_channel, self)
+
+    def __call__(self) -> int:
+        if clock.ticks_diff(clock.ticks_us(), self._changed_at) < self.settle_us:
+            value = self.channels[self._previous]
+        else:
+            value = self.channels[self._selected]
+        # Channels can hold a signal source like an `AdcScript` instead of a fixed value
+        return value() if callable(value) else value
+
+    def _read_select(self) -> int:
+        selected = 0
+        for line, pin_id in enumerate(self._select_pins):
+            selected |= machine.Pin(pin_id).value() << line
+        return selected
+
+    def _on_select(self, level: int) -> None:
+        self.select_changes += 1
+        self._previous = self._selected
+        self._selected = self._read_select()
+        self._changed_at = clock.ticks_us()
@@ -0,0 +1,134 @@
+"""
+The whole shuttle control module wired up for host emulation: the three I/O expanders and the LCD backpack on I2C 0, and
+the local pins and ADC channels of the Pico. With the board in place `SpaceTeam` and the panels run unmodified.
+
+... code-block:: python
+
+    import emulation
+    emulation.install()
+
+    from emulation.board import ShuttleBoard
+    from spaceteam import SpaceTeam
+
+    board = ShuttleBoard()
+    space_team = SpaceTeam()
+    board.set_input(28, 0)
+    space_team.pin_manager.sample_timer.fire()
+"""
+from typing import Callable, Dict, Sequence, Tuple, Union
+
+from . import machine
+from .mcp23017 import Mcp23017Model
+from .pcf8574 import Pcf8574LcdModel
+
+
+class ShuttleBoard:
+    """
+    Emulated shuttle control module. Inputs are driven by gpio number, the same numbering as the `PinManager`, and the
+    bus traffic to every device is counted.
+    """
+
+    PIN_COUNT = 64
+
+    I2C_BUS = 0
+    SECOND_I2C_BUS = 1
+    EXPANDERS = ((0x20, 1), (0x21, 17), (0x22, 49))
+    """Address of each expander and the first gpio on it."""
+
+    LCD_ADDRESS = 0x27
+
+    ADC_GPIOS = {47: 1, 48: 2}
+    """ADC channel of the local analog gpio."""
+
+    def __init__(self, reset: bool = True, second_bus: Sequence[int] = ()):
+        """
+        :param reset: Start from an empty board and the virtual clock at 0
+        :param second_bus: Addresses of the devices wired to the second I2C controller instead of the first
+        """
+        if reset:
+            machine.reset()
+
+        self.second_bus = tuple(second_bus)
+        self.expanders = [Mcp23017Model(bus=self.bus_of(address), address=address)
+                          for address, _ in ShuttleBoard.EXPANDERS]
+        self.lcd = Pcf8574LcdModel(bus=self.bus_of(ShuttleBoard.LCD_ADDRESS), address=ShuttleBoard.LCD_ADDRESS)
+
+    def bus_of(self, address: int) -> int:
+        """
+        :return: Id of the I2C bus the device at the address is wired to
+        """
+        return ShuttleBoard.SECOND_I2C_BUS if address in self.second_bus else ShuttleBoard.I2C_BUS
+
+    def device_map(self, i2c0, i2c1) -> Dict[int, Tuple[object, int]]:
+        """
+        :param i2c0: The first I2C bus
+        :param i2c1: The second I2C bus
+        :return: The `(i2c, address)` of each expander by its first gpio, for the `devices` of the `PinManager`
+        """
+        buses = {ShuttleBoard.I2C_BUS: i2c0, ShuttleBoard.SECOND_I2C_BUS: i2c1}
+        return {first_gpio: (buses[self.bus_of(address)], address) for address, first_gpio in ShuttleBoard.EXPANDERS}
+
+    def set_input(self, gpio: int, level: int) -> None:
+        """
+        Drive a digital input from outside the module.
+
+        :param gpio: The gpio 1 -> 46 or 49 -> 64
+        :param level: 0 (Low), 1 (High), or None to leave an expander pin floating
+        """
+        for (_, first_gpio), expander in zip(ShuttleBoard.EXPANDERS, self.expanders):
+            if first_gpio <= gpio < first_gpio + 16:
+                expander.set_input(gpio - first_gpio, level)
+                return
+
+        pin = ShuttleBoard.local_pin(gpio)
+        if pin is None:
+            raise ValueError(f'gpio {gpio} is not a digital pin')
+        machine.set_pin_level(pin, level)
+
+    def set_analog(self, gpio: int, value: Union[int, Callable[[], int]]) -> None:
+        """
+        Set the reading of a local analog input.
+
+        :param gpio: The gpio 47 or 48
+        :param value: Unsigned 16-bit reading, or a source called for every reading like an `AdcScript`
+        """
+        channel = ShuttleBoard.ADC_GPIOS.get(gpio)
+        if channel is None:
+            raise ValueError(f'gpio {gpio} is not a local analog pin')
+        if callable(value):
+            machine.set_adc_source(channel, value)
+        else:
+            machine.set_adc_value(channel, value)
+
+    @staticmethod
+    def local_pin(gpio: int):
+        """
+        :return: The Pico pin of a local digital gpio, or None when the gpio isn't a local digital pin
+        """
+        if 33 <= gpio <= 42:
+            return gpio - 27
+        if 43 <= gpio <= 46:
+            return 64 - gpio
+        return None
+
+    def traffic(self) -> Dict[int, Tuple[int, int]]:
+        """
+        :return: `(transactions, bytes)` made to each address on both buses since the board was reset
+        """
+        traffic = {}
+        for bus in (ShuttleBoard.I2C_BUS, ShuttleBoard.SECOND_I2C_BUS):
+            for address in machine.I2C(bus).scan():
+                traffic[address] = machine.i2c_traffic(bus, address)
+        return traffic
+
+    def report(self) -> str:
+        """
+        :return: The bus traffic of each device and the total of each bus in use, one line each
+        """
+        lines = [f'0x{address:02x}: {transactions} transactions, {byte_count} bytes'
+                 for address, (transactions, byte_count) in self.traffic().items()]
+        for bus in (ShuttleBoard.I2C_BUS, ShuttleBoard.SECOND_I2C_BUS):
+            if bus == ShuttleBoard.I2C_BUS or self.second_bus:
+                transactions, byte_count = machine.i2c_traffic(bus)
+                lines.append(f'I2C {bus}: {transactions} transactions, {byte_count} bytes')
+        return '\n'.join(lines)
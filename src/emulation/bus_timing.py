@@ -0,0 +1,173 @@
+"""
+Model of the time that I2C transactions take on the wire, for estimating the bus time of the host emulation at the
+clock frequency the bus was created with.
+
+Every byte on the wire is 8 data bits and an ACK bit. A transaction is a start condition, the address byte, the register
+byte and data bytes written, and a stop condition. Reading a register adds a repeated start and a second address byte
+before the data bytes that are read. Start, repeated start, and stop conditions are each charged one bit time.
+
+The time is charged to the subsystem that made the transaction, found from the call stack of the transaction, so the
+modules running on the emulation don't need to know about the model.
+
+... code-block:: python
+
+    timing = BusTiming()
+    machine.set_bus_timing(timing)
+
+    for _ in range(100):
+        pin_manager.sample_timer.fire()
+    print(timing.report(ticks=100))
+"""
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from . import clock
+
+
+class BusTiming:
+    START_BITS = 1
+    STOP_BITS = 1
+    BYTE_BITS = 9  # 8 data bits and the ACK bit
+
+    OTHER = 'Other'
+
+    SUBSYSTEMS: Tuple[Tuple[str, str, Optional[str]], ...] = (
+        ('MCP23017.init', 'hardware.mcp23017', 'init'),
+        ('I2cLcd rendering', 'display.lcd_pico', None),
+        ('I2cLcd rendering', 'hardware.i2c_arbiter', '_send_next'),
+        ('PinManager sampling', 'hardware.pin_manager', '_sample_pins'),
+        ('PinManager sampling', 'hardware.pin_manager', '_core1_sample'),
+        ('PinManager', 'hardware.pin_manager', None),
+    )
+    """
+    `(subsystem, module, function)` rules in the order they are tried. A transaction is charged to the first rule that
+    matches a function on its call stack, or any function of the module when the function is None.
+    """
+
+    _STACK_DEPTH = 32
+
+    def __init__(self, advance_clock: bool = False):
+        """
+        :param advance_clock: Move the virtual clock forward by the time of each transaction, so the time the modules
+            measure includes the time spent on the bus
+        """
+        self.advance_clock = advance_clock
+
+        # Subsystem -> [transactions, bytes, bits, time in us]
+        self.occupancy: Dict[str, List[float]] = {}
+        # Bus id -> time in us, the buses are occupied independently of each other
+        self.buses: Dict[int, float] = {}
+        self._forced: List[str] = []
+
+    def subsystem(self, name: str) -> '_Subsystem':
+        """
+        Charge every transaction made inside the `with` block to a subsystem, whatever the call stack is.
+
+        ... code-block:: python
+
+            with timing.subsystem('Startup'):
+                space_team = SpaceTeam()
+
+        :param name: Name of the subsystem
+        """
+        return _Subsystem(self, name)
+
+    def reset(self) -> None:
+        self.occupancy.clear()
+        self.buses.clear()
+
+    @staticmethod
+    def transaction_bits(write_bytes: int, read_bytes: int = 0, register: bool = False) -> int:
+        """
+        :param write_bytes: Bytes written after the address byte, including the register byte
+        :param read_bytes: Bytes read after the address byte
+        :param register: The transaction writes the register and then reads from it after a repeated start
+        :return: Number of bit times the transaction takes on the wire
+        """
+        byte_count = 1 + write_bytes + read_bytes
+        bits = BusTiming.START_BITS + BusTiming.STOP_BITS
+        if register and read_bytes:
+            byte_count += 1
+            bits += BusTiming.START_BITS
+        return bits + byte_count * BusTiming.BYTE_BITS
+
+    def charge(self, freq: int, write_bytes: int, read_bytes: int = 0, register: bool = False, bus: int = 0) -> float:
+        """
+        Charge one transaction to the subsystem that made it.
+
+        :param freq: Clock frequency of the bus in Hz
+        :param write_bytes: Bytes written after the address byte, including the register byte
+        :param read_bytes: Bytes read after the address byte
+        :param register: The transaction writes the register and then reads from it after a repeated start
+        :param bus: Id of the bus the transaction was made on
+        :return: Time of the transaction in us
+        """
+        bits = BusTiming.transaction_bits(write_bytes, read_bytes, register)
+        duration = bits * 1000000 / freq
+
+        name = self._forced[-1] if self._forced else self._classify()
+        entry = self.occupancy.get(name)
+        if entry is None:
+            entry = self.occupancy[name] = [0, 0, 0, 0.0]
+        entry[0] += 1
+        entry[1] += 1 + write_bytes + read_bytes
+        entry[2] += bits
+        entry[3] += duration
+        self.buses[bus] = self.buses.get(bus, 0.0) + duration
+
+        if self.advance_clock:
+            clock.advance_us(round(duration))
+        return duration
+
+    def bus_us(self, subsystem: str = None, bus: int = None) -> float:
+        """
+        :param subsystem: Name of the subsystem, or None for every subsystem
+        :param bus: Id of the bus, or None for every bus. Only used without a subsystem.
+        :return: Time in us the bus was occupied
+        """
+        if bus is not None:
+            return self.buses.get(bus, 0.0)
+        if subsystem is not None:
+            entry = self.occupancy.get(subsystem)
+            return entry[3] if entry else 0.0
+        return sum(entry[3] for entry in self.occupancy.values())
+
+    def report(self, ticks: int = None) -> str:
+        """
+        :param ticks: Number of sampling ticks that were run, to also report the bus time per tick
+        :return: The bus occupancy of each subsystem, one line each
+        """
+        lines = []
+        for name, (transactions, byte_count, bits, duration) in sorted(self.occupancy.items()):
+            line = f'{name}: {transactions} transactions, {byte_count} bytes, {duration / 1000:.3f} ms of bus'
+            if ticks:
+                line += f', {duration / 1000 / ticks:.3f} ms of bus per tick'
+            lines.append(line)
+        return '\n'.join(lines)
+
+    def _classify(self) -> str:
+        frames = []
+        frame = sys._getframe(2)
+        while frame is not None and len(frames) < BusTiming._STACK_DEPTH:
+            frames.append((frame.f_globals.get('__name__'), frame.f_code.co_name))
+            frame = frame.f_back
+
+        for name, module, function in BusTiming.SUBSYSTEMS:
+            for frame_module, frame_function in frames:
+                if frame_module == module and function in (None, frame_function):
+                    return name
+        return BusTiming.OTHER
+
+
+class _Subsystem:
+    def __init__(self, timing: BusTiming, name: str):
+        self._timing = timing
+        self._name = name
+
+    def __enter__(self):
+        self._timing._forced.append(self._name)
+        return self._timing
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._timing._forced.pop()
+        return False
@@ -0,0 +1,74 @@
+"""
+Virtual clock for host emulation. Provides the MicroPython `time.ticks_*` and `time.sleep_*` functions on top of a clock
+that only moves when it is advanced, so timings measured by the modules are the same on every run.
+"""
+import time as _host_time
+
+# The host sleep is kept before `install` replaces `time.sleep` with the virtual one
+host_sleep = _host_time.sleep
+
+_now_us = 0
+
+_TICKS_PERIOD = 1 << 30
+_TICKS_HALF_PERIOD = _TICKS_PERIOD // 2
+
+
+def advance_us(us: int) -> None:
+    """
+    Move the virtual clock forward.
+
+    :param us: Number of microseconds that elapsed
+    """
+    global _now_us
+    _now_us += max(0, int(us))
+
+
+def advance_ms(ms: int) -> None:
+    """
+    Move the virtual clock forward.
+
+    :param ms: Number of milliseconds that elapsed
+    """
+    advance_us(ms * 1000)
+
+
+def reset() -> None:
+    """ Set the virtual clock back to 0. """
+    global _now_us
+    _now_us = 0
+
+
+def ticks_us() -> int:
+    return _now_us % _TICKS_PERIOD
+
+
+def ticks_ms() -> int:
+    return (_now_us // 1000) % _TICKS_PERIOD
+
+
+def ticks_add(ticks: int, delta: int) -> int:
+    return (ticks + delta) % _TICKS_PERIOD
+
+
+def ticks_diff(ticks1: int, ticks2: int) -> int:
+    return ((ticks1 - ticks2 + _TICKS_HALF_PERIOD) % _TICKS_PERIOD) - _TICKS_HALF_PERIOD
+
+
+def sleep_us(us: int) -> None:
+    advance_us(us)
+    _yield()
+
+
+def sleep_ms(ms: int) -> None:
+    advance_ms(ms)
+    _yield()
+
+
+def sleep(seconds: float) -> None:
+    advance_us(round(seconds * 1000000))
+    _yield()
+
+
+def _yield() -> None:
+    # Sleeping lets the other emulated core run, the same way it would keep running on the Pico
+    host_sleep(0)
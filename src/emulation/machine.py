@@ -0,0 +1,353 @@
+"""
+Host emulation of the parts of the MicroPython `machine` module used by the shuttle control module.
+
+Pins are identified by their number and share one level per number, so every `Pin` object created for the same number
+sees the same state. Devices are attached to an I2C bus id and can be reached from any `I2C` object created for that id.
+The traffic to every device is counted per bus and address, whichever `I2C` object it was made through.
+"""
+from typing import Callable, Dict, List, Tuple, Union
+
+from . import clock
+
+# ---- Board State -----------------------------------------------------------------------------------------------------
+
+_pin_levels: Dict[int, int] = {}
+_pin_irqs: Dict[int, Tuple[Callable, int]] = {}
+_pin_watchers: Dict[int, List[Callable[[int], None]]] = {}
+_adc_values: Dict[int, Union[int, Callable[[], int]]] = {}
+_i2c_devices: Dict[int, Dict[int, object]] = {}
+_i2c_traffic: Dict[Tuple[int, int], List[int]] = {}  # (bus, address) -> [transactions, bytes]
+_bus_timing = None
+
+# Pin interrupts raised while another handler is running are queued, the same way soft interrupts are scheduled on the
+# Pico, instead of being run re-entrantly.
+_pending_irqs: List[Tuple[Callable, 'Pin']] = []
+_dispatching = False
+
+
+def set_pin_level(pin_id: int, level: int) -> None:
+    """
+    Drive the level of a pin from outside the microcontroller and run its interrupt handler on a matching edge.
+
+    :param pin_id: The pin number
+    :param level: 0 (Low) or 1 (High)
+    """
+    global _dispatching
+
+    level = 1 if level else 0
+    previous = _pin_levels.get(pin_id, 0)
+    _pin_levels[pin_id] = level
+    if level == previous:
+        return
+
+    for watcher in _pin_watchers.get(pin_id, ()):
+        watcher(level)
+
+    if pin_id not in _pin_irqs:
+        return
+
+    handler, trigger = _pin_irqs[pin_id]
+    edge = Pin.IRQ_RISING if level else Pin.IRQ_FALLING
+    if not trigger & edge:
+        return
+
+    _pending_irqs.append((handler, Pin(pin_id)))
+    if _dispatching:
+        return
+
+    _dispatching = True
+    try:
+        while _pending_irqs:
+            handler, pin = _pending_irqs.pop(0)
+            handler(pin)
+    finally:
+        _dispatching = False
+
+
+def watch_pin(pin_id: int, watcher: Callable[[int], None]) -> None:
+    """
+    Let a device model follow a pin that the microcontroller drives. The watcher is called with the new level every
+    time the level of the pin changes.
+
+    :param pin_id: The pin number
+    :param watcher: Function called with the new level
+    """
+    _pin_watchers.setdefault(pin_id, []).append(watcher)
+
+
+def set_adc_value(channel: int, value: int) -> None:
+    """
+    Set the value that the ADC channel reads.
+
+    :param channel: The ADC channel
+    :param value: Unsigned 16-bit reading
+    """
+    _adc_values[channel] = value & 0xFFFF
+
+
+def set_adc_source(channel: int, source: Callable[[], int]) -> None:
+    """
+    Set a function that gives the reading of the ADC channel. The function is called for every read, so it can replay
+    a signal with noise.
+
+    :param channel: The ADC channel
+    :param source: Function returning an unsigned 16-bit reading
+    """
+    _adc_values[channel] = source
+
+
+def attach_i2c_device(bus: int, address: int, device) -> None:
+    """
+    Attach a device model to an I2C bus. The device needs a `write(data)` method that receives every byte written to it
+    in one transaction and a `read(count)` method that returns the bytes read from it.
+
+    :param bus: The I2C bus id
+    :param address: The 7-bit address of the device
+    :param device: The device model
+    """
+    _i2c_devices.setdefault(bus, {})[address] = device
+
+
+def i2c_traffic(bus: int, address: int = None) -> Tuple[int, int]:
+    """
+    Get the traffic on an I2C bus since the board was reset. A byte is counted for the address of every transaction,
+    plus the register address and the data bytes.
+
+    :param bus: The I2C bus id
+    :param address: Only count the traffic to this device, or None for every device on the bus
+    :return: `(transactions, bytes)`
+    """
+    transactions = 0
+    byte_count = 0
+    for (traffic_bus, traffic_address), (count, size) in _i2c_traffic.items():
+        if traffic_bus == bus and address in (None, traffic_address):
+            transactions += count
+            byte_count += size
+    return transactions, byte_count
+
+
+def set_bus_timing(timing) -> None:
+    """
+    Charge the wire time of every I2C transaction to a timing model.
+
+    :param timing: A `BusTiming`, or None to stop timing the transactions
+    """
+    global _bus_timing
+    _bus_timing = timing
+
+
+def reset_i2c_traffic() -> None:
+    """ Set the traffic counters of every I2C bus back to 0. """
+    _i2c_traffic.clear()
+
+
+def reset() -> None:
+    """
+    Remove all the pin levels, interrupts, ADC values, I2C devices, and the bus timing model from the board and reset
+    the clock.
+    """
+    global _bus_timing
+    _pin_levels.clear()
+    _pin_irqs.clear()
+    _pin_watchers.clear()
+    _adc_values.clear()
+    _i2c_devices.clear()
+    _i2c_traffic.clear()
+    _pending_irqs.clear()
+    mem32.clear()
+    _bus_timing = None
+    clock.reset()
+
+
+# ---- Peripherals -----------------------------------------------------------------------------------------------------
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id: int, mode: int = -1, pull: int = -1, value: int = None):
+        self.id = id
+        self._mode = Pin.IN
+        if id not in _pin_levels:
+            _pin_levels[id] = 1 if pull == Pin.PULL_UP else 0
+        self.init(mode, pull, value)
+
+    def init(self, mode: int = -1, pull: int = -1, value: int = None) -> None:
+        if mode != -1:
+            self._mode = mode
+        if value is not None:
+            self.value(value)
+
+    def mode(self, mode: int = None):
+        if mode is None:
+            return self._mode
+        self._mode = mode
+
+    def value(self, val: int = None):
+        if val is None:
+            return _pin_levels.get(self.id, 0)
+        set_pin_level(self.id, val)
+
+    def on(self) -> None:
+        self.value(1)
+
+    def off(self) -> None:
+        self.value(0)
+
+    def high(self) -> None:
+        self.value(1)
+
+    def low(self) -> None:
+        self.value(0)
+
+    def __call__(self, val: int = None):
+        return self.value(val)
+
+    def irq(self, handler: Callable = None, trigger: int = IRQ_FALLING | IRQ_RISING, hard: bool = False) -> None:
+        if handler is None:
+            _pin_irqs.pop(self.id, None)
+        else:
+            _pin_irqs[self.id] = handler, trigger
+
+
+class ADC:
+    def __init__(self, channel):
+        self.channel = channel.id if isinstance(channel, Pin) else channel
+
+    def read_u16(self) -> int:
+        value = _adc_values.get(self.channel, 0)
+        if callable(value):
+            value = value()
+        return int(value) & 0xFFFF
+
+
+class Timer:
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id: int = -1, mode: int = PERIODIC, period: int = -1, callback: Callable = None):
+        self.init(mode=mode, period=period, callback=callback)
+
+    def init(self, mode: int = PERIODIC, period: int = -1, callback: Callable = None) -> None:
+        self.mode = mode
+        self.period = period
+        self.callback = callback
+
+    def deinit(self) -> None:
+        self.callback = None
+
+    def fire(self) -> None:
+        """ Advance the virtual clock by the timer period and run the timer callback. """
+        if self.period > 0:
+            clock.advance_ms(self.period)
+        if self.callback is not None:
+            self.callback(self)
+
+
+class I2C:
+    """
+    I2C controller. Every transaction made through this object is counted in `transactions` along with the number of
+    data bytes moved in `bytes_transferred`.
+    """
+
+    def __init__(self, id: int, scl: Pin = None, sda: Pin = None, freq: int = 400000):
+        self.id = id
+        self.freq = freq
+        self.transactions = 0
+        self.bytes_transferred = 0
+
+    def _device(self, address: int, data_bytes: int, read_bytes: int = 0, register: bool = False):
+        self.transactions += 1
+        self.bytes_transferred += data_bytes
+        if _bus_timing is not None:
+            _bus_timing.charge(self.freq, data_bytes - read_bytes, read_bytes, register, bus=self.id)
+
+        traffic = _i2c_traffic.get((self.id, address))
+        if traffic is None:
+            traffic = _i2c_traffic[(self.id, address)] = [0, 0]
+        traffic[0] += 1
+        traffic[1] += 1 + data_bytes
+
+        device = _i2c_devices.get(self.id, {}).get(address)
+        if device is None:
+            raise OSError(5)  # EIO, no acknowledge from the address
+        return device
+
+    def reset_counters(self) -> None:
+        self.transactions = 0
+        self.bytes_transferred = 0
+
+    def scan(self) -> List[int]:
+        return sorted(_i2c_devices.get(self.id, {}))
+
+    def writeto(self, address: int, buf, stop: bool = True) -> int:
+        self._device(address, len(buf)).write(bytes(buf))
+        return 1
+
+    def readfrom(self, address: int, nbytes: int, stop: bool = True) -> bytes:
+        return bytes(self._device(address, nbytes, nbytes).read(nbytes))
+
+    def writeto_mem(self, address: int, memaddr: int, buf, addrsize: int = 8) -> None:
+        self._device(address, 1 + len(buf)).write(bytes([memaddr]) + bytes(buf))
+
+    def readfrom_mem(self, address: int, memaddr: int, nbytes: int, addrsize: int = 8) -> bytes:
+        device = self._device(address, 1 + nbytes, nbytes, register=True)
+        device.write(bytes([memaddr]))
+        return bytes(device.read(nbytes))
+
+    def readfrom_into(self, address: int, buf, stop: bool = True) -> None:
+        buf[:] = self._device(address, len(buf), len(buf)).read(len(buf))
+
+    def readfrom_mem_into(self, address: int, memaddr: int, buf, addrsize: int = 8) -> None:
+        device = self._device(address, 1 + len(buf), len(buf), register=True)
+        device.write(bytes([memaddr]))
+        buf[:] = device.read(len(buf))
+
+
+# ---- Memory ----------------------------------------------------------------------------------------------------------
+
+class _Mem32:
+    """
+    The 32-bit peripheral registers behind `machine.mem32`. Registers read back what was last written to them, and
+    the RP2040 atomic register aliases are applied to the register they alias: writing to `address + 0x1000` XORs the
+    bits into the register, `+ 0x2000` sets them, and `+ 0x3000` clears them.
+    """
+
+    _ALIAS_MASK = 0x3000
+    _XOR = 0x1000
+    _SET = 0x2000
+    _CLEAR = 0x3000
+
+    def __init__(self):
+        self.registers: Dict[int, int] = {}
+        self.writes = 0
+
+    def __getitem__(self, address: int) -> int:
+        return self.registers.get(address & ~_Mem32._ALIAS_MASK, 0)
+
+    def __setitem__(self, address: int, value: int) -> None:
+        self.writes += 1
+        alias = address & _Mem32._ALIAS_MASK
+        address &= ~_Mem32._ALIAS_MASK
+        current = self.registers.get(address, 0)
+        if alias == _Mem32._XOR:
+            value ^= current
+        elif alias == _Mem32._SET:
+            value |= current
+        elif alias == _Mem32._CLEAR:
+            value = current & ~value
+        self.registers[address] = value & 0xFFFFFFFF
+
+    def clear(self) -> None:
+        self.registers.clear()
+        self.writes = 0
+
+
+mem32 = _Mem32()
@@ -0,0 +1,220 @@
+"""
+Register level model of the MCP23017 16-bit I/O expander for host emulation.
+
+The model keeps the eleven registers of each port, follows the IOCON.BANK register layout and the IOCON.SEQOP address
+pointer, and raises the INTA/INTB outputs on interrupt-on-change the same way as the chip.
+"""
+from typing import List
+
+from . import machine
+
+# register indices in bank=1 mode, the same numbering as the driver
+IODIR = 0x00
+IPOL = 0x01
+GPINTEN = 0x02
+DEFVAL = 0x03
+INTCON = 0x04
+IOCON = 0x05
+GPPU = 0x06
+INTF = 0x07
+INTCAP = 0x08
+GPIO = 0x09
+OLAT = 0x0a
+
+_REGISTER_COUNT = 11
+
+IOCON_INTPOL = 2
+IOCON_ODR = 4
+IOCON_SEQOP = 32
+IOCON_MIRROR = 64
+IOCON_BANK = 128
+
+
+class Mcp23017Model:
+    """
+    Emulated MCP23017 attached to an emulated I2C bus. Inputs are driven with `set_input` and the interrupt outputs are
+    wired to emulated Pico pins with `connect_interrupt`.
+
+    ... code-block:: python
+
+        expander = Mcp23017Model(bus=0, address=0x20)
+        expander.connect_interrupt(int_a=2)
+        expander.set_input(3, 0)
+    """
+
+    def __init__(self, bus: int = 0, address: int = 0x20):
+        self.address = address
+        self.registers: List[List[int]] = [[0] * _REGISTER_COUNT, [0] * _REGISTER_COUNT]
+        self.registers[0][IODIR] = 0xFF
+        self.registers[1][IODIR] = 0xFF
+
+        # Levels driven onto the input pins from outside the chip, None when left floating
+        self._external: List[List[int]] = [[None] * 8, [None] * 8]
+
+        # Port values that interrupt-on-change compares against when INTCON selects the previous value
+        self._previous = [0, 0]
+
+        self._pointer = 0
+        self._int_pins = [None, None]
+
+        machine.attach_i2c_device(bus, address, self)
+
+    # ---- External Connections ----------------------------------------------------------------------------------------
+
+    def set_input(self, pin: int, level: int) -> None:
+        """
+        Drive an input pin of the expander from outside the chip.
+
+        :param pin: Expander pin 0 -> 15, port A is 0 -> 7 and port B is 8 -> 15
+        :param level: 0 (Low), 1 (High), or None to leave the pin floating
+        """
+        self._external[pin // 8][pin % 8] = level
+        self._check_interrupts()
+
+    def connect_interrupt(self, int_a: int = None, int_b: int = None) -> None:
+        """
+        Wire the interrupt outputs to emulated Pico pins.
+
+        :param int_a: Pin number connected to INTA
+        :param int_b: Pin number connected to INTB
+        """
+        self._int_pins = [int_a, int_b]
+        self._update_interrupt_outputs()
+
+    def port_value(self, port: int) -> int:
+        """
+        Get the value of the GPIO register of a port. Input pins read the external level, or the pull-up when floating,
+        inverted by IPOL. Output pins read the output latch.
+
+        :param port: 0 for port A, 1 for port B
+        """
+        registers = self.registers[port]
+        value = 0
+        for bit in range(8):
+            mask = 1 << bit
+            if registers[IODIR] & mask:
+                level = self._external[port][bit]
+                if level is None:
+                    level = 1 if registers[GPPU] & mask else 0
+                if registers[IPOL] & mask:
+                    level ^= 1
+            else:
+                level = 1 if registers[OLAT] & mask else 0
+            value |= level << bit
+        return value
+
+    # ---- I2C Device --------------------------------------------------------------------------------------------------
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+
+        self._pointer = data[0]
+        for value in data[1:]:
+            self._write_register(self._pointer, value)
+            self._advance_pointer()
+
+        self._check_interrupts()
+
+    def read(self, count: int) -> bytes:
+        data = bytearray(count)
+        for index in range(count):
+            data[index] = self._read_register(self._pointer)
+            self._advance_pointer()
+
+        self._check_interrupts()
+        return bytes(data)
+
+    # ---- Registers ---------------------------------------------------------------------------------------------------
+
+    def _iocon(self) -> int:
+        return self.registers[0][IOCON]
+
+    def _decode(self, address: int):
+        if self._iocon() & IOCON_BANK:
+            return address >> 4 & 1, address & 0x0f
+        return address & 1, address >> 1
+
+    def _advance_pointer(self) -> None:
+        if self._iocon() & IOCON_SEQOP:
+            return
+
+        if self._iocon() & IOCON_BANK:
+            port, register = self._decode(self._pointer)
+            self._pointer = (port << 4) | ((register + 1) % _REGISTER_COUNT)
+        else:
+            self._pointer = (self._pointer + 1) % (_REGISTER_COUNT * 2)
+
+    def _read_register(self, address: int) -> int:
+        port, register = self._decode(address)
+        if register >= _REGISTER_COUNT:
+            return 0
+
+        if register == GPIO:
+            value = self.port_value(port)
+            self._clear_interrupt(port, value)
+            return value
+
+        if register == INTCAP:
+            value = self.registers[port][INTCAP]
+            self._clear_interrupt(port, value)
+            return value
+
+        return self.registers[port][register]
+
+    def _write_register(self, address: int, value: int) -> None:
+        port, register = self._decode(address)
+        if register >= _REGISTER_COUNT or register in (INTF, INTCAP):
+            return
+
+        if register == IOCON:
+            # IOCON is shared between both ports
+            self.registers[0][IOCON] = value
+            self.registers[1][IOCON] = value
+        elif register == GPIO:
+            self.registers[port][OLAT] = value
+        else:
+            self.registers[port][register] = value
+
+    # ---- Interrupts --------------------------------------------------------------------------------------------------
+
+    def _clear_interrupt(self, port: int, value: int) -> None:
+        # Changes after the value that was read will raise a new interrupt
+        if self.registers[port][INTF]:
+            self.registers[port][INTF] = 0
+            self._previous[port] = value
+
+    def _check_interrupts(self) -> None:
+        for port in (0, 1):
+            registers = self.registers[port]
+            value = self.port_value(port)
+            reference = (registers[DEFVAL] & registers[INTCON]) | (self._previous[port] & ~registers[INTCON])
+            triggered = (value ^ reference) & registers[GPINTEN] & registers[IODIR]
+
+            # Only the first change is flagged and captured until the interrupt is cleared
+            if triggered and not registers[INTF]:
+                registers[INTF] = triggered & -triggered
+                registers[INTCAP] = value
+
+            if not registers[INTF]:
+                self._previous[port] = value
+
+        self._update_interrupt_outputs()
+
+    def _update_interrupt_outputs(self) -> None:
+        for port, pin_id in enumerate(self._int_pins):
+            # The level is worked out again for each output, driving the first one can run a handler that clears the
+            # interrupt
+            if pin_id is not None:
+                machine.set_pin_level(pin_id, self._interrupt_level(port))
+
+    def _interrupt_level(self, port: int) -> int:
+        iocon = self._iocon()
+        if iocon & IOCON_MIRROR:
+            asserted = bool(self.registers[0][INTF] or self.registers[1][INTF])
+        else:
+            asserted = bool(self.registers[port][INTF])
+
+        # Open drain outputs are always active low
+        active_high = bool(iocon & IOCON_INTPOL) and not iocon & IOCON_ODR
+        return 1 if asserted == active_high else 0
@@ -0,0 +1,157 @@
+"""
+Model of a HD44780 character LCD behind a PCF8574 I2C backpack for host emulation.
+
+The backpack drives the LCD in 4-bit mode with P0 -> RS, P1 -> RW, P2 -> E, P3 -> the backlight, and P4 -> P7 -> D4 -> D7.
+The LCD latches the data lines on the falling edge of E, so the model decodes the commands and characters from the
+sequence of port writes and keeps the display and character generator memory that they build up.
+"""
+from typing import List
+
+from . import machine
+
+MASK_RS = 0x01
+MASK_RW = 0x02
+MASK_E = 0x04
+MASK_BACKLIGHT = 0x08
+
+_DDRAM_SIZE = 0x80
+_CGRAM_SIZE = 0x40
+_LINE_OFFSETS = (0x00, 0x40, 0x14, 0x54)
+
+
+class Pcf8574LcdModel:
+    """
+    Emulated I2C character LCD. The text on the screen is read back with `lines`, custom characters show up as
+    `chr(0)` -> `chr(7)` and their bitmaps are in `custom_char`.
+
+    ... code-block:: python
+
+        lcd_model = Pcf8574LcdModel(bus=0, address=0x27)
+        lcd = I2cLcd(machine.I2C(0), 0x27, 2, 16)
+        lcd.putstr('Hello')
+        assert lcd_model.lines()[0].startswith('Hello')
+    """
+
+    def __init__(self, bus: int = 0, address: int = 0x27, num_lines: int = 2, num_columns: int = 16):
+        """
+        :param bus: The I2C bus id the backpack is attached to
+        :param address: The 7-bit address of the backpack, 0x20 -> 0x27 selected with its jumpers
+        :param num_lines: Number of lines on the screen
+        :param num_columns: Number of characters on each line
+        """
+        self.address = address
+        self.num_lines = num_lines
+        self.num_columns = num_columns
+
+        self.port = 0xFF
+        self.ddram = bytearray(b' ' * _DDRAM_SIZE)
+        self.cgram = bytearray(_CGRAM_SIZE)
+
+        self.four_bit = False
+        self.display_on = False
+        self.cursor_on = False
+        self.blink_on = False
+        self.increment = True
+
+        # Number of bytes written to the port, and the commands and characters that were decoded from them
+        self.port_writes = 0
+        self.commands = 0
+        self.characters = 0
+
+        self._address_counter = 0
+        self._cgram_selected = False
+        self._high_nibble = None
+
+        machine.attach_i2c_device(bus, address, self)
+
+    @property
+    def backlight(self) -> bool:
+        return bool(self.port & MASK_BACKLIGHT)
+
+    def lines(self) -> List[str]:
+        """
+        :return: The text that is on each line of the screen
+        """
+        return [self.ddram[offset:offset + self.num_columns].decode('latin-1')
+                for offset in _LINE_OFFSETS[:self.num_lines]]
+
+    def custom_char(self, location: int) -> bytes:
+        """
+        :param location: The custom character 0 -> 7
+        :return: The eight rows of the character bitmap
+        """
+        start = (location & 0x07) << 3
+        return bytes(self.cgram[start:start + 8])
+
+    # ---- I2C Device --------------------------------------------------------------------------------------------------
+
+    def write(self, data: bytes) -> None:
+        for value in data:
+            self.port_writes += 1
+            previous = self.port
+            self.port = value
+            if previous & MASK_E and not value & MASK_E:
+                self._strobe(previous)
+
+    def read(self, count: int) -> bytes:
+        # The quasi-bidirectional port reads back the level it was last written
+        return bytes([self.port] * count)
+
+    # ---- HD44780 -----------------------------------------------------------------------------------------------------
+
+    def _strobe(self, port: int) -> None:
+        if port & MASK_RW:
+            return
+
+        nibble = port >> 4
+        if not self.four_bit:
+            # The 8-bit interface only sees D4 -> D7, the lower data lines read as 0
+            self._execute(port & MASK_RS, nibble << 4)
+        elif self._high_nibble is None:
+            self._high_nibble = nibble
+        else:
+            value = self._high_nibble << 4 | nibble
+            self._high_nibble = None
+            self._execute(port & MASK_RS, value)
+
+    def _execute(self, data: int, value: int) -> None:
+        if data:
+            self.characters += 1
+            self._write_data(value)
+            return
+
+        self.commands += 1
+        if value & 0x80:
+            self._cgram_selected = False
+            self._address_counter = value & 0x7F
+        elif value & 0x40:
+            self._cgram_selected = True
+            self._address_counter = value & 0x3F
+        elif value & 0x20:
+            self.four_bit = not value & 0x10
+            self._high_nibble = None
+        elif value & 0x10:
+            pass  # Cursor and display shift are not modelled
+        elif value & 0x08:
+            self.display_on = bool(value & 0x04)
+            self.cursor_on = bool(value & 0x02)
+            self.blink_on = bool(value & 0x01)
+        elif value & 0x04:
+            self.increment = bool(value & 0x02)
+        elif value & 0x02:
+            self._cgram_selected = False
+            self._address_counter = 0
+        elif value & 0x01:
+            self.ddram[:] = b' ' * _DDRAM_SIZE
+            self._cgram_selected = False
+            self._address_counter = 0
+            self.increment = True
+
+    def _write_data(self, value: int) -> None:
+        step = 1 if self.increment else -1
+        if self._cgram_selected:
+            self.cgram[self._address_counter] = value & 0x1F
+            self._address_counter = (self._address_counter + step) % _CGRAM_SIZE
+        else:
+            self.ddram[self._address_counter] = value
+            self._address_counter = (self._address_counter + step) % _DDRAM_SIZE
@@ -0,0 +1,107 @@
+"""
+Replays an input trace recorded with `PinManager.start_trace` through the emulated board, so a recorded session runs
+the publisher and the panels the same way it did on the module.
+"""
+import time as _host_time
+
+from hardware.input_trace import TraceReader
+
+from . import clock
+from .board import ShuttleBoard
+
+
+class TracePlayer:
+    """
+    Drives the inputs of the emulated board from a trace and runs the sampling passes of a pin manager between the
+    records, at the speed of the recording or as fast as the host can.
+
+    The analog multiplexer select lines are not assigned on the module yet, so only the local analog gpio 47 and 48
+    are driven. The multiplexer channels in the trace are counted in `skipped_analog`.
+
+    ... code-block:: python
+
+        board = ShuttleBoard()
+        space_team = SpaceTeam()
+        with open('session.trace', 'rb') as stream:
+            player = TracePlayer(stream.read(), board)
+        player.play(space_team.pin_manager, speed=None)
+        print(player.report())
+    """
+
+    def __init__(self, data: bytes, board: ShuttleBoard):
+        """
+        :param data: The whole trace
+        :param board: The emulated board to drive
+        """
+        self.reader = TraceReader(data)
+        self.board = board
+
+        self.records = 0
+        self.passes = 0
+        self.skipped_analog = 0
+        self.virtual_us = 0
+        self.wall_s = 0.0
+
+    def play(self, pin_manager: 'PinManager', speed: float = 1.0) -> None:
+        """
+        Replay the whole trace.
+
+        :param pin_manager: Pin manager that samples the board, its sample timer is fired for every pass
+        :param speed: Multiple of the recorded speed to replay at, 1 is real time. None replays as fast as possible.
+        """
+        start_us = clock.ticks_us()
+        wall_start = _host_time.perf_counter()
+        digital = None
+        analog = None
+
+        for elapsed, new_digital, new_analog in self.reader:
+            # Quiet passes run until the pass that saw the record, the first record was seen by the first pass
+            target = clock.ticks_add(start_us, elapsed)
+            while clock.ticks_diff(target, clock.ticks_us()) > 0:
+                self._run_pass(pin_manager, speed, wall_start, start_us)
+
+            self._apply_digital(new_digital, digital)
+            self._apply_analog(new_analog, analog)
+            digital = new_digital
+            analog = new_analog[:]
+            self.records += 1
+
+            self._run_pass(pin_manager, speed, wall_start, start_us)
+
+        self.virtual_us = clock.ticks_diff(clock.ticks_us(), start_us)
+        self.wall_s = _host_time.perf_counter() - wall_start
+
+    def report(self) -> str:
+        speedup = self.virtual_us / 1e6 / self.wall_s if self.wall_s else 0.0
+        return (f'Replayed {self.records} records in {self.passes} passes, {self.virtual_us / 1000:.0f} ms of session '
+                f'in {self.wall_s * 1000:.0f} ms, {speedup:.1f}x real time')
+
+    def _run_pass(self, pin_manager: 'PinManager', speed: float, wall_start: float, start_us: int) -> None:
+        pin_manager.sample_timer.fire()
+        pin_manager.dispatch()
+        self.passes += 1
+
+        if speed:
+            behind = clock.ticks_diff(clock.ticks_us(), start_us) / 1e6 / speed
+            wait = wall_start + behind - _host_time.perf_counter()
+            if wait > 0:
+                clock.host_sleep(wait)
+
+    def _apply_digital(self, digital: int, previous: int) -> None:
+        # Every digital pin is driven from the first record, it holds the whole starting state
+        changed = (1 << ShuttleBoard.PIN_COUNT) - 1 if previous is None else digital ^ previous
+        gpio = 1
+        while changed:
+            if changed & 1 and gpio not in ShuttleBoard.ADC_GPIOS:
+                self.board.set_input(gpio, digital >> (gpio - 1) & 1)
+            changed >>= 1
+            gpio += 1
+
+    def _apply_analog(self, analog, previous) -> None:
+        for channel, gpio in enumerate(self.reader.analog_gpios):
+            if previous is not None and analog[channel] == previous[channel]:
+                continue
+            if gpio in ShuttleBoard.ADC_GPIOS:
+                self.board.set_analog(gpio, analog[channel])
+            elif previous is not None:
+                self.skipped_analog += 1
@@ -1,66 +1,165 @@
-from machine import Pin
+from array import array
+from typing import Callable
+import time
+
+from machine import ADC, Pin
 
 
 class AdcMux:
     SEL0_MASK = 0x0001
-    SEL1_MASK = 0x0010
-    SEL2_MASK = 0x0100
-    SEL3_MASK = 0x1000
-
-    def __init__(self, ain: int, sel0: int, sel1: int, sel2: int, sel3: int):
-        self.ain = Pin(ain)
-        self.sel0 = Pin(sel0)
-        self.sel1 = Pin(sel1)
-        self.sel2 = Pin(sel2)
-        self.sel3 = Pin(sel3)
+    SEL1_MASK = 0x0002
+    SEL2_MASK = 0x0004
+    SEL3_MASK = 0x0008
+
+    CHANNEL_COUNT = 16
+
+    FIRST_ADC_PIN = 26
+    """Pico pin of ADC 0, ADC 1 and 2 are on the next two pins."""
+
+    SCAN_ORDER = (0, 1, 3, 2, 6, 7, 5, 4, 12, 13, 15, 14, 10, 11, 9, 8)
+    """Order that `scan` sweeps the channels in. Each step is a Gray code, so only one select line changes."""
+
+    def __init__(self, ain: int, sel0: int, sel1: int, sel2: int, sel3: int, settle_us: int = 20):
+        """
+        :param ain: The ADC 0 -> 2 that the common pin of the multiplexer is connected to
+        :param sel0: Pin connected to the select line S0
+        :param sel1: Pin connected to the select line S1
+        :param sel2: Pin connected to the select line S2
+        :param sel3: Pin connected to the select line S3
+        :param settle_us: Time for the multiplexer output to settle after changing channels before it is sampled
+        """
+        self.ain_channel = ain
+        self.ain = Pin(AdcMux.FIRST_ADC_PIN + ain)
+        self.adc = ADC(ain)
+        self.sel0 = Pin(sel0, Pin.OUT)
+        self.sel1 = Pin(sel1, Pin.OUT)
+        self.sel2 = Pin(sel2, Pin.OUT)
+        self.sel3 = Pin(sel3, Pin.OUT)
         # self.enable = Pin(e)
+        self.settle_us = settle_us
+
+        # Results of the last scan of each channel, and the number of readings averaged for each channel
+        self.values = array('H', [0] * AdcMux.CHANNEL_COUNT)
+        self.oversample = array('B', [1] * AdcMux.CHANNEL_COUNT)
+
+        self._selected = 0
+        self._select_lines = ((AdcMux.SEL0_MASK, self.sel0), (AdcMux.SEL1_MASK, self.sel1),
+                              (AdcMux.SEL2_MASK, self.sel2), (AdcMux.SEL3_MASK, self.sel3))
         self._reset()
 
     def read(self, pin: int) -> int:
         """
-        Read the value from the ADC multiplexer. If you give a pin value out of
-        range the function fails silently and returns 0 (Low)
+        Read the value from the ADC multiplexer. The channel is selected and given time to settle before the ADC is
+        sampled. If you give a pin value out of range the function fails silently and returns 0 (Low)
 
-        :param pin: The number of the pin in reference to the ADC. This value
-            should be between 0 and 7 (8 bit ADC)
-        :return: The value of the pin 0 (Low) or 1 (High)
+        :param pin: The number of the channel of the multiplexer. This value should be between 0 and 15
+        :return: The unsigned 16-bit ADC reading
         """
 
         # If the pin value is out of range return 0 and fail silently
-        if 0 < pin >= 8:
+        if not 0 <= pin < AdcMux.CHANNEL_COUNT:
             return 0
 
         self._select_pin(pin)
-        return self.ain.value()
+        time.sleep_us(self.settle_us)
+        return self._sample(pin)
+
+    def scan(self, channels: int = 0xFFFF, callback: Callable[[int, int], None] = None) -> array:
+        """
+        Sample the channels of the multiplexer in `SCAN_ORDER` into `values`. As soon as a channel is sampled the next
+        one is selected, so the callback for a channel runs while the next channel settles.
+
+        ... code-block:: python
+
+            values = adc_mux.scan()
+            pot = values[3]
+
+        :param channels: Mask of the channels to sample, bit `n` for channel `n`. Other channels keep their last value.
+        :param callback: Called with `(channel, value)` for each sampled channel
+        :return: The array of the channel values, the same array is reused by every scan
+        """
+        values = self.values
+        order = AdcMux.SCAN_ORDER
+        settle_us = self.settle_us
+
+        index = 0
+        while index < AdcMux.CHANNEL_COUNT and not channels >> order[index] & 1:
+            index += 1
+        if index == AdcMux.CHANNEL_COUNT:
+            return values
+
+        channel = order[index]
+        self._select_pin(channel)
+        settled = time.ticks_add(time.ticks_us(), settle_us)
+
+        while channel is not None:
+            remaining = time.ticks_diff(settled, time.ticks_us())
+            if remaining > 0:
+                time.sleep_us(remaining)
+            value = self._sample(channel)
+
+            # Start settling the next channel before handing out this sample
+            index += 1
+            while index < AdcMux.CHANNEL_COUNT and not channels >> order[index] & 1:
+                index += 1
+            if index < AdcMux.CHANNEL_COUNT:
+                next_channel = order[index]
+                self._select_pin(next_channel)
+                settled = time.ticks_add(time.ticks_us(), settle_us)
+            else:
+                next_channel = None
+
+            values[channel] = value
+            if callback is not None:
+                callback(channel, value)
+            channel = next_channel
+
+        return values
 
     def write(self, pin: int, value: int) -> None:
         """
         Write the value to the ADC multiplexer. If you give a pin value out of
         range the function fails silently and returns.
 
-        :param pin: The number of the pin in reference to the ADC. This value
-            should be between 0 and 7 (8 bit ADC)
+        :param pin: The number of the channel of the multiplexer. This value
+            should be between 0 and 15
         :param value:
         :return:
         """
         # If the pin value is out of range return
-        if 0 < pin >= 8:
+        if not 0 <= pin < AdcMux.CHANNEL_COUNT:
             return
 
         self._select_pin(pin)
         self.ain.value(value)
 
+    def _sample(self, channel: int) -> int:
+        oversample = self.oversample[channel]
+        if oversample == 1:
+            return self.adc.read_u16()
+
+        total = 0
+        for _ in range(oversample):
+            total += self.adc.read_u16()
+        return total // oversample
+
     def _select_pin(self, pin: int) -> None:
         # Set the select pins based off the select masks to get access to the
-        # analog read pin
-        self.sel0.value(pin & AdcMux.SEL0_MASK)
-        self.sel1.value(pin & AdcMux.SEL1_MASK)
-        self.sel2.value(pin & AdcMux.SEL2_MASK)
-        self.sel3.value(pin & AdcMux.SEL3_MASK)
+        # analog read pin. Only the select lines that differ from the current
+        # channel are written.
+        changed = pin ^ self._selected
+        if not changed:
+            return
+
+        for mask, line in self._select_lines:
+            if changed & mask:
+                line.value(1 if pin & mask else 0)
+        self._selected = pin
 
     def _reset(self):
         self.sel0.off()
         self.sel1.off()
         self.sel2.off()
         self.sel3.off()
+        self._selected = 0
         # self.enable.off()
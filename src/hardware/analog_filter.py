@@ -0,0 +1,73 @@
+from typing import Dict, Sequence, Tuple
+
+
+class AnalogFilter:
+    """
+    Filter stage for the analog pins that decides which readings are worth publishing. Each pin can average several
+    readings per sample, ignore movement inside a deadband around the last published value, and ask for extra movement
+    before publishing a change in the opposite direction, so noise sitting on a boundary doesn't flip back and forth.
+
+    Pins without settings publish every change.
+
+    ... code-block:: python
+
+        analog_filter = AnalogFilter()
+        analog_filter.configure([1, 2], oversample=8, deadband=256, hysteresis=128)
+    """
+
+    def __init__(self):
+        # Settings of each gpio as `(oversample, deadband, hysteresis)`
+        self._settings: Dict[int, Tuple[int, int, int]] = {}
+
+        # Direction of the last published change of each gpio, 1 for up and -1 for down
+        self._direction: Dict[int, int] = {}
+
+    def configure(self, pins: Sequence[int], oversample: int = 1, deadband: int = 0, hysteresis: int = 0) -> None:
+        """
+        :param pins: GPIO pins to filter
+        :param oversample: Number of readings averaged into each sample
+        :param deadband: Largest change from the last published value that is ignored
+        :param hysteresis: Extra change needed on top of the deadband when the value turns around
+        """
+        if oversample < 1 or deadband < 0 or hysteresis < 0:
+            raise ValueError('Analog filters need an oversample of at least 1 and a positive deadband and hysteresis')
+
+        for gpio in pins:
+            if oversample == 1 and deadband == 0 and hysteresis == 0:
+                self._settings.pop(gpio, None)
+            else:
+                self._settings[gpio] = (oversample, deadband, hysteresis)
+            self._direction.pop(gpio, None)
+
+    def oversample(self, gpio: int) -> int:
+        """
+        :return: Number of readings averaged into each sample of the pin
+        """
+        settings = self._settings.get(gpio)
+        return settings[0] if settings else 1
+
+    def is_change(self, gpio: int, value: int, previous: int) -> bool:
+        """
+        Check if a sample moved far enough from the last published value to be published.
+
+        :param gpio: The GPIO pin that was sampled
+        :param value: The new sample
+        :param previous: The last published value of the pin
+        :return: True when the sample should be published
+        """
+        delta = value - previous
+        if not delta:
+            return False
+
+        settings = self._settings.get(gpio)
+        if settings is None:
+            return True
+
+        _, deadband, hysteresis = settings
+        direction = 1 if delta > 0 else -1
+        threshold = deadband if self._direction.get(gpio, direction) == direction else deadband + hysteresis
+        if abs(delta) <= threshold:
+            return False
+
+        self._direction[gpio] = direction
+        return True
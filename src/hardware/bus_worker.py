@@ -0,0 +1,116 @@
+from typing import Tuple
+
+import _thread
+import time
+
+
+class BusWorker:
+    """
+    Runs the transactions of the expanders on a second I2C bus on the second core of the RP2040, so the two buses are
+    used at the same time. The sampling pass hands the worker a job and goes on with the expanders of its own bus, then
+    waits for the word the worker read.
+
+    Jobs are run in the order they are submitted. A job submitted before the worker took the previous one is merged
+    into it, so the flush at the start of a pass and the first read go out together.
+
+    ... code-block:: python
+
+        worker = BusWorker(((expander, 48),))
+        worker.start()
+        worker.submit(flush=True)
+        worker.submit(expanders=((expander, 48),))
+        word = worker.wait()
+    """
+
+    def __init__(self, expanders: Tuple):
+        """
+        :param expanders: The `(expander, shift)` of the expanders on the bus of the worker, flushed by each flush job
+        """
+        self.expanders = expanders
+        self.word = 0
+        self.jobs = 0
+
+        self._lock = _thread.allocate_lock()
+        self._flush = False
+        self._reads: Tuple = ()
+        self._pending = False
+        self._done = True
+
+        self._running = False
+        self._stopped = True
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._stopped = False
+        _thread.start_new_thread(self._loop, ())
+
+    def stop(self) -> None:
+        """ Stop the worker after the job it is running. """
+        if not self._running:
+            return
+        self._running = False
+        while not self._stopped:
+            time.sleep_us(0)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def submit(self, flush: bool = False, expanders: Tuple = ()) -> None:
+        """
+        Give the worker a job without waiting for it.
+
+        :param flush: Write the pending changes of all the expanders of the worker
+        :param expanders: The `(expander, shift)` to read into a word, see `wait`
+        """
+        if expanders:
+            # Wait for the worker to finish the previous read, it clears `_reads` itself once the word is stored. The
+            # new read replaces that word, so it is lost unless `wait` was called for it first
+            while self._reads:
+                time.sleep_us(0)
+        with self._lock:
+            self._flush = self._flush or flush
+            if expanders:
+                self._reads = expanders
+            self._pending = True
+            self._done = False
+
+    def wait(self) -> int:
+        """
+        Wait for the submitted jobs to finish.
+
+        :return: The word of the last read job, each expander read into its 16 bits at its shift
+        """
+        while not self._done:
+            time.sleep_us(0)
+        return self.word
+
+    def _loop(self) -> None:
+        while self._running:
+            if not self._pending:
+                time.sleep_us(0)
+                continue
+
+            with self._lock:
+                flush = self._flush
+                reads = self._reads
+                self._flush = False
+                self._pending = False
+
+            if flush:
+                for expander, _ in self.expanders:
+                    expander.flush()
+            if reads:
+                word = 0
+                for expander, shift in reads:
+                    word |= expander.read_gpio() << shift
+                self.word = word
+                self._reads = ()
+            self.jobs += 1
+
+            with self._lock:
+                if not self._pending:
+                    self._done = True
+        self._stopped = True
@@ -0,0 +1,118 @@
+from typing import List, Sequence
+
+
+class Debouncer:
+    """
+    Bit parallel integrating debouncer for a packed word of digital inputs. Every pin has a counter of how many samples
+    in a row it has disagreed with its debounced state, stored as vertical counters: plane `n` holds bit `n` of the
+    counter of every pin. A pin takes its new value once its counter reaches the number of stable samples set for it,
+    and any sample that agrees with the debounced state resets the counter.
+
+    Each update costs a few integer operations per counter plane no matter how many pins are debounced.
+
+    ... code-block:: python
+
+        debouncer = Debouncer(64, samples=4)
+        state = debouncer.update(state, raw_word, sampled_mask)
+    """
+
+    def __init__(self, width: int, samples: int = 1):
+        """
+        :param width: Number of pins in the packed word
+        :param samples: Number of stable samples before a pin takes a new value, 1 accepts every change
+        """
+        self.width = width
+        self._all = (1 << width) - 1
+        self._counters: List[int] = []
+        self._thresholds: List[int] = []
+        self.set_samples(range(width), samples)
+
+    def set_samples(self, bits: Sequence[int], samples: int) -> None:
+        """
+        Set the number of stable samples needed before the pins take a new value.
+
+        :param bits: Bit positions of the pins in the packed word
+        :param samples: Number of stable samples, 1 accepts every change
+        """
+        if samples < 1:
+            raise ValueError(f'Debouncing needs at least 1 sample, got {samples}')
+
+        mask = 0
+        for bit in bits:
+            mask |= 1 << bit
+
+        # Grow the counters to fit the largest count
+        planes = 0
+        while samples >> planes:
+            planes += 1
+        while len(self._thresholds) < planes:
+            self._thresholds.append(0)
+            self._counters.append(0)
+
+        for plane in range(len(self._thresholds)):
+            if samples >> plane & 1:
+                self._thresholds[plane] |= mask
+            else:
+                self._thresholds[plane] &= ~mask
+
+            # Counting starts over for the pins with a new count
+            self._counters[plane] &= ~mask
+
+        # Drop the planes that no pin needs any more
+        while len(self._thresholds) > 1 and not self._thresholds[-1]:
+            self._thresholds.pop()
+            self._counters.pop()
+
+    def reset(self, mask: int) -> None:
+        """
+        Start counting from 0 again for pins whose debounced state was set from outside, like a pin that just started
+        being sampled.
+
+        :param mask: Mask of the pins in the packed word
+        """
+        counters = self._counters
+        for plane in range(len(counters)):
+            counters[plane] &= ~mask
+
+    def samples(self, bit: int) -> int:
+        """
+        :param bit: Bit position of the pin in the packed word
+        :return: Number of stable samples needed before the pin takes a new value
+        """
+        samples = 0
+        for plane, threshold in enumerate(self._thresholds):
+            samples |= (threshold >> bit & 1) << plane
+        return samples
+
+    def update(self, state: int, raw: int, sampled: int) -> int:
+        """
+        Run one debounce step for the pins that were sampled.
+
+        :param state: Debounced state of the pins
+        :param raw: Raw value of the pins that were read
+        :param sampled: Mask of the pins that were read, the counters of the other pins are left as they are
+        :return: The new debounced state of the pins
+        """
+        differs = (raw ^ state) & sampled
+
+        # Pins that agree with their debounced state start counting from 0 again, the rest count up by 1
+        counters = self._counters
+        carry = differs
+        stable = sampled & ~differs
+        for plane in range(len(counters)):
+            counter = counters[plane] & ~stable
+            counters[plane] = counter ^ carry
+            carry &= counter
+
+        # Pins whose counter matches their threshold take the new value
+        mismatch = 0
+        for plane in range(len(counters)):
+            mismatch |= counters[plane] ^ self._thresholds[plane]
+        settled = differs & ~mismatch & self._all
+
+        if settled:
+            for plane in range(len(counters)):
+                counters[plane] &= ~settled
+            state ^= settled
+
+        return state
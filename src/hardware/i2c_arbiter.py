@@ -0,0 +1,447 @@
+import _thread
+import time
+
+import machine
+
+
+class I2cArbiter:
+    """
+    Owns an I2C bus shared by the pin sampling, the displays, and the panels. Each user of the bus gets a client from
+    `client` with a priority class, and the client is used in place of the `machine.I2C` object.
+
+    - Every transaction holds the bus lock, so the bus can be used from both cores. A sampling client waiting for the
+      bus gets it before a display client.
+    - Display clients queue their writes instead of sending them, and combine consecutive writes to the same device
+      into one transaction of up to `burst_size` bytes. The queue is sent by `flush`, which the main loop calls.
+    - Display traffic is limited to `budget_us` of bus time in each `period_us`, so a full redraw of an LCD can't hold
+      the bus through a sampling pass. Writes over the budget stay queued for a later period, the code that drew them
+      doesn't wait.
+
+    ... code-block:: python
+
+        bus = I2cArbiter(machine.I2C(0, sda=machine.Pin(16), scl=machine.Pin(17), freq=400000), freq=400000)
+        pin_manager = PinManager(bus.client(I2cArbiter.Priority.SAMPLING))
+        gauge = LiquidGauge(bus.client(I2cArbiter.Priority.DISPLAY))
+        while True:
+            pin_manager.dispatch()
+            bus.flush()
+    """
+
+    class Priority:
+        SAMPLING = 0
+        """The regular sampling passes of the pin manager."""
+        DISPLAY = 1
+        """Displays and other output that can be spread over several sampling passes."""
+
+    COUNT = 2
+
+    def __init__(self, i2c: machine.I2C, freq: int = 400000, period_us: int = 50000, budget_us: int = 5000,
+                 burst_size: int = 64, queue_size: int = 1024):
+        """
+        :param i2c: The bus to arbitrate
+        :param freq: Clock frequency of the bus in Hz, used to estimate the bus time of a transaction
+        :param period_us: Length of the period that the display budget is given for, usually the sampling period
+        :param budget_us: Bus time in us the display clients can use in each period
+        :param burst_size: Most bytes combined into one write by a display client, up to 255
+        :param queue_size: Bytes of writes each display client can queue. A client with a full queue waits for the
+            budget, which only happens to a display drawn faster than its budget for a while.
+        """
+        self.i2c = i2c
+        self.freq = freq
+        self.period_us = period_us
+        self.budget_us = budget_us
+        self.burst_size = burst_size
+        self.queue_size = queue_size
+
+        self._lock = _thread.allocate_lock()
+        self._owner = None
+        self._depth = 0
+        # If a client of each priority class is waiting for the bus, see `_take`
+        self._waiting = [False] * I2cArbiter.COUNT
+        self._clients = []
+
+        self._period_start = time.ticks_us()
+        self._display_us = 0
+
+        # Statistics of each priority class, see `report`
+        self.transactions = [0] * I2cArbiter.COUNT
+        self.bus_us = [0] * I2cArbiter.COUNT
+        self.coalesced = 0
+        self.throttled_us = 0
+
+    def client(self, priority: int) -> 'I2cClient':
+        """
+        :param priority: One of `I2cArbiter.Priority`
+        :return: A client that makes its transactions on the bus with the priority class
+        """
+        client = I2cClient(self, priority)
+        self._clients.append(client)
+        return client
+
+    def flush(self) -> None:
+        """ Send the queued display writes that the budget allows, without waiting. Call it from the main loop. """
+        for client in self._clients:
+            client.flush()
+
+    @property
+    def queued(self) -> int:
+        """ Bytes of display writes waiting to be sent. """
+        return sum(client.queued for client in self._clients)
+
+    def transaction_us(self, nbytes: int, register_read: bool = False) -> int:
+        """
+        :param nbytes: Bytes after the address byte, including the register address
+        :param register_read: The transaction writes the register address and reads with a repeated start
+        :return: Estimated bus time of a transaction. Start and stop are a bit each, and each byte is 9 bits with its
+            acknowledge.
+        """
+        bits = 2 + 9 * (1 + nbytes)
+        if register_read:
+            bits += 1 + 9
+        return bits * 1000000 // self.freq
+
+    def report(self) -> str:
+        names = ('sampling', 'display')
+        lines = [f'{name}: {self.transactions[priority]} transactions, {self.bus_us[priority] / 1000:.1f} ms'
+                 for priority, name in enumerate(names)]
+        lines.append(f'{self.coalesced} writes combined, display waited {self.throttled_us / 1000:.1f} ms for budget')
+        return '\n'.join(lines)
+
+    def _begin(self, priority: int) -> None:
+        """ Wait for the bus for one transaction, released by `_end`. """
+        self._take(priority, True)
+
+    def _take(self, priority: int, blocking: bool) -> bool:
+        """
+        Take the bus. The thread that holds the bus can take it again, each take is released by `_release`.
+
+        :param blocking: Wait for the bus. Without waiting a client doesn't queue for the bus either.
+        :return: If the bus was taken
+        """
+        ident = _thread.get_ident()
+        if self._owner == ident:
+            # The bus is held around several transactions, or a timer callback ran on this core between the
+            # transactions of the code it interrupted
+            self._depth += 1
+            return True
+
+        lock = self._lock
+        if not blocking:
+            if self._outranked(priority) or not lock.acquire(0):
+                return False
+        else:
+            waiting = self._waiting
+            waiting[priority] = True
+            lock.acquire()
+            while self._outranked(priority):
+                # A client of a higher priority class is waiting on the lock as well, it goes first
+                lock.release()
+                time.sleep_us(0)
+                lock.acquire()
+            waiting[priority] = False
+        # Between taking the lock and setting the owner a timer callback on this core can't take the bus, which is
+        # why the callbacks don't block, see `I2cClient.acquire`
+        self._owner = ident
+        self._depth = 1
+        return True
+
+    def _release(self) -> None:
+        self._depth -= 1
+        if not self._depth:
+            self._owner = None
+            self._lock.release()
+
+    def _outranked(self, priority: int) -> bool:
+        """
+        :param priority: One of `I2cArbiter.Priority`
+        :return: If a client of a higher priority class is waiting for the bus
+        """
+        waiting = self._waiting
+        for higher in range(priority):
+            if waiting[higher]:
+                return True
+        return False
+
+    def _end(self, priority: int, cost_us: int) -> None:
+        self.transactions[priority] += 1
+        self.bus_us[priority] += cost_us
+        if priority == I2cArbiter.Priority.DISPLAY:
+            self._new_period()
+            self._display_us += cost_us
+        self._release()
+
+    def _new_period(self) -> int:
+        """
+        :return: Time in us since the start of the budget period, after starting a new period if the last one is over
+        """
+        now = time.ticks_us()
+        elapsed = time.ticks_diff(now, self._period_start)
+        if elapsed >= self.period_us:
+            self._period_start = now
+            self._display_us = 0
+            elapsed = 0
+        return elapsed
+
+    def _within_budget(self, cost_us: int, wait: bool) -> bool:
+        """
+        :param cost_us: Bus time of the next display transaction
+        :param wait: Wait for the next period when the budget of this one is spent
+        :return: If the transaction fits in the display budget of the period
+        """
+        while True:
+            elapsed = self._new_period()
+            # A transaction larger than the whole budget still gets a period to itself
+            if not self._display_us or self._display_us + cost_us <= self.budget_us:
+                return True
+            if not wait:
+                return False
+            wait_us = self.period_us - elapsed
+            self.throttled_us += wait_us
+            time.sleep_us(wait_us)
+
+
+class I2cClient:
+    """
+    A user of the bus of an `I2cArbiter`. Has the transactions of `machine.I2C`, so it can be given to the drivers in
+    its place.
+
+    The writes of a display client are queued and sent by `flush`. Anything else it does on the bus sends the queue
+    first, so the device sees everything in order.
+    """
+
+    DELAY = 0x80
+    """Address of a queued wait, I2C addresses are 7 bits."""
+
+    def __init__(self, arbiter: I2cArbiter, priority: int):
+        """
+        :param arbiter: The arbiter of the bus
+        :param priority: One of `I2cArbiter.Priority`
+        """
+        self.arbiter = arbiter
+        self.priority = priority
+        self.queues = priority == I2cArbiter.Priority.DISPLAY
+
+        # Queued writes, each an address byte and a length byte followed by the data. A queued wait has the `DELAY`
+        # address and the wait in us as 3 bytes of data.
+        self._queue = bytearray(arbiter.queue_size if self.queues else 0)
+        self._queue_view = memoryview(self._queue)
+        self._start = 0
+        self._end = 0
+        # Start of the last write, the next write to the same device is combined with it. -1 when there is none.
+        self._last = -1
+        # The next write is not sent before this time from `time.ticks_us`, set by the queued waits
+        self._ready_at = time.ticks_us()
+
+    @property
+    def queued(self) -> int:
+        return self._end - self._start
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Hold the bus across several transactions, until `release`. A timer callback takes the bus without blocking: the
+        code it interrupted on the same core can be between taking the lock and owning the bus, and would never get to
+        release it.
+
+        ... code-block:: python
+
+            if client.acquire(False):
+                try:
+                    expander.read_gpio()
+                finally:
+                    client.release()
+
+        :param blocking: Wait for the bus
+        :return: If the bus is held
+        """
+        if blocking:
+            self._drain()
+        elif self.queued:
+            return False
+        return self.arbiter._take(self.priority, blocking)
+
+    def release(self) -> None:
+        self.arbiter._release()
+
+    def flush(self, wait: bool = False) -> None:
+        """
+        Send the queued writes that the display budget and the queued waits allow. The rest is sent by a later flush.
+
+        :param wait: Send the whole queue, waiting for the budget and the queued waits
+        """
+        if wait:
+            self._drain()
+            return
+        while self._start < self._end and self._send_next(False):
+            pass
+
+    def delay(self, us: int) -> None:
+        """
+        Wait before the writes after this one are sent, without holding up the caller. Used by the drivers in place of
+        sleeping between the steps of a device.
+
+        :param us: Time in us the device needs after the writes before this one
+        """
+        if not self.queues:
+            time.sleep_us(us)
+            return
+        if not self.queued:
+            self._ready_at = time.ticks_add(time.ticks_us(), us)
+            return
+
+        self._make_room(5)
+        queue = self._queue
+        end = self._end
+        queue[end] = I2cClient.DELAY
+        queue[end + 1] = 3
+        queue[end + 2] = us & 0xFF
+        queue[end + 3] = (us >> 8) & 0xFF
+        queue[end + 4] = (us >> 16) & 0xFF
+        self._end = end + 5
+        self._last = -1
+
+    def scan(self):
+        self._drain()
+        arbiter = self.arbiter
+        arbiter._begin(self.priority)
+        try:
+            return arbiter.i2c.scan()
+        finally:
+            arbiter._end(self.priority, 0)
+
+    def writeto(self, address: int, buf, stop: bool = True) -> int:
+        length = len(buf)
+        if not self.queues or length > self.arbiter.burst_size:
+            self._drain()
+            return self._writeto(address, buf)
+
+        queue = self._queue
+        last = self._last
+        if (last >= 0 and queue[last] == address and queue[last + 1] + length <= self.arbiter.burst_size
+                and self._end + length <= len(queue)):
+            queue[last + 1] += length
+            self.arbiter.coalesced += 1
+        else:
+            self._make_room(2 + length)
+            last = self._end
+            queue[last] = address
+            queue[last + 1] = length
+            self._end = last + 2
+            self._last = last
+        end = self._end
+        queue[end:end + length] = buf
+        self._end = end + length
+        return length
+
+    def writeto_mem(self, address: int, memaddr: int, buf, addrsize: int = 8) -> None:
+        self._drain()
+        arbiter = self.arbiter
+        cost = arbiter.transaction_us(1 + len(buf))
+        arbiter._begin(self.priority)
+        try:
+            arbiter.i2c.writeto_mem(address, memaddr, buf, addrsize=addrsize)
+        finally:
+            arbiter._end(self.priority, cost)
+
+    def readfrom_into(self, address: int, buf, stop: bool = True) -> None:
+        self._drain()
+        arbiter = self.arbiter
+        cost = arbiter.transaction_us(len(buf))
+        arbiter._begin(self.priority)
+        try:
+            arbiter.i2c.readfrom_into(address, buf)
+        finally:
+            arbiter._end(self.priority, cost)
+
+    def readfrom_mem_into(self, address: int, memaddr: int, buf, addrsize: int = 8) -> None:
+        self._drain()
+        arbiter = self.arbiter
+        cost = arbiter.transaction_us(1 + len(buf), register_read=True)
+        arbiter._begin(self.priority)
+        try:
+            arbiter.i2c.readfrom_mem_into(address, memaddr, buf, addrsize=addrsize)
+        finally:
+            arbiter._end(self.priority, cost)
+
+    def readfrom(self, address: int, nbytes: int, stop: bool = True) -> bytes:
+        buf = bytearray(nbytes)
+        self.readfrom_into(address, buf)
+        return bytes(buf)
+
+    def readfrom_mem(self, address: int, memaddr: int, nbytes: int, addrsize: int = 8) -> bytes:
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(address, memaddr, buf, addrsize)
+        return bytes(buf)
+
+    def _writeto(self, address: int, buf) -> int:
+        arbiter = self.arbiter
+        cost = arbiter.transaction_us(len(buf))
+        arbiter._begin(self.priority)
+        try:
+            return arbiter.i2c.writeto(address, buf)
+        finally:
+            arbiter._end(self.priority, cost)
+
+    # ---- Queue -------------------------------------------------------------------------------------------------------
+
+    def _drain(self) -> None:
+        """ Send the whole queue, waiting for the budget and the queued waits. """
+        while self._start < self._end:
+            self._send_next(True)
+
+    def _make_room(self, length: int) -> None:
+        """ Make room for `length` bytes at the end of the queue. """
+        queue = self._queue
+        while self._end + length > len(queue):
+            start = self._start
+            if start:
+                # Move the queue to the front of the buffer
+                count = self._end - start
+                queue[:count] = self._queue_view[start:self._end]
+                self._start = 0
+                self._end = count
+                if self._last >= 0:
+                    self._last -= start
+            else:
+                self._send_next(True)
+
+    def _send_next(self, wait: bool) -> bool:
+        """
+        Send the write or run the wait at the front of the queue.
+
+        :param wait: Wait for the budget, the queued waits, and the bus instead of leaving the write queued
+        :return: If the front of the queue was handled
+        """
+        queue = self._queue
+        start = self._start
+        remaining = time.ticks_diff(self._ready_at, time.ticks_us())
+        if remaining > 0:
+            if not wait:
+                return False
+            time.sleep_us(remaining)
+
+        address = queue[start]
+        length = queue[start + 1]
+        if address == I2cClient.DELAY:
+            us = queue[start + 2] | (queue[start + 3] << 8) | (queue[start + 4] << 16)
+            self._ready_at = time.ticks_add(time.ticks_us(), us)
+            self._pop(5)
+            return True
+
+        arbiter = self.arbiter
+        cost = arbiter.transaction_us(length)
+        if not arbiter._within_budget(cost, wait) or not arbiter._take(self.priority, wait):
+            return False
+        try:
+            arbiter.i2c.writeto(address, self._queue_view[start + 2:start + 2 + length])
+        finally:
+            arbiter._end(self.priority, cost)
+        self._pop(2 + length)
+        return True
+
+    def _pop(self, length: int) -> None:
+        if self._last == self._start:
+            self._last = -1
+        self._start += length
+        if self._start == self._end:
+            self._start = 0
+            self._end = 0
@@ -0,0 +1,255 @@
+from array import array
+from typing import Iterator, Sequence, Tuple
+
+import time
+
+
+class InputTrace:
+    """
+    Compact binary format of the pin states of a session, one record for every sampling pass that changed a pin.
+
+    The trace starts with the header `MAGIC`, the format `VERSION`, and the analog gpios that are recorded, and is
+    followed by the records. Everything after the magic is unsigned LEB128 varints. Each record holds
+
+    - the time in us since the previous record
+    - the 64-bit digital word XOR the previous one, bit `gpio - 1` for each pin
+    - a mask of the analog channels that changed, bit `n` for the n-th recorded gpio
+    - the zigzag encoded change of each of those channels, in order
+
+    The first record is taken against all pins low, so it holds the whole starting state.
+    """
+    MAGIC = b'STT'
+    VERSION = 1
+
+    ANALOG_GPIOS = (*range(1, 17), 47, 48)
+    """Analog gpios recorded by default, the 16 multiplexer channels and the two local ADC pins."""
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data, index: int) -> Tuple[int, int]:
+    """
+    :return: `(value, index)` of the varint at the index and the index after it
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[index]
+        index += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, index
+        shift += 7
+
+
+def zigzag(value: int) -> int:
+    return value << 1 if value >= 0 else (-value << 1) - 1
+
+
+def unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+class TraceRecorder:
+    """
+    Records the pin states of a `PinManager` into a trace. `record` runs in the sampling pass, so it only encodes the
+    record into a ring buffer allocated up front. `flush` writes the ring to the stream from the main loop, the pin
+    manager calls it from `dispatch`.
+
+    A record that doesn't fit in the ring is dropped. Its changes go into the next record that fits, so the trace
+    only loses the pass in between.
+
+    ... code-block:: python
+
+        with open('session.trace', 'wb') as stream:
+            pin_manager.start_trace(stream)
+            space_team.run()
+            pin_manager.stop_trace()
+    """
+
+    RING_SIZE = 1024
+
+    def __init__(self, stream, analog_gpios: Sequence[int] = InputTrace.ANALOG_GPIOS, ring_size: int = RING_SIZE):
+        """
+        :param stream: Binary stream with a `write` method, like a file opened with 'wb'
+        :param analog_gpios: Analog gpios to record, in channel order
+        :param ring_size: Bytes of records that can wait for a `flush`
+        """
+        self.stream = stream
+        self.analog_gpios = tuple(analog_gpios)
+        self.records = 0
+        self.dropped = 0
+        self.bytes_written = 0
+
+        self._digital = 0
+        self._analog = array('H', [0] * len(self.analog_gpios))
+        self._last_timestamp = None
+
+        # Written by `record` at the head and read by `flush` from the tail. The ring is full one byte before the
+        # head catches up with the tail.
+        self._ring = bytearray(ring_size)
+        self._ring_view = memoryview(self._ring)
+        self._head = 0
+        self._tail = 0
+
+        header = bytearray(InputTrace.MAGIC)
+        write_varint(header, InputTrace.VERSION)
+        write_varint(header, len(self.analog_gpios))
+        for gpio in self.analog_gpios:
+            write_varint(header, gpio)
+        self._write(header)
+
+    def record(self, timestamp: int, digital: int, analog_values: dict) -> None:
+        """
+        Record the pin states after a sampling pass. Passes that didn't change any recorded pin are not stored.
+
+        :param timestamp: Time of the pass from `time.ticks_us`
+        :param digital: Digital states packed into a word, bit `gpio - 1` for each pin
+        :param analog_values: Analog values by gpio
+        """
+        changed_digital = digital ^ self._digital
+        changed_analog = 0
+        previous = self._analog
+        for channel, gpio in enumerate(self.analog_gpios):
+            if int(analog_values.get(gpio, 0)) != previous[channel]:
+                changed_analog |= 1 << channel
+
+        if not changed_digital and not changed_analog and self._last_timestamp is not None:
+            return
+
+        delta = 0 if self._last_timestamp is None else time.ticks_diff(timestamp, self._last_timestamp)
+
+        head = self._head
+        fits = self._put(delta) and self._put(changed_digital) and self._put(changed_analog)
+        channel = 0
+        changed = changed_analog
+        while fits and changed:
+            if changed & 1:
+                value = int(analog_values.get(self.analog_gpios[channel], 0))
+                fits = self._put(zigzag(value - previous[channel]))
+            changed >>= 1
+            channel += 1
+
+        if not fits:
+            # The record is taken back, the next one is encoded against the last record that was kept
+            self._head = head
+            self.dropped += 1
+            return
+
+        channel = 0
+        while changed_analog:
+            if changed_analog & 1:
+                previous[channel] = int(analog_values.get(self.analog_gpios[channel], 0))
+            changed_analog >>= 1
+            channel += 1
+        self._digital = digital
+        self._last_timestamp = timestamp
+        self.records += 1
+
+    def flush(self) -> None:
+        """ Write the records in the ring to the stream. Call from the main loop, not from a timer callback. """
+        head = self._head
+        tail = self._tail
+        if head == tail:
+            return
+        view = self._ring_view
+        if head > tail:
+            self._write(view[tail:head])
+        else:
+            self._write(view[tail:])
+            if head:
+                self._write(view[:head])
+        self._tail = head
+
+    def _put(self, value: int) -> bool:
+        """
+        Write an unsigned LEB128 varint at the head of the ring.
+
+        :return: If the varint fit in the ring
+        """
+        ring = self._ring
+        size = len(ring)
+        head = self._head
+        tail = self._tail
+        while True:
+            following = head + 1 if head + 1 < size else 0
+            if following == tail:
+                return False
+            byte = value & 0x7F
+            value >>= 7
+            ring[head] = byte | 0x80 if value else byte
+            head = following
+            if not value:
+                break
+        self._head = head
+        return True
+
+    def _write(self, data) -> None:
+        self.stream.write(data)
+        self.bytes_written += len(data)
+
+
+class TraceReader:
+    """
+    Decodes a trace back into the pin states of each record.
+
+    ... code-block:: python
+
+        for elapsed, digital, analog in TraceReader(data):
+            print(elapsed, bin(digital), analog)
+    """
+
+    def __init__(self, data: bytes):
+        """
+        :param data: The whole trace
+        """
+        if data[:len(InputTrace.MAGIC)] != InputTrace.MAGIC:
+            raise ValueError('Not an input trace')
+
+        index = len(InputTrace.MAGIC)
+        version, index = read_varint(data, index)
+        if version != InputTrace.VERSION:
+            raise ValueError(f'Unsupported input trace version {version}')
+
+        count, index = read_varint(data, index)
+        gpios = []
+        for _ in range(count):
+            gpio, index = read_varint(data, index)
+            gpios.append(gpio)
+
+        self.analog_gpios = tuple(gpios)
+        self._data = data
+        self._start = index
+
+    def __iter__(self) -> Iterator[Tuple[int, int, array]]:
+        """
+        :return: `(elapsed, digital, analog)` for each record. The elapsed time is in us since the first record, and
+            the analog values are in the order of `analog_gpios`. The same array is updated for every record.
+        """
+        data = self._data
+        index = self._start
+        elapsed = 0
+        digital = 0
+        analog = array('H', [0] * len(self.analog_gpios))
+
+        while index < len(data):
+            delta, index = read_varint(data, index)
+            changed_digital, index = read_varint(data, index)
+            changed_analog, index = read_varint(data, index)
+
+            elapsed += delta
+            digital ^= changed_digital
+            channel = 0
+            while changed_analog:
+                if changed_analog & 1:
+                    change, index = read_varint(data, index)
+                    analog[channel] += unzigzag(change)
+                changed_analog >>= 1
+                channel += 1
+
+            yield elapsed, digital, analog
@@ -0,0 +1,38 @@
+class LatencyStats:
+    """
+    Running statistics of the time from detecting a pin change to the end of its callbacks, in microseconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.minimum = 0
+        self.maximum = 0
+        self.total = 0
+        self.last = 0
+
+    def record(self, latency: int) -> None:
+        """
+        :param latency: Time in us from the sample pass that detected the change to the end of its callbacks
+        """
+        if not self.count or latency < self.minimum:
+            self.minimum = latency
+        if latency > self.maximum:
+            self.maximum = latency
+        self.count += 1
+        self.total += latency
+        self.last = latency
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self) -> None:
+        self.count = 0
+        self.minimum = 0
+        self.maximum = 0
+        self.total = 0
+        self.last = 0
+
+    def __str__(self) -> str:
+        return (f'{self.count} events, latency min {self.minimum} us, avg {self.average:.1f} us, '
+                f'max {self.maximum} us')
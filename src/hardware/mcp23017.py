@@ -48,12 +48,21 @@ _MCP_IOCON_SEQOP = 32
 _MCP_IOCON_MIRROR = 64
 _MCP_IOCON_BANK = 128
 
+# registers kept in a shadow copy in ram, in the order they are flushed
+# the output latch is flushed before the direction so a pin switched to output starts at its new value
+_MCP_SHADOWED = (_MCP_GPPU, _MCP_OLAT, _MCP_IODIR)
+
+# configuration registers only change when written, so they are cached write-through and only read from the chip once
+_MCP_CACHED = (_MCP_IODIR, _MCP_IPOL, _MCP_GPINTEN, _MCP_DEFVAL, _MCP_INTCON, _MCP_IOCON, _MCP_GPPU, _MCP_OLAT)
+
 
 class Port:
     # represents one of the two 8-bit ports
     def __init__(self, port, mcp):
         self._port = port & 1  # 0=PortA, 1=PortB
         self._mcp = mcp
+        # cached copy of the configuration registers, filled on first read or write
+        self._shadow = {}
 
     def _which_reg(self, reg):
         if self._mcp._config & 0x80 == 0x80:
@@ -69,12 +78,37 @@ class Port:
         else:
             setattr(self, reg, getattr(self, reg) & ~bit)
 
-    def _read(self, reg):
-        return self._mcp._i2c.readfrom_mem(self._mcp._address, self._which_reg(reg), 1)[0]
+    def _read(self, reg, sampled=False):
+        # cached registers are only read from the chip once
+        if reg in self._shadow:
+            return self._shadow[reg]
+        # reads made by the sampling pass use their own buffer, see MCP23017.__init__
+        buf = self._mcp._read1 if sampled else self._mcp._buf1
+        self._mcp._i2c.readfrom_mem_into(self._mcp._address, self._which_reg(reg), buf)
+        self._mcp.transactions += 1
+        val = buf[0]
+        if reg in _MCP_CACHED:
+            self._shadow[reg] = val
+        return val
 
     def _write(self, reg, val):
         val &= 0xff
-        self._mcp._i2c.writeto_mem(self._mcp._address, self._which_reg(reg), bytearray([val]))
+        # writing to gpio modifies the output latch
+        shadow_reg = _MCP_OLAT if reg == _MCP_GPIO else reg
+        if shadow_reg in _MCP_CACHED:
+            self._mcp._cache(shadow_reg, self._port, val)
+            # with deferred writes the shadow is written to the chip on the next flush
+            if self._mcp.deferred_writes and shadow_reg in _MCP_SHADOWED:
+                # a flush in between the get and the store takes the register with the new shadow value already in
+                # it, so at worst the register is written again by the next flush. the dict is never replaced, so
+                # the bit can't be stored into a dict that was already flushed
+                dirty = self._mcp._dirty
+                dirty[shadow_reg] = dirty.get(shadow_reg, 0) | (1 << self._port)
+                return
+        buf = self._mcp._buf1
+        buf[0] = val
+        self._mcp._i2c.writeto_mem(self._mcp._address, self._which_reg(reg), buf)
+        self._mcp.transactions += 1
         # if writing to the config register, make a copy in mcp so that it knows
         # which bank you're using for subsequent writes
         if reg == _MCP_IOCON:
@@ -174,31 +208,152 @@ def _flip_bit(value, condition, bit):
 
 
 class MCP23017:
-    def __init__(self, i2c, address=0x20):
+    def __init__(self, i2c, address=0x20, devices=None):
         self._i2c = i2c
         self._address = address
+        # addresses found by a bus scan shared with the other devices, the bus is scanned by init when not given
+        self._devices = devices
         self._config = 0x00
         self._virtual_pins = {}
+        # when enabled, writes to IODIR, GPPU and OLAT only update the shadow registers until flush() is called
+        self.deferred_writes = False
+        self._dirty = {}
+        # set while flush() runs, a flush from a timer callback in the middle of it is left to the running one
+        self._flushing = False
+        # number of i2c transactions made with the chip
+        self.transactions = 0
+        # transfer buffers allocated once, every read and write goes through a view of the right length
+        # so the bus transactions don't allocate on the heap
+        self._buffer = bytearray(4)
+        view = memoryview(self._buffer)
+        self._buf1 = view[:1]
+        self._buf2 = view[:2]
+        self._buf4 = view[:4]
+        # read_gpio and read_interrupt can run in a timer callback or on the other core in the middle of a
+        # config write or a flush, so they read into a buffer of their own
+        self._read_buffer = bytearray(4)
+        view = memoryview(self._read_buffer)
+        self._read1 = view[:1]
+        self._read2 = view[:2]
+        self._read4 = view[:4]
+        # flush runs from the sampling timer as well as the main loop, so it writes from a buffer of its own
+        self._flush_buffer = bytearray(2)
+        view = memoryview(self._flush_buffer)
+        self._flush1 = view[:1]
+        self._flush2 = view[:2]
         self.init()
 
     def init(self):
         # error if device not found at i2c addr
-        if self._i2c.scan().count(self._address) == 0:
+        devices = self._i2c.scan() if self._devices is None else self._devices
+        if devices.count(self._address) == 0:
             raise OSError('MCP23017 not found at I2C address {:#x}'.format(self._address))
 
         self.porta = Port(0, self)
         self.portb = Port(1, self)
 
-        self.io_config = 0x00  # io expander configuration - same on both ports, only need to write once
-
         # Reset to all inputs with no pull-ups and no inverted polarity.
-        self.mode = 0xFFFF  # in/out direction (0=out, 1=in)
-        self.input_polarity = 0x0000  # invert port input polarity (0=normal, 1=invert)
-        self.interrupt_enable = 0x0000  # int on change pins (0=disabled, 1=enabled)
-        self.default_value = 0x0000  # default value for int on change
-        self.interrupt_compare_default = 0x0000  # int on change control (0=compare to prev val, 1=compare to def val)
-        self.pullup = 0x0000  # gpio weak pull up resistor - when configured as input (0=disabled, 1=enabled)
-        self.gpio = 0x0000  # port (0=logic low, 1=logic high)
+        # iocon keeps its value through a soft reset of the pico, so it is cleared first to put the chip back in
+        # bank=0 with sequential operation. it is at 0x0a in bank=0 and at 0x05 in bank=1, the other register each
+        # write lands on in the other bank is cleared by the burst anyway
+        self._config = 0x00  # io expander configuration - same on both ports
+        buf = self._buf1
+        buf[0] = 0x00
+        self._i2c.writeto_mem(self._address, _MCP_IOCON << 1, buf)
+        self._i2c.writeto_mem(self._address, _MCP_IOCON, buf)
+        self.transactions += 2
+        # the registers of both ports from IODIRA to OLATB are then written in a single burst. the interrupt flag and
+        # capture registers in the block are read only and ignore the write, and the gpio write sets the output latch
+        block = bytearray(2 * (_MCP_OLAT + 1))
+        block[0] = block[1] = 0xff  # in/out direction (0=out, 1=in)
+        self._i2c.writeto_mem(self._address, 0x00, block)
+        self.transactions += 1
+        for reg in _MCP_CACHED:
+            self.porta._shadow[reg] = block[reg << 1]
+            self.portb._shadow[reg] = block[(reg << 1) + 1]
+
+    def _paired(self):
+        # in bank=0 with sequential operation enabled the A and B registers are adjacent,
+        # so both ports of a register are read or written with a single 2-byte transaction.
+        # in bank=1 the ports are 0x10 apart and each port takes its own transaction
+        return not self._config & (_MCP_IOCON_BANK | _MCP_IOCON_SEQOP)
+
+    def _cache(self, reg, port, val):
+        # the config register is shared between both ports
+        if reg == _MCP_IOCON:
+            self.porta._shadow[reg] = val
+            self.portb._shadow[reg] = val
+        else:
+            (self.portb if port else self.porta)._shadow[reg] = val
+
+    def _read_pair(self, reg, sampled=False):
+        # read a register of both ports, port a in the low byte
+        shadow_a = self.porta._shadow
+        shadow_b = self.portb._shadow
+        if reg in shadow_a and reg in shadow_b:
+            return shadow_a[reg] | (shadow_b[reg] << 8)
+        if not self._paired():
+            return self.porta._read(reg, sampled) | (self.portb._read(reg, sampled) << 8)
+        data = self._read2 if sampled else self._buf2
+        self._i2c.readfrom_mem_into(self._address, self.porta._which_reg(reg), data)
+        self.transactions += 1
+        if reg in _MCP_CACHED:
+            shadow_a[reg] = data[0]
+            shadow_b[reg] = data[1]
+        return data[0] | (data[1] << 8)
+
+    def _write_pair(self, reg, val):
+        # write a register of both ports, port a in the low byte
+        shadow_reg = _MCP_OLAT if reg == _MCP_GPIO else reg
+        if not self._paired() or (self.deferred_writes and shadow_reg in _MCP_SHADOWED):
+            self.porta._write(reg, val)
+            self.portb._write(reg, val >> 8)
+            return
+        low = val & 0xff
+        high = (val >> 8) & 0xff
+        data = self._buf2
+        data[0] = low
+        data[1] = high
+        self._i2c.writeto_mem(self._address, self.porta._which_reg(reg), data)
+        self.transactions += 1
+        if shadow_reg in _MCP_CACHED:
+            self.porta._shadow[shadow_reg] = low
+            self.portb._shadow[shadow_reg] = high
+        # the write replaces anything still waiting for a flush
+        self._dirty.pop(shadow_reg, None)
+
+    def flush(self):
+        # write the shadow registers changed since the last flush to the chip
+        # both ports of a register are written with a single transaction when they are adjacent
+        # a flush called in the middle of another one, from a timer callback, returns right away and leaves the
+        # registers to the running flush or the next one, so the registers are still written in order
+        if self._flushing or not self._dirty:
+            return
+        self._flushing = True
+        try:
+            paired = self._paired()
+            dirty = self._dirty
+            for reg in _MCP_SHADOWED:
+                # each register is taken out of the dirty set before its shadow is written, a write made in
+                # between marks it again for the next flush
+                ports = dirty.pop(reg, 0)
+                if not ports:
+                    continue
+                if paired:
+                    data = self._flush2
+                    data[0] = self.porta._shadow[reg]
+                    data[1] = self.portb._shadow[reg]
+                    self._i2c.writeto_mem(self._address, self.porta._which_reg(reg), data)
+                    self.transactions += 1
+                else:
+                    for port in (self.porta, self.portb):
+                        if ports & (1 << port._port):
+                            data = self._flush1
+                            data[0] = port._shadow[reg]
+                            self._i2c.writeto_mem(self._address, port._which_reg(reg), data)
+                            self.transactions += 1
+        finally:
+            self._flushing = False
 
     def config(self, interrupt_polarity=None, interrupt_open_drain=None, sda_slew=None, sequential_operation=None,
                interrupt_mirror=None, bank=None):
@@ -250,7 +405,7 @@ class MCP23017:
         if value is not None:
             # 0: Pin is set to logic low
             # 1: Pin is set to logic high
-            port._flip_property_bit('gpio', value & 1, bit)
+            port._flip_property_bit('output_latch', value & 1, bit)
         if pullup is not None:
             # 0: Weak pull-up 100k ohm resistor disabled
             # 1: Weak pull-up 100k ohm resistor enabled
@@ -274,6 +429,22 @@ class MCP23017:
         if value is None:
             return port.gpio & bit == bit
 
+    def read_gpio(self):
+        # read the gpio of both ports, port a in the low byte
+        return self._read_pair(_MCP_GPIO, True)
+
+    def read_interrupt(self):
+        # read the interrupt flags and the captured gpio of both ports, port a in the low byte
+        # returns (flags, captured). reading the captured values clears the interrupt
+        # in bank=0 with sequential operation enabled INTFA, INTFB, INTCAPA and INTCAPB are adjacent,
+        # so all four are read with a single 4-byte transaction
+        if not self._paired():
+            return self._read_pair(_MCP_INTF, True), self._read_pair(_MCP_INTCAP, True)
+        data = self._read4
+        self._i2c.readfrom_mem_into(self._address, self.porta._which_reg(_MCP_INTF), data)
+        self.transactions += 1
+        return data[0] | (data[1] << 8), data[2] | (data[3] << 8)
+
     def interrupt_triggered_gpio(self, port):
         # which gpio triggered the interrupt
         # only 1 bit will be set
@@ -289,52 +460,47 @@ class MCP23017:
     # mode (IODIR register)
     @property
     def mode(self):
-        return self.porta.mode | (self.portb.mode << 8)
+        return self._read_pair(_MCP_IODIR)
 
     @mode.setter
     def mode(self, val):
-        self.porta.mode = val
-        self.portb.mode = (val >> 8)
+        self._write_pair(_MCP_IODIR, val)
 
     # input_polarity (IPOL register)
     @property
     def input_polarity(self):
-        return self.porta.input_polarity | (self.portb.input_polarity << 8)
+        return self._read_pair(_MCP_IPOL)
 
     @input_polarity.setter
     def input_polarity(self, val):
-        self.porta.input_polarity = val
-        self.portb.input_polarity = (val >> 8)
+        self._write_pair(_MCP_IPOL, val)
 
     # interrupt_enable (GPINTEN register)
     @property
     def interrupt_enable(self):
-        return self.porta.interrupt_enable | (self.portb.interrupt_enable << 8)
+        return self._read_pair(_MCP_GPINTEN)
 
     @interrupt_enable.setter
     def interrupt_enable(self, val):
-        self.porta.interrupt_enable = val
-        self.portb.interrupt_enable = (val >> 8)
+        self._write_pair(_MCP_GPINTEN, val)
 
     # default_value (DEFVAL register)
     @property
     def default_value(self):
-        return self.porta.default_value | (self.portb.default_value << 8)
+        return self._read_pair(_MCP_DEFVAL)
 
     @default_value.setter
     def default_value(self, val):
-        self.porta.default_value = val
-        self.portb.default_value = (val >> 8)
+        self._write_pair(_MCP_DEFVAL, val)
 
     # interrupt_compare_default (INTCON register)
     @property
     def interrupt_compare_default(self):
-        return self.porta.interrupt_compare_default | (self.portb.interrupt_compare_default << 8)
+        return self._read_pair(_MCP_INTCON)
 
     @interrupt_compare_default.setter
     def interrupt_compare_default(self, val):
-        self.porta.interrupt_compare_default = val
-        self.portb.interrupt_compare_default = (val >> 8)
+        self._write_pair(_MCP_INTCON, val)
 
     # io_config (IOCON register)
     # This register is duplicated in each port. Changing one changes both.
@@ -349,44 +515,41 @@ class MCP23017:
     # pullup (GPPU register)
     @property
     def pullup(self):
-        return self.porta.pullup | (self.portb.pullup << 8)
+        return self._read_pair(_MCP_GPPU)
 
     @pullup.setter
     def pullup(self, val):
-        self.porta.pullup = val
-        self.portb.pullup = (val >> 8)
+        self._write_pair(_MCP_GPPU, val)
 
     # interrupt_flag (INTF register)
     # read only
     @property
     def interrupt_flag(self):
-        return self.porta.interrupt_flag | (self.portb.interrupt_flag << 8)
+        return self._read_pair(_MCP_INTF)
 
     # interrupt_captured (INTCAP register)
     # read only
     @property
     def interrupt_captured(self):
-        return self.porta.interrupt_captured | (self.portb.interrupt_captured << 8)
+        return self._read_pair(_MCP_INTCAP)
 
     # gpio (GPIO register)
     @property
     def gpio(self):
-        return self.porta.gpio | (self.portb.gpio << 8)
+        return self._read_pair(_MCP_GPIO)
 
     @gpio.setter
     def gpio(self, val):
-        self.porta.gpio = val
-        self.portb.gpio = (val >> 8)
+        self._write_pair(_MCP_GPIO, val)
 
     # output_latch (OLAT register)
     @property
     def output_latch(self):
-        return self.porta.output_latch | (self.portb.output_latch << 8)
+        return self._read_pair(_MCP_OLAT)
 
     @output_latch.setter
     def output_latch(self, val):
-        self.porta.output_latch = val
-        self.portb.output_latch = (val >> 8)
+        self._write_pair(_MCP_OLAT, val)
 
     # list interface
     # mcp[pin] lazy creates a VirtualPin(pin, port)
@@ -414,8 +577,9 @@ class VirtualPin():
 
     def value(self, val=None):
         # if val, write, else read
+        # writes modify the shadow of the output latch, so they don't need to read the port first
         if val is not None:
-            self._port.gpio = self._flip_bit(self._port.gpio, val & 1)
+            self._port.output_latch = self._flip_bit(self._port.output_latch, val & 1)
         else:
             return self._get_bit(self._port.gpio)
 
@@ -429,4 +593,4 @@ class VirtualPin():
         # if val, write, else read
         self._port.mode = self._flip_bit(self._port.mode, 0)  # mode = output
         if val is not None:
-            self._port.gpio = self._flip_bit(self._port.gpio, val & 1)
+            self._port.output_latch = self._flip_bit(self._port.output_latch, val & 1)
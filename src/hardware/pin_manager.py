@@ -1,15 +1,54 @@
-from typing import Dict, Union, Callable
+from typing import Dict, Union, Callable, Tuple, Sequence, Optional, List, TYPE_CHECKING
+import _thread
 import machine
+import time
+from loggers.log import Log
 from pubsub.publisher import Publisher
+from util import gcd
 
-from .mcp23017 import MCP23017
+from .mcp23017 import MCP23017, Port
 from .adcmux import AdcMux
+from .analog_filter import AnalogFilter
+from .bus_worker import BusWorker
+from .debouncer import Debouncer
+from .input_trace import TraceRecorder
+from .latency_stats import LatencyStats
+from .sample_group import SampleGroup
+from .sample_telemetry import SampleTelemetry
+from .snapshot_buffer import Snapshot, SnapshotBuffer
+
+if TYPE_CHECKING:
+    from .startup import Startup
+
+
+class _OutputBatch:
+    """
+    Context manager returned by `PinManager.batch`. Batches can be nested, the outputs are committed when the outermost
+    batch exits.
+    """
+
+    def __init__(self, pin_manager: 'PinManager'):
+        self._pin_manager = pin_manager
+
+    def __enter__(self) -> 'PinManager':
+        self._pin_manager._batch_depth += 1
+        return self._pin_manager
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        pin_manager = self._pin_manager
+        pin_manager._batch_depth -= 1
+        if pin_manager._batch_depth == 0:
+            pin_manager._commit_batch()
+        return False
 
 
 class PinManager:
     """
     The PinManager is responsible for accessing, updating, and handing out pins on the shuttle control module. The pin
     manager takes care of routing communication through the digital and analog input/output expander chips.
+
+    Listeners are called with the `pin`, its new `value`, and the `timestamp` from `time.ticks_us` of the sample pass
+    or interrupt that detected the change.
     """
 
     class Event:
@@ -18,26 +57,194 @@ class PinManager:
         DIGITAL_CHANGE = 'PinManager.DigitalChange'
         ANALOG_CHANGE = 'PinManager.AnalogChange'
 
-    def __init__(self, i2c: machine.I2C):
+    class SampleMode:
+        PER_PIN = 'PinManager.SampleMode.PerPin'
+        """Read every digital pin individually, one bus transaction for each expander pin."""
+        SNAPSHOT = 'PinManager.SampleMode.Snapshot'
+        """Read both ports of each expander in one transaction and the local pins once, into a single state word."""
+        INTERRUPT = 'PinManager.SampleMode.Interrupt'
+        """Update the digital pins from the expander INT lines and local pin interrupts instead of polling them."""
+
+    PIN_COUNT = 64
+    """Number of GPIO pins on the shuttle control module, numbered 1 -> 64."""
+
+    EXPANDER_GPIOS = (1, 17, 49)
+    """First gpio of the 16 pins on each expander."""
+    EXPANDER_ADDRESSES = (0x20, 0x21, 0x22)
+    """Default address of each expander."""
+
+    def __init__(self, i2c: machine.I2C, sample_mode: str = SampleMode.SNAPSHOT, sample_rate: int = 50,
+                 interrupt_pins: Sequence[int] = None, debounce_samples: int = 1, startup: 'Startup' = None,
+                 devices: Dict[int, Tuple[machine.I2C, int]] = None, adc_mux: AdcMux = None):
+        """
+        :param i2c: I2C bus that the digital input/output expanders are connected to
+        :param sample_mode: How the digital pins are read each sampling cycle, one of `PinManager.SampleMode`
+        :param sample_rate: Period in ms between sampling the pins for state changes. Pins can be sampled on their own
+            period with `add_sample_group`.
+        :param interrupt_pins: Pico pins wired to the INTA/INTB output of the expanders for gpio 1 -> 16, 17 -> 32,
+            and 49 -> 64. Required when using `PinManager.SampleMode.INTERRUPT`.
+        :param debounce_samples: Number of samples in a row a digital pin has to hold a new value before the change is
+            published. 1 publishes every change. Can be set for each pin with `set_debounce`.
+        :param startup: Initialize the expanders as steps of a `Startup`, in the waits of the other devices on the bus
+        :param devices: The `(i2c, address)` of each expander by its first gpio, 1, 17, or 49. Expanders can be spread
+            over both I2C controllers, the ones not on `i2c` can be sampled in parallel, see `start_bus_worker`.
+            Defaults to all three expanders on `i2c` at their `EXPANDER_ADDRESSES`.
+        :param adc_mux: The analog multiplexer of the analog pins 1 -> 16, on ADC 0 since ADC 1 and 2 are the local
+            analog pins 47 and 48. Without it the pins 1 -> 16 have no analog input and no select line is driven.
+        """
         self.publisher = Publisher()
 
         self.i2c = i2c
+        # A client of an `I2cArbiter` is held for each sampling pass, see `_hold_bus`
+        self._bus_acquire = getattr(i2c, 'acquire', None)
+        self._bus_release = getattr(i2c, 'release', None)
+        # Sampling passes put off to the next tick because the bus was held by the code the timer interrupted
+        self.skipped_passes = 0
+        # Expander interrupts that found the bus held, read by the next sampling pass
+        self._missed_interrupts = 0
+
+        if devices is None:
+            devices = {gpio: (i2c, address)
+                       for gpio, address in zip(PinManager.EXPANDER_GPIOS, PinManager.EXPANDER_ADDRESSES)}
+        self.devices = devices
+        self.pins1to16, self.pins17to32, self.pins49to64 = self._init_expanders(startup)
+
+        # Expanders and the shift of their 16 pins in the digital state word, and the ones on another bus than `i2c`
+        self._expanders = ((self.pins1to16, 0), (self.pins17to32, 16), (self.pins49to64, 48))
+        self._remote_expanders = tuple((expander, shift) for (expander, shift), gpio
+                                       in zip(self._expanders, PinManager.EXPANDER_GPIOS) if devices[gpio][0] is not i2c)
+        self._local_expanders = tuple(entry for entry in self._expanders if entry not in self._remote_expanders)
+        self._bus_worker: Optional[BusWorker] = None
+        # Expanders flushed by this core. While the bus worker runs it is the one owner of the flush of the expanders
+        # on its bus, see `start_bus_worker`
+        self._flushed_expanders = self._expanders
+
+        # Output, direction, and pull-up changes are kept in the expander shadow registers and written once per
+        # sampling cycle, see `flush`
+        for expander, _ in self._expanders:
+            expander.deferred_writes = True
+
+        # Open `batch` blocks, and the local pin values and modes that are held back until the outermost block exits
+        self._batch_depth = 0
+        self._batched_values: Dict[machine.Pin, int] = {}
+        self._batched_modes: Dict[machine.Pin, int] = {}
 
-        self.pins1to16 = MCP23017(0x20, i2c)
-        self.pins17to32 = MCP23017(0x21, i2c)
-        self.pins49to64 = MCP23017(0x22, i2c)
-        self.adc = AdcMux(1, 0, 0, 0, 0)
+        if adc_mux is not None and adc_mux.ain_channel in (1, 2):
+            raise ValueError(f'ADC {adc_mux.ain_channel} is a local analog pin, the multiplexer needs ADC 0')
+        self.adc: Optional[AdcMux] = adc_mux
         self.local_pins: Dict[int, Union[machine.Pin, machine.ADC]] = {}  # Holds the gpio 33 -> 48
+        self._init_local_io()
 
-        # Sampling for reading pin inputs and monitoring for changes
-        self._sample_rate = 50  # ms
-        self.sample_timer = machine.Timer(period=self._sample_rate, callback=self._sample_pins)
+        # Routing tables from the gpio 1 -> 64 to the `(device, port, bit)` that the pin lives on, and from the
+        # multiplexer channels to their gpio, see `_init_routes`
+        self._routes: Tuple[Optional[Tuple[object, Optional[Port], int]], ...] = ()
+        self._analog_routes: Tuple[Optional[Tuple[object, Optional[Port], int]], ...] = ()
+        self._mux_gpios: Tuple[int, ...] = ()
+        self._init_routes()
+
+        # Local digital pins and the bit they occupy in the digital state word
+        self._local_digital_pins = tuple((1 << (gpio - 1), self.local_pins[gpio]) for gpio in range(33, 47))
+
+        # Previous digital pin states packed into a 64-bit word, bit `gpio - 1` holds the GPIO pin value
+        self.digital_state = 0
 
-        # Initialize a dictionary of previous digital and analog pin states
-        self.digital_pins = {key: 0 for key in range(1, 65)}
+        # Integrating debounce of the sampled digital pins, see `set_debounce`
+        self.debouncer = Debouncer(PinManager.PIN_COUNT, debounce_samples)
+
+        # Initialize a dictionary of previous analog pin states
         self.analog_pins = {key: 0.0 for key in range(1, 17)}
 
+        # Oversampling, deadband, and hysteresis of the analog pins, see `set_analog_filter`
+        self.analog_filter = AnalogFilter()
+
+        # Bound once so scanning the multiplexer doesn't allocate a new method object every cycle
+        self._mux_callback = self._on_mux_sample
+        self._mux_timestamp = 0
+
+        # Time from detecting a change to the end of its callbacks, and the timing of the sampling passes
+        self.latency = LatencyStats()
+        self.telemetry = SampleTelemetry()
+
+        # Recording of the pin states of every pass that changed a pin, see `start_trace`
+        self.trace: Optional[TraceRecorder] = None
+
+        # Interned integer topics for every event on every pin. Topics are looked up by pin when an edge is detected
+        # so publishing does not build or compare any strings.
+        self._event_ids: Dict[str, Tuple[int, ...]] = {}
+        events = (PinManager.Event.DIGITAL_RISING, PinManager.Event.DIGITAL_FALLING, PinManager.Event.DIGITAL_CHANGE,
+                  PinManager.Event.ANALOG_CHANGE)
+        for index, event in enumerate(events):
+            offset = index * (PinManager.PIN_COUNT + 1)
+            self._event_ids[event] = tuple(offset + pin for pin in range(PinManager.PIN_COUNT + 1))
+
+        self._rising_ids = self._event_ids[PinManager.Event.DIGITAL_RISING]
+        self._falling_ids = self._event_ids[PinManager.Event.DIGITAL_FALLING]
+        self._change_ids = self._event_ids[PinManager.Event.DIGITAL_CHANGE]
+        self._analog_change_ids = self._event_ids[PinManager.Event.ANALOG_CHANGE]
+
+        # Sampling for reading pin inputs and monitoring for changes
+        self.sample_mode = sample_mode
+        self._sample_rate = sample_rate  # ms
+
+        # Every pin belongs to one sample group. The default groups hold the pins that were not given their own period.
+        self._all_digital_pins = SampleGroup('all', sample_rate, (1 << PinManager.PIN_COUNT) - 1)
+        self._all_digital_pins.scan_mask = self._all_digital_pins.digital_mask
+        self._all_digital_pins.expanders = self._local_expanders
+        self._all_digital_pins.remote_expanders = self._remote_expanders
+        self._all_digital_pins.local_pins = self._local_digital_pins
+
+        # Pins that have subscribers. Only these pins are sampled, see `_update_scan_set`.
+        self._scanned_digital = 0
+        self._scanned_analog = 0
+
+        self._sample_groups: List[SampleGroup] = []
+        self._tick = sample_rate  # ms
+        self.sample_timer: Optional[machine.Timer] = None
+        self.add_sample_group(SampleGroup.DIGITAL, sample_rate, digital_pins=range(1, PinManager.PIN_COUNT + 1))
+        self.add_sample_group(SampleGroup.ANALOG, sample_rate,
+                              analog_pins=tuple(gpio for gpio in range(1, PinManager.PIN_COUNT + 1)
+                                                if self._analog_routes[gpio] is not None))
+
+        if sample_mode == PinManager.SampleMode.INTERRUPT:
+            self._init_interrupts(interrupt_pins)
+        self.sample_timer = machine.Timer(period=self._tick, callback=self._sample_pins)
+
+        # Sampling on the second core, see `start_second_core`. The bus lock is held for every I2C transaction while the
+        # second core is sampling.
+        self.bus_lock = _thread.allocate_lock()
+        self._snapshots: Optional[SnapshotBuffer] = None
+        self._working: Optional[Snapshot] = None
+        self._received: Optional[Snapshot] = None
+        self._core1_running = False
+        self._core1_stopped = True
+        # Pins seeded by `_seed_digital_pin` while the second core is sampling, and the sequence of the last snapshot
+        # that can still hold their old value
+        self._seeded = 0
+        self._seed_sequence = 0
+
     # ---- Private Methods ---------------------------------------------------------------------------------------------
+    def _init_expanders(self, startup: 'Startup' = None) -> List[MCP23017]:
+        """
+        Create the expanders of the device map. Each bus is scanned once for all the expanders on it.
+        """
+        scans = []
+        expanders = []
+        for gpio in PinManager.EXPANDER_GPIOS:
+            i2c, address = self.devices[gpio]
+            found = None
+            for bus, addresses in scans:
+                if bus is i2c:
+                    found = addresses
+            if found is None:
+                found = startup.devices if startup is not None and i2c is startup.i2c else i2c.scan()
+                scans.append((i2c, found))
+
+            if startup is None:
+                expanders.append(MCP23017(i2c, address, found))
+            else:
+                expanders.append(startup.run(f'MCP23017 {address:#x}', MCP23017, i2c, address, found))
+        return expanders
+
     def _init_local_io(self):
         for gpio in range(33, 42 + 1):
             pin = gpio - 27  # Pin offset for the first section of IO pins
@@ -53,78 +260,116 @@ class PinManager:
         self.local_pins[47] = a1
         self.local_pins[48] = a2
 
+    def _init_routes(self) -> None:
+        """
+        Build the routing tables that map each gpio to the device, port, and bit that the pin is on. This is the one
+        place that knows the pin layout of the module, all pin access indexes into these tables.
+
+        Digital routes are `(expander, port, bit mask)` for expander pins and `(pin, None, 0)` for the local pins.
+        Analog routes are `(adc_mux, None, channel)` for the multiplexed channels when there is a multiplexer and
+        `(adc, None, 0)` for the two local ADC pins. Pins without a route have `None`.
+        """
+        routes = [None] * (PinManager.PIN_COUNT + 1)
+        for expander, first_gpio in ((self.pins1to16, 1), (self.pins17to32, 17), (self.pins49to64, 49)):
+            for pin in range(16):
+                port = expander.portb if pin // 8 else expander.porta
+                routes[first_gpio + pin] = (expander, port, 1 << (pin % 8))
+
+        for gpio in range(33, 47):
+            routes[gpio] = (self.local_pins[gpio], None, 0)
+
+        analog_routes = [None] * (PinManager.PIN_COUNT + 1)
+        mux_gpios = [0] * AdcMux.CHANNEL_COUNT
+        for channel in range(AdcMux.CHANNEL_COUNT):
+            if self.adc is not None:
+                analog_routes[channel + 1] = (self.adc, None, channel)
+            mux_gpios[channel] = channel + 1
+
+        analog_routes[47] = (self.local_pins[47], None, 0)
+        analog_routes[48] = (self.local_pins[48], None, 0)
+
+        self._routes = tuple(routes)
+        self._analog_routes = tuple(analog_routes)
+        self._mux_gpios = tuple(mux_gpios)
+
+    def _init_interrupts(self, interrupt_pins: Sequence[int]) -> None:
+        """
+        Configure the expanders to raise their interrupt line when any input changes and attach the interrupt handlers
+        for the expanders and the local digital pins.
+        """
+        if interrupt_pins is None or len(interrupt_pins) != len(self._expanders):
+            raise ValueError(f'Interrupt sampling requires the INT pin of all {len(self._expanders)} expanders')
+
+        self._interrupt_pins = []
+        for index, ((expander, shift), pin_id) in enumerate(zip(self._expanders, interrupt_pins)):
+            # INTA and INTB are mirrored onto one open drain, active low line. Pins with subscribers interrupt when
+            # they change from their previous value.
+            expander.config(interrupt_mirror=True, interrupt_open_drain=True)
+            expander.interrupt_compare_default = 0x0000
+            expander.interrupt_enable = (self._scanned_digital >> shift) & 0xFFFF
+
+            pin = machine.Pin(pin_id, mode=machine.Pin.IN, pull=machine.Pin.PULL_UP)
+            pin.irq(handler=lambda _, i=index: self._on_expander_interrupt(i),
+                    trigger=machine.Pin.IRQ_FALLING)
+            self._interrupt_pins.append(pin)
+
+        for bit, pin in self._local_digital_pins:
+            pin.irq(handler=lambda p, b=bit: self._on_local_interrupt(p, b),
+                    trigger=machine.Pin.IRQ_FALLING | machine.Pin.IRQ_RISING)
+
+        # Reading the starting state clears any interrupt that is already pending, so every change from here on
+        # produces a new falling edge on the interrupt lines
+        self._sample_digital_pins(timestamp=time.ticks_us())
+
     # ---- Digital Pin Logic -------------------------------------------------------------------------------------------
 
     def set_pin_mode(self, gpio: int, mode: int) -> None:
         """
-        Set the pin mode of a pin on the chip
+        Set the pin mode of a pin on the chip. Expander pin modes are written to the chip on the next `flush`.
 
         :param gpio: Pin number for GPIO 1 -> 64
         :param mode: 1 = input pin, 0 = output pin
         """
-        if gpio <= 0:
+        if not 0 < gpio <= PinManager.PIN_COUNT or mode not in (0, 1):
             return
 
-        elif gpio <= 16:
-            pin = gpio - 1
-            self.pins1to16.pin(pin, mode)
-
-        elif gpio <= 32:
-            pin = gpio - 17
-            self.pins17to32.pin(pin, mode)
-
-        # Local Pins
-        elif gpio <= 46:
-            if mode == 1:
-                pin_mode = machine.Pin.IN
-            elif mode == 0:
-                pin_mode = machine.Pin.OUT
-            else:
-                return
-
-            self.local_pins[gpio].mode(pin_mode)
-
         # Don't need to handle setting the mode for the ADC Pins
-        elif gpio == 47 or gpio == 48:
+        route = self._routes[gpio]
+        if route is None:
             return
 
-        elif gpio < 64:
-            pin = gpio - 49
-            self.pins49to64.pin(pin, mode)
-
+        device, port, bit = route
+        if port is None:
+            pin_mode = machine.Pin.IN if mode == 1 else machine.Pin.OUT
+            if self._batch_depth:
+                self._batched_modes[device] = pin_mode
+            else:
+                device.mode(pin_mode)
         else:
-            return
+            port._flip_property_bit('mode', mode, bit)
 
     def digital_write(self, gpio: int, value: int) -> None:
         """
-        Write to a digital GPIO pin.
+        Write to a digital GPIO pin. Expander pin values are written to the chip on the next `flush`.
         :param gpio:
         :param value:
         """
-        if gpio < 0:
+        if not 0 < gpio <= PinManager.PIN_COUNT:
             return
 
-        elif gpio <= 16:
-            pin = gpio - 1
-            self.pins1to16[pin].value(value)
-
-        elif gpio <= 32:
-            pin = gpio - 17
-            self.pins17to32[pin].value(value)
-
-        elif gpio <= 46:
-            self.local_pins[gpio].value(value)
-
         # Cannot write to the two analog pins
-        elif gpio <= 48:
+        route = self._routes[gpio]
+        if route is None:
             return
 
-        elif gpio <= 64:
-            pin = gpio - 49
-            self.pins49to64[pin].value(value)
-
+        device, port, bit = route
+        if port is None:
+            if self._batch_depth:
+                self._batched_values[device] = value
+            else:
+                device.value(value)
         else:
-            return
+            port._flip_property_bit('output_latch', value & 1, bit)
 
     def digital_read(self, gpio: int) -> int:
         """
@@ -134,133 +379,841 @@ class PinManager:
         :param gpio: The GPIO pin from the module
         :return: The pin value 0 - Low, 1 - High
         """
-        if gpio <= 0:
+        if self._snapshots is not None:
+            with self.bus_lock:
+                return self._read_pin(gpio)
+        return self._read_pin(gpio)
+
+    def _read_pin(self, gpio: int) -> int:
+        if not 0 < gpio <= PinManager.PIN_COUNT:
             return 0
 
-        elif gpio <= 16:
-            pin = gpio - 1
-            return self.pins1to16[pin].value()
+        # Analog pins don't have a digital read value
+        route = self._routes[gpio]
+        if route is None:
+            return 0
 
-        elif gpio <= 32:
-            pin = gpio - 17
-            return self.pins17to32[pin].value()
+        device, port, bit = route
+        if port is None:
+            return device.value()
+        return 1 if port.gpio & bit else 0
 
-        elif gpio <= 46:
-            return self.local_pins[gpio].value()
+    def set_debounce(self, pins: Sequence[int], samples: int) -> None:
+        """
+        Set how many samples in a row the digital pins have to hold a new value before the change is published. The
+        time that takes is `samples` times the period of the sample group that the pin is in. Pins in interrupt mode
+        are not debounced.
 
-        # Analog pins don't have a digital read value
-        elif gpio <= 48:
-            return 0
+        ... code-block:: python
 
-        elif gpio <= 64:
-            pin = gpio - 48
-            return self.pins49to64[pin].value()
+            pin_manager.add_sample_group('switches', 1, digital_pins=range(1, 17))
+            pin_manager.set_debounce(range(1, 17), 5)  # 5 ms
+
+        :param pins: GPIO pins 1 -> 64
+        :param samples: Number of stable samples, 1 publishes every change
+        """
+        for gpio in pins:
+            if not 0 < gpio <= PinManager.PIN_COUNT:
+                raise ValueError(f'GPIO {gpio} is not a digital pin')
+        self.debouncer.set_samples([gpio - 1 for gpio in pins], samples)
 
+    def flush(self) -> None:
+        """
+        Write the pending output, direction, and pull-up changes of the expanders to the chips. Each changed register
+        costs a single transaction per expander no matter how many of its pins changed. This is run at the start of
+        every sampling cycle. Holds `bus_lock` while the second core is sampling. While the bus worker runs, the
+        expanders on its bus are left to the worker and written at the start of the next sampling cycle.
+        """
+        if self._snapshots is not None:
+            with self.bus_lock:
+                self._flush_expanders()
         else:
-            return 0
+            self._flush_expanders()
+
+    def _flush_expanders(self) -> None:
+        for expander, _ in self._flushed_expanders:
+            expander.flush()
+
+    def batch(self) -> _OutputBatch:
+        """
+        Group output changes so they are committed together. Inside the block `digital_write` and `set_pin_mode` only
+        update the expander shadow registers and queue the local pin changes, the sampling cycle does not flush them.
+        When the block exits the pending registers are written with one transaction per changed register of each
+        expander, and then the local pins are updated.
+
+        ... code-block:: python
+
+            with pin_manager.batch():
+                for gpio in indicator_pins:
+                    pin_manager.digital_write(gpio, 1)
+
+        :return: Context manager for the batch
+        """
+        return _OutputBatch(self)
+
+    def _commit_batch(self) -> None:
+        """
+        Write the outputs collected by a `batch` block. Values are set before modes, so a pin that becomes an output
+        starts at its new value.
+        """
+        self.flush()
+
+        values, self._batched_values = self._batched_values, {}
+        modes, self._batched_modes = self._batched_modes, {}
+        for pin, value in values.items():
+            pin.value(value)
+        for pin, mode in modes.items():
+            pin.mode(mode)
 
     # ---- Analog Pin Logic --------------------------------------------------------------------------------------------
 
     def analog_read(self, gpio: int) -> int:
         """
-        Read the analog value from the
+        Read the analog value from the multiplexed analog pins 1 -> 16 or the local analog pins 47 and 48.
 
         :param gpio: The GPIO pin location of the analog read pins
         :return: Analog value from the ADC as an unsigned 16-bit integer
         """
-        if gpio in (47, 48):
-            self.local_pins[gpio].read_u16()
+        if not 0 < gpio <= PinManager.PIN_COUNT:
+            return 0
+
+        route = self._analog_routes[gpio]
+        if route is None:
+            return 0
+
+        device, _, channel = route
+        if device is self.adc:
+            return device.read(channel)
+        return device.read_u16()
+
+    # ---- Sample Scheduling -------------------------------------------------------------------------------------------
+
+    def add_sample_group(self, name: str, period: int, digital_pins: Sequence[int] = (),
+                         analog_pins: Sequence[int] = ()) -> SampleGroup:
+        """
+        Sample a group of pins on its own period. The pins are taken out of the group they were in before, so each pin
+        is only sampled by one group. Every sampling cycle only reads the groups that are due.
+
+        ... code-block:: python
+
+            pin_manager.add_sample_group('e-stop', 1, digital_pins=[36])
+            pin_manager.add_sample_group('pots', 100, analog_pins=range(1, 9))
+
+        :param name: Name of the group, used for the measured rates from `sample_rates`
+        :param period: Time in ms between samples of the group
+        :param digital_pins: Digital GPIO pins 1 -> 64 of the group
+        :param analog_pins: Analog GPIO pins 1 -> 16, 47, and 48 of the group
+        :return: The new sample group
+        """
+        if period <= 0:
+            raise ValueError(f'Sample group {name} needs a positive period, got {period}')
+        if any(group.name == name for group in self._sample_groups):
+            raise ValueError(f'Sample group {name} already exists')
+
+        digital_mask = 0
+        for gpio in digital_pins:
+            if not 0 < gpio <= PinManager.PIN_COUNT:
+                raise ValueError(f'GPIO {gpio} is not a digital pin')
+            if self._routes[gpio] is not None:
+                digital_mask |= 1 << (gpio - 1)
+
+        for gpio in analog_pins:
+            if not 0 < gpio <= PinManager.PIN_COUNT or self._analog_routes[gpio] is None:
+                raise ValueError(f'GPIO {gpio} is not an analog pin')
+
+        group = SampleGroup(name, period, digital_mask, tuple(analog_pins))
+        for other in self._sample_groups:
+            other.digital_mask &= ~digital_mask
+            other.analog_pins = tuple(gpio for gpio in other.analog_pins if gpio not in group.analog_pins)
+            self._assign_group_devices(other)
+
+        self._assign_group_devices(group)
+        self._sample_groups.append(group)
+        self._schedule_groups()
+        return group
+
+    def sample_group(self, name: str) -> Optional[SampleGroup]:
+        """
+        :param name: Name of the sample group
+        :return: The sample group or None when there is no group with that name
+        """
+        for group in self._sample_groups:
+            if group.name == name:
+                return group
+        return None
+
+    def sample_rates(self) -> Dict[str, float]:
+        """
+        Get the measured sampling rate of each group, to compare against the rate that was asked for with the group
+        period. The rate is 0 until the group has been sampled for a full `SampleGroup.RATE_WINDOW`.
+
+        :return: Sample rate in Hz of each group by name
+        """
+        return {group.name: group.rate for group in self._sample_groups}
+
+    def _assign_group_devices(self, group: SampleGroup) -> None:
+        """
+        Work out the pins of the group that have subscribers, and the expanders and local pins that need to be read to
+        sample them.
+        """
+        group.scan_mask = group.digital_mask & self._scanned_digital
+        group.analog_scan = tuple(gpio for gpio in group.analog_pins if self._scanned_analog >> gpio & 1)
+        expanders = tuple((expander, shift) for expander, shift in self._expanders if group.scan_mask >> shift & 0xFFFF)
+        group.expanders = tuple(entry for entry in expanders if entry in self._local_expanders)
+        group.remote_expanders = tuple(entry for entry in expanders if entry in self._remote_expanders)
+        group.local_pins = tuple((bit, pin) for bit, pin in self._local_digital_pins if group.scan_mask & bit)
+
+        group.mux_channels = 0
+        local_analog = []
+        for gpio in group.analog_scan:
+            device, _, channel = self._analog_routes[gpio]
+            if device is self.adc:
+                group.mux_channels |= 1 << channel
+            else:
+                local_analog.append((gpio, device))
+        group.local_analog = tuple(local_analog)
+
+    def _update_scan_set(self, gpio: int) -> None:
+        """
+        Start or stop sampling a pin after its subscriptions changed. Only the sample group holding the pin is worked
+        out again. In interrupt mode the interrupt-on-change of the expander pin follows the subscriptions instead.
+
+        :param gpio: The GPIO pin whose subscriptions changed
+        """
+        if not 0 < gpio <= PinManager.PIN_COUNT:
+            return
+
+        subscribers = self.publisher.subscribers
+        bit = 1 << (gpio - 1)
+        if (self._rising_ids[gpio] in subscribers or self._falling_ids[gpio] in subscribers
+                or self._change_ids[gpio] in subscribers):
+            scanned_digital = self._scanned_digital | bit
+        else:
+            scanned_digital = self._scanned_digital & ~bit
+
+        if self._analog_change_ids[gpio] in subscribers:
+            scanned_analog = self._scanned_analog | (1 << gpio)
+        else:
+            scanned_analog = self._scanned_analog & ~(1 << gpio)
+
+        if scanned_digital == self._scanned_digital and scanned_analog == self._scanned_analog:
+            return
+
+        # The pin has not been sampled while it had no subscribers, so its state is read before it joins the scan
+        if scanned_digital & ~self._scanned_digital:
+            self._seed_digital_pin(gpio)
+
+        self._scanned_digital = scanned_digital
+        self._scanned_analog = scanned_analog
+        for group in self._sample_groups:
+            if group.digital_mask & bit or gpio in group.analog_pins:
+                self._assign_group_devices(group)
+
+        route = self._routes[gpio]
+        if self.sample_mode == PinManager.SampleMode.INTERRUPT and route is not None and route[1] is not None:
+            for expander, shift in self._expanders:
+                if expander is route[0]:
+                    expander.interrupt_enable = (scanned_digital >> shift) & 0xFFFF
+
+    def _seed_digital_pin(self, gpio: int) -> None:
+        """
+        Set the state of a pin that is starting to be sampled from a single read, without publishing it. A pin that
+        already sat at its value before it was subscribed to then only publishes the changes made after that.
+
+        :param gpio: The GPIO pin joining the scan set
+        """
+        bit = 1 << (gpio - 1)
+        if self._snapshots is None:
+            value = bit if self._read_pin(gpio) else 0
+            self.debouncer.reset(bit)
+        else:
+            # The second core debounces into its working snapshot, and the snapshots it already made still have the
+            # old value, see `dispatch`
+            with self.bus_lock:
+                value = bit if self._read_pin(gpio) else 0
+                self.debouncer.reset(bit)
+                working = self._working
+                working.digital = (working.digital & ~bit) | value
+                self._seeded |= bit
+                self._seed_sequence = working.sequence
+        self.digital_state = (self.digital_state & ~bit) | value
+
+    def _schedule_groups(self) -> None:
+        """
+        Set the sampling cycle to the largest period that every group period is a multiple of, and work out how many
+        cycles each group waits between samples.
+        """
+        tick = 0
+        for group in self._sample_groups:
+            tick = gcd(tick, group.period)
+
+        for group in self._sample_groups:
+            group.interval = group.period // tick
+            group.countdown = min(group.countdown, group.interval)
+
+        if tick != self._tick:
+            self._tick = tick
+            if self.sample_timer is not None and self._snapshots is None:
+                self.sample_timer.init(period=tick, callback=self._sample_pins)
+
+    def set_analog_filter(self, pins: Sequence[int], oversample: int = 1, deadband: int = 0,
+                          hysteresis: int = 0) -> None:
+        """
+        Filter the readings of analog pins so `PinManager.Event.ANALOG_CHANGE` is only published for real movement
+        instead of ADC noise. Leaving every setting at its default publishes every change.
+
+        ... code-block:: python
+
+            # A joystick that publishes after moving more than ~0.4% of its range
+            pin_manager.set_analog_filter([1, 2], oversample=8, deadband=256, hysteresis=128)
+
+        :param pins: Analog GPIO pins 1 -> 16, 47, and 48
+        :param oversample: Number of readings averaged into each sample
+        :param deadband: Largest change from the last published value that is not published
+        :param hysteresis: Extra change needed on top of the deadband before publishing a change in the opposite
+            direction to the last one
+        """
+        for gpio in pins:
+            if not 0 < gpio <= PinManager.PIN_COUNT or self._analog_routes[gpio] is None:
+                raise ValueError(f'GPIO {gpio} is not an analog pin')
+        self.analog_filter.configure(pins, oversample, deadband, hysteresis)
+
+        # The multiplexer averages its own channels while they are selected
+        for gpio in pins:
+            device, _, channel = self._analog_routes[gpio]
+            if device is self.adc:
+                self.adc.oversample[channel] = oversample
+
+    def log_telemetry(self) -> None:
+        """
+        Print the sampling pass timing and the event latency with `Log.info`.
+        """
+        Log.info(str(self.telemetry))
+        Log.info(f'Events {self.latency}')
+
+    def start_trace(self, stream) -> TraceRecorder:
+        """
+        Record the pin states after every sampling pass that changed a pin into an input trace, so the session can be
+        replayed on the host emulation. The records are written to the stream by `dispatch`, so the main loop has to
+        call it.
+
+        ... code-block:: python
+
+            with open('session.trace', 'wb') as stream:
+                pin_manager.start_trace(stream)
+                space_team.run()
+                pin_manager.stop_trace()
+
+        :param stream: Binary stream the trace is written to
+        :return: The recorder
+        """
+        self.stop_trace()
+        self.trace = TraceRecorder(stream)
+        return self.trace
+
+    def stop_trace(self) -> None:
+        """
+        Stop recording and write the rest of the trace to its stream.
+        """
+        if self.trace is not None:
+            self.trace.flush()
+            self.trace = None
+
+    # ---- Second Core Sampling ----------------------------------------------------------------------------------------
+
+    def start_second_core(self) -> None:
+        """
+        Move the sampling loop onto the second core of the RP2040. The second core reads and debounces the pins on the
+        sample group periods and hands each pass to the first core as a snapshot, so slow callbacks or display updates
+        don't delay sampling. The events are published on the first core by calling `dispatch` from the main loop.
+
+        Everything else that uses the I2C bus of the expanders has to hold `bus_lock` around its transactions while the
+        second core is sampling, or use a client of the same `I2cArbiter` as the pin manager. Sample groups, debouncing,
+        and filters should be set up before starting.
+
+        ... code-block:: python
+
+            pin_manager.start_second_core()
+            while running:
+                pin_manager.dispatch()
+        """
+        if self.sample_mode == PinManager.SampleMode.INTERRUPT:
+            raise ValueError('Interrupt sampling runs on the core that handles the interrupts')
+        if self._bus_worker is not None:
+            raise ValueError('The second core is running the bus worker')
+        if self._snapshots is not None:
+            return
+
+        self.sample_timer.deinit()
+
+        analog_count = PinManager.PIN_COUNT + 1
+        self._working = Snapshot(analog_count)
+        self._working.digital = self.digital_state
+        self._received = Snapshot(analog_count)
+        self._snapshots = SnapshotBuffer(analog_count)
+
+        self._core1_running = True
+        self._core1_stopped = False
+        _thread.start_new_thread(self._core1_loop, ())
+
+    def stop_second_core(self) -> None:
+        """
+        Stop sampling on the second core and go back to sampling with the timer. Waits for the current pass to finish.
+        """
+        if self._snapshots is None:
+            return
+
+        self._core1_running = False
+        while not self._core1_stopped:
+            time.sleep_ms(1)
+
+        self.dispatch()
+        self._snapshots = None
+        self.sample_timer.init(period=self._tick, callback=self._sample_pins)
+
+    def start_bus_worker(self) -> None:
+        """
+        Sample the expanders that are on another bus than the pin manager's on the second core of the RP2040, in
+        parallel with the sampling pass on the first core. The flush of the pending outputs on one bus overlaps the
+        reads of the other, and each bus is read at the same time, so a pass takes the bus time of the busier bus
+        instead of both.
+
+        Does nothing when all the expanders are on one bus. The second core can either run the bus worker or the
+        sampling loop of `start_second_core`, not both.
+
+        ... code-block:: python
+
+            pin_manager = PinManager(i2c0, devices={1: (i2c0, 0x20), 17: (i2c0, 0x21), 49: (i2c1, 0x22)})
+            pin_manager.start_bus_worker()
+        """
+        if not self._remote_expanders or self._bus_worker is not None:
+            return
+        if self._snapshots is not None:
+            raise ValueError('The second core is sampling the pins')
+
+        worker = BusWorker(self._remote_expanders)
+        self._flushed_expanders = self._local_expanders
+        worker.start()
+        self._bus_worker = worker
+
+    def stop_bus_worker(self) -> None:
+        """
+        Stop the bus worker and go back to sampling every bus on the sampling core.
+        """
+        worker = self._bus_worker
+        if worker is None:
+            return
+        self._bus_worker = None
+        worker.stop()
+        self._flushed_expanders = self._expanders
+
+    def dispatch(self) -> None:
+        """
+        Publish the changes from the newest snapshot of the second core, and write the pending expander outputs. Runs
+        on the first core, call it from the main loop as often as possible. Only the recorded input trace is written
+        out unless the second core is sampling.
+        """
+        # The sampling pass only records into the ring of the recorder, the stream is written from here
+        if self.trace is not None:
+            self.trace.flush()
+
+        snapshots = self._snapshots
+        if snapshots is None:
+            return
+
+        if not self._batch_depth:
+            self.flush()
+
+        received = self._received
+        if not snapshots.take(received):
+            return
+
+        digital = received.digital
+        if self._seeded:
+            if received.sequence > self._seed_sequence:
+                self._seeded = 0
+            else:
+                digital = (digital & ~self._seeded) | (self.digital_state & self._seeded)
+
+        timestamp = received.timestamp
+        self._update_digital_state(digital, timestamp)
+        for group in self._sample_groups:
+            for pin in group.analog_scan:
+                self._update_analog_value(pin, received.analog[pin], timestamp)
+
+        if self.trace is not None:
+            self.trace.record(timestamp, self.digital_state, self.analog_pins)
+
+    def _core1_loop(self) -> None:
+        next_pass = time.ticks_ms()
+        try:
+            while self._core1_running:
+                self._core1_sample()
+                next_pass = time.ticks_add(next_pass, self._tick)
+                wait = time.ticks_diff(next_pass, time.ticks_ms())
+                if wait > 0:
+                    time.sleep_ms(wait)
+                else:
+                    next_pass = time.ticks_ms()
+        finally:
+            self._core1_stopped = True
+
+    def _core1_sample(self) -> None:
+        """
+        One sampling pass on the second core. The due groups are read and debounced into the working snapshot, which is
+        then handed to the first core. Nothing is published from the second core.
+        """
+        working = self._working
+        now = time.ticks_us()
+        transactions = self._bus_transactions()
+        for group in self._sample_groups:
+            if not group.is_due() or group.is_idle():
+                continue
+
+            mask = group.scan_mask
+            if mask:
+                # Debounced under the lock as well, so a pin seeded on the first core is not overwritten
+                with self.bus_lock:
+                    word = self._read_digital_word(group)
+                    working.digital = self.debouncer.update(working.digital, (working.digital & ~mask) | word, mask)
+
+            if group.mux_channels:
+                values = self.adc.scan(group.mux_channels)
+                for channel in range(AdcMux.CHANNEL_COUNT):
+                    if group.mux_channels >> channel & 1:
+                        working.analog[self._mux_gpios[channel]] = values[channel]
 
-        if gpio in range(1, 17):
-            return self.adc.read(gpio)
+            for pin, adc in group.local_analog:
+                working.analog[pin] = self._read_local_analog(pin, adc)
 
-        return 0
+            group.record_sample(now)
+
+        working.timestamp = now
+        working.sequence += 1
+        self._snapshots.back().copy_from(working)
+        self._snapshots.publish()
+        self.telemetry.record(now, time.ticks_us(), self._bus_transactions() - transactions, self._tick * 1000)
 
     # ---- Event Handling Logic ----------------------------------------------------------------------------------------
 
-    def _sample_pins(self):
+    def _sample_pins(self, timer: machine.Timer = None):
+        """
+        Sample the groups of pins that are due this cycle. This pin sampling will happen on a periodic cycle. If any pins
+        have state changes, all callbacks associated with a pin will be called. Pending expander outputs are flushed
+        first so each cycle writes them with the fewest transactions, unless a `batch` is open. In interrupt mode the
+        digital pins are updated by their interrupts and only the analog pins are sampled.
         """
-        Sample the digital and analog pins. This pin sampling will happen on a periodic cycle. If any pins have state
-        changes, all callbacks associated with a pin will be called.
+        if not self._hold_bus():
+            # The groups that are due stay due and are sampled on the next tick
+            self.skipped_passes += 1
+            return
+        try:
+            self._sample_pass()
+        finally:
+            self._release_bus()
+
+    def _hold_bus(self) -> bool:
+        """
+        Hold the bus for a sampling pass or an interrupt when it is a client of an `I2cArbiter`. The callbacks don't
+        wait for the bus, as the code they interrupted on the same core can be the one holding it.
+
+        :return: If the bus can be used, release it with `_release_bus`
         """
-        self._sample_digital_pins()
-        self._sample_analog_pins()
+        return self._bus_acquire is None or self._bus_acquire(False)
 
-    def _sample_digital_pins(self):
-        for pin in range(1, 65):
-            new_value = self.digital_read(pin)
+    def _release_bus(self) -> None:
+        if self._bus_release is not None:
+            self._bus_release()
 
-            # Make sure to create a value in the digital read table if no reading currently exists
-            if pin not in self.digital_pins:
-                self.digital_pins[pin] = new_value
+    def _sample_pass(self) -> None:
+        now = time.ticks_us()
+        transactions = self._bus_transactions()
 
-            # If a new value is read, update the current value stored and run any stored callbacks
-            elif new_value != self.digital_pins[pin]:
-                self.digital_pins[pin] = new_value
+        if self._missed_interrupts:
+            missed, self._missed_interrupts = self._missed_interrupts, 0
+            for index, (expander, shift) in enumerate(self._expanders):
+                if missed >> index & 1:
+                    self._read_expander_interrupt(expander, shift)
+
+        worker = self._bus_worker
+        if not self._batch_depth:
+            if worker is not None:
+                # The other bus is written by the bus worker while this core writes and reads its own bus
+                worker.submit(flush=True)
+            self._flush_expanders()
+
+        for group in self._sample_groups:
+            if not group.is_due() or group.is_idle():
+                continue
+
+            if group.scan_mask and self.sample_mode != PinManager.SampleMode.INTERRUPT:
+                self._sample_digital_pins(group, now)
+            if group.analog_scan:
+                self._sample_analog_pins(group, now)
+            group.record_sample(now)
+
+        if worker is not None:
+            worker.wait()
+
+        self.telemetry.record(now, time.ticks_us(), self._bus_transactions() - transactions, self._tick * 1000)
+
+        if self.trace is not None:
+            self.trace.record(now, self.digital_state, self.analog_pins)
+
+    def _bus_transactions(self) -> int:
+        transactions = 0
+        for expander, _ in self._expanders:
+            transactions += expander.transactions
+        return transactions
+
+    def _read_digital_word(self, group: SampleGroup) -> int:
+        """
+        Read the state of the scanned digital pins of a sample group into a single 64-bit word. Bit `gpio - 1` holds the
+        value of the GPIO pin. Pins that are not scanned and the analog pins 47 and 48 are read as 0 (Low).
+
+        In snapshot mode each expander is read with a single 2-byte transaction and the local pins are each read once,
+        so sampling every pin costs 3 bus transactions instead of one for every expander pin.
+
+        :return: Packed digital state of the GPIO pins 1 -> 64
+        """
+        word = 0
+
+        if self.sample_mode == PinManager.SampleMode.PER_PIN:
+            for pin in range(1, PinManager.PIN_COUNT + 1):
+                if group.scan_mask >> (pin - 1) & 1 and self._read_pin(pin):
+                    word |= 1 << (pin - 1)
+            return word
+
+        # The expanders on the other bus are read by the bus worker while this core reads its own bus
+        worker = self._bus_worker
+        remote = group.remote_expanders
+        if remote and worker is not None:
+            worker.submit(expanders=remote)
+
+        for bit, pin in group.local_pins:
+            if pin.value():
+                word |= bit
+
+        for expander, shift in group.expanders:
+            word |= expander.read_gpio() << shift
+
+        if remote:
+            if worker is not None:
+                word |= worker.wait()
+            else:
+                for expander, shift in remote:
+                    word |= expander.read_gpio() << shift
+
+        return word & group.scan_mask
+
+    def _sample_digital_pins(self, group: SampleGroup = None, timestamp: int = 0):
+        """
+        Read the scanned digital pins of a sample group, debounce them, and publish the changes. All the digital pins are
+        read without a group.
+
+        :param timestamp: Time of the sample pass from `time.ticks_us`
+        """
+        if group is None:
+            group = self._all_digital_pins
+        mask = group.scan_mask
+        raw = (self.digital_state & ~mask) | self._read_digital_word(group)
+        if self.sample_mode != PinManager.SampleMode.INTERRUPT:
+            raw = self.debouncer.update(self.digital_state, raw, mask)
+        self._update_digital_state(raw, timestamp)
+
+    def _on_expander_interrupt(self, index: int) -> None:
+        """
+        Interrupt handler for an expander INT line. An interrupt that finds the bus held is read by the next sampling
+        pass, the INT line stays low until it is.
+
+        :param index: Index of the expander that fired
+        """
+        if not self._hold_bus():
+            self._missed_interrupts |= 1 << index
+            return
+        try:
+            expander, shift = self._expanders[index]
+            self._read_expander_interrupt(expander, shift)
+        finally:
+            self._release_bus()
+
+    def _read_expander_interrupt(self, expander: MCP23017, shift: int) -> None:
+        """
+        Only the interrupt flags and captured values of the expander that fired are read, in a single bus transaction.
+        """
+        timestamp = time.ticks_us()
+        flags, captured = expander.read_interrupt()
+        if not flags:
+            return
+
+        # The captured value holds the whole port at the time of the interrupt
+        mask = (0x00FF if flags & 0x00FF else 0) | (0xFF00 if flags & 0xFF00 else 0)
+        mask <<= shift
+        self._update_digital_state((self.digital_state & ~mask) | ((captured << shift) & mask), timestamp)
+
+    def _on_local_interrupt(self, pin: machine.Pin, bit: int) -> None:
+        """
+        Interrupt handler for the edges of a local digital pin.
+        """
+        timestamp = time.ticks_us()
+        if pin.value():
+            self._update_digital_state(self.digital_state | bit, timestamp)
+        else:
+            self._update_digital_state(self.digital_state & ~bit, timestamp)
+
+    def _update_digital_state(self, word: int, timestamp: int) -> None:
+        """
+        Store the new digital state and publish the events of every pin that changed.
+
+        :param word: The new packed digital state of the GPIO pins
+        :param timestamp: Time that the state was read from `time.ticks_us`
+        """
+        changed = word ^ self.digital_state
+
+        # A quiet cycle is a single comparison
+        if changed:
+            self.digital_state = word
+            self._publish_digital_changes(word, changed, timestamp)
+
+    def _publish_digital_changes(self, word: int, changed: int, timestamp: int) -> None:
+        """
+        Run the stored callbacks of every pin that changed state. Only the set bits of the changed mask are visited.
+
+        :param word: The new packed digital state of the GPIO pins
+        :param changed: Mask of the pins that changed state, `new_state ^ old_state`
+        :param timestamp: Time that the state was read from `time.ticks_us`
+        """
+        publisher = self.publisher
+        pin = 1
+        while changed:
+            # Skip over whole bytes of pins that did not change
+            if not changed & 0xFF:
+                changed >>= 8
+                pin += 8
+                continue
+
+            if changed & 1:
+                new_value = (word >> (pin - 1)) & 1
 
                 # Send the message for either the Digital Rising or Falling event
                 if new_value == 0:
-                    self.publisher.send_message(
-                        self._pin_event_name(PinManager.Event.DIGITAL_RISING, pin),
-                        pin=pin, value=new_value)
-
-                    self.publisher.send_message(
-                        self._pin_event_name(PinManager.Event.DIGITAL_CHANGE, pin),
-                        pin=pin, value=new_value)
+                    publisher.send_message(self._rising_ids[pin], pin=pin, value=new_value, timestamp=timestamp)
                 else:
-                    self.publisher.send_message(
-                        self._pin_event_name(PinManager.Event.DIGITAL_FALLING, pin),
-                        pin=pin, value=new_value)
+                    publisher.send_message(self._falling_ids[pin], pin=pin, value=new_value, timestamp=timestamp)
+
+                publisher.send_message(self._change_ids[pin], pin=pin, value=new_value, timestamp=timestamp)
+                self.latency.record(time.ticks_diff(time.ticks_us(), timestamp))
+
+            changed >>= 1
+            pin += 1
+
+    def _sample_analog_pins(self, group: SampleGroup, timestamp: int) -> None:
+        """
+        Sample the scanned analog pins of a group. The multiplexed channels are read with a single scan of the
+        multiplexer and each channel is handled while the next one settles.
+
+        :param timestamp: Time of the sample pass from `time.ticks_us`
+        """
+        if group.mux_channels:
+            self._mux_timestamp = timestamp
+            self.adc.scan(group.mux_channels, self._mux_callback)
 
-                    self.publisher.send_message(
-                        self._pin_event_name(PinManager.Event.DIGITAL_CHANGE, pin),
-                        pin=pin, value=new_value)
+        for pin, adc in group.local_analog:
+            self._update_analog_value(pin, self._read_local_analog(pin, adc), timestamp)
 
-    def _sample_analog_pins(self):
-        for pin in range(1, 17):
-            new_value = self.analog_read(pin)
+    def _read_local_analog(self, pin: int, adc: machine.ADC) -> int:
+        oversample = self.analog_filter.oversample(pin)
+        if oversample == 1:
+            return adc.read_u16()
 
-            # Make sure to create a value in the digital read table if no reading currently exists
-            if pin not in self.analog_pins:
-                self.analog_pins[pin] = new_value
+        total = 0
+        for _ in range(oversample):
+            total += adc.read_u16()
+        return total // oversample
 
-            # If a new value is read, update the current value stored and run any stored callbacks
-            elif new_value != self.analog_pins[pin]:
-                self.analog_pins[pin] = new_value
-                self.publisher.send_message(self._pin_event_name(PinManager.Event.ANALOG_CHANGE, pin), pin=pin,
-                                            value=new_value)
+    def _on_mux_sample(self, channel: int, value: int) -> None:
+        self._update_analog_value(self._mux_gpios[channel], value, self._mux_timestamp)
+
+    def _update_analog_value(self, pin: int, new_value: int, timestamp: int) -> None:
+        # Make sure to create a value in the digital read table if no reading currently exists
+        if pin not in self.analog_pins:
+            self.analog_pins[pin] = new_value
+
+        # If the reading moved past the filter, update the current value stored and run any stored callbacks
+        elif self.analog_filter.is_change(pin, new_value, self.analog_pins[pin]):
+            self.analog_pins[pin] = new_value
+            self.publisher.send_message(self._analog_change_ids[pin], pin=pin, value=new_value, timestamp=timestamp)
+            self.latency.record(time.ticks_diff(time.ticks_us(), timestamp))
 
     def sub_digital_rising(self, pin: int, listener: Callable) -> None:
         """
         Attach a callback to the digital pin. When a state changes to high, run the stored callbacks for that pin.
         """
-        self.publisher.subscribe(PinManager._pin_event_name(PinManager.Event.DIGITAL_RISING, pin), listener)
+        self._subscribe(PinManager.Event.DIGITAL_RISING, pin, listener)
 
     def sub_digital_falling(self, pin: int, listener: Callable) -> None:
         """
         Attach a callback to the pin manager. When a state change to low, run the stored callbacks for that
         pin.
         """
-        self.publisher.subscribe(PinManager._pin_event_name(PinManager.Event.DIGITAL_FALLING, pin), listener)
+        self._subscribe(PinManager.Event.DIGITAL_FALLING, pin, listener)
 
     def sub_digital_change(self, pin: int, listener: Callable) -> None:
         """
         Attach a callback to the pin manager. When a state change occurs on any pin, run the stored callbacks for that
         pin.
         """
-        self.publisher.subscribe(PinManager._pin_event_name(PinManager.Event.DIGITAL_CHANGE, pin), listener)
+        self._subscribe(PinManager.Event.DIGITAL_CHANGE, pin, listener)
 
     def sub_analog_change(self, pin: int, listener: Callable) -> None:
         """
         Attach a callback to the analog pin. When a state change occurs on any digital pin, run the stored callbacks for
         that pin.
         """
-        self.publisher.subscribe(PinManager._pin_event_name(PinManager.Event.ANALOG_CHANGE, pin), listener)
+        self._subscribe(PinManager.Event.ANALOG_CHANGE, pin, listener)
+
+    def unsub_digital_rising(self, pin: int, listener: Callable) -> None:
+        """
+        Remove a callback attached with `sub_digital_rising`. The pin stops being sampled once it has no subscribers.
+        """
+        self._unsubscribe(PinManager.Event.DIGITAL_RISING, pin, listener)
 
-    @staticmethod
-    def _pin_event_name(event: str, pin: int) -> str:
+    def unsub_digital_falling(self, pin: int, listener: Callable) -> None:
+        """
+        Remove a callback attached with `sub_digital_falling`. The pin stops being sampled once it has no subscribers.
+        """
+        self._unsubscribe(PinManager.Event.DIGITAL_FALLING, pin, listener)
+
+    def unsub_digital_change(self, pin: int, listener: Callable) -> None:
+        """
+        Remove a callback attached with `sub_digital_change`. The pin stops being sampled once it has no subscribers.
         """
-        Get the string representation of the event on a particular pin. The event name is needed as a string for the\
-        PyPubSub class which handles the observer pattern for the PinManager.
+        self._unsubscribe(PinManager.Event.DIGITAL_CHANGE, pin, listener)
+
+    def unsub_analog_change(self, pin: int, listener: Callable) -> None:
+        """
+        Remove a callback attached with `sub_analog_change`. The pin stops being sampled once it has no subscribers.
+        """
+        self._unsubscribe(PinManager.Event.ANALOG_CHANGE, pin, listener)
+
+    def _subscribe(self, event: str, pin: int, listener: Callable) -> None:
+        self.publisher.subscribe(self._pin_event_id(event, pin), listener)
+        self._update_scan_set(pin)
+
+    def _unsubscribe(self, event: str, pin: int, listener: Callable) -> None:
+        self.publisher.unsubscribe(self._pin_event_id(event, pin), listener)
+        self._update_scan_set(pin)
+
+    def _pin_event_id(self, event: str, pin: int) -> int:
+        """
+        Get the interned integer topic of the event on a particular pin. Subscriptions are made with the event names
+        from `PinManager.Event` and translated here to the integer topics that the sampling loop publishes.
+
+        :param event: The event name from `PinManager.Event`
+        :param pin: The GPIO pin 1 -> 64 that the event is for
+        :return: Integer topic used to publish the event on the pin
         """
-        return f"{event}_{pin}"
+        # Checked before the publisher is touched, a negative pin would index the topic of another pin
+        if not 0 < pin <= PinManager.PIN_COUNT:
+            raise ValueError(f'GPIO {pin} is not a pin of the pin manager, pins are 1 -> {PinManager.PIN_COUNT}')
+        return self._event_ids[event][pin]
@@ -0,0 +1,87 @@
+import time
+from typing import Tuple
+
+
+class SampleGroup:
+    """
+    A group of pins that the pin manager samples together on their own period. Fast groups keep the latency of safety
+    inputs low while slow groups keep the bus free, see `PinManager.add_sample_group`.
+
+    The group measures how often it is actually sampled. The rate is updated once every `RATE_WINDOW` microseconds.
+    """
+
+    DIGITAL = 'digital'
+    """Name of the default group holding the digital pins that are not in any other group."""
+    ANALOG = 'analog'
+    """Name of the default group holding the analog pins that are not in any other group."""
+
+    RATE_WINDOW = 1000000
+    """Time in us that the measured sample rate is averaged over."""
+
+    def __init__(self, name: str, period: int, digital_mask: int = 0, analog_pins: Tuple[int, ...] = ()):
+        """
+        :param name: Name that the group is looked up by
+        :param period: Time in ms between samples of the group
+        :param digital_mask: Digital pins of the group, bit `gpio - 1` is set for each pin
+        :param analog_pins: Analog gpio of the group
+        """
+        self.name = name
+        self.period = period
+        self.digital_mask = digital_mask
+        self.analog_pins = analog_pins
+
+        # Pins of the group that have subscribers and are read each sample. The expanders as `(expander, shift)` and
+        # local pins as `(bit, pin)` that hold the scanned digital pins, with the expanders on a second bus kept apart
+        # so they can be read in parallel. Filled in by the pin manager.
+        self.scan_mask = 0
+        self.analog_scan: Tuple[int, ...] = ()
+        self.expanders: Tuple = ()
+        self.remote_expanders: Tuple = ()
+        self.local_pins: Tuple = ()
+
+        # Mask of the scanned analog multiplexer channels and the scanned local analog pins as `(gpio, adc)`
+        self.mux_channels = 0
+        self.local_analog: Tuple = ()
+
+        # Sampling cycles between samples and the cycles left until the next sample
+        self.interval = 1
+        self.countdown = 1
+
+        self.samples = 0
+        self.rate = 0.0  # Hz
+        self._window_start = None
+        self._window_samples = 0
+
+    def is_due(self) -> bool:
+        """
+        Count down one sampling cycle.
+
+        :return: True when the group should be sampled this cycle
+        """
+        self.countdown -= 1
+        if self.countdown > 0:
+            return False
+        self.countdown = self.interval
+        return True
+
+    def is_idle(self) -> bool:
+        """ The group has no pins with subscribers, so there is nothing to sample. """
+        return not self.scan_mask and not self.analog_scan
+
+    def record_sample(self, now: int) -> None:
+        """
+        Count a sample of the group and update the measured rate at the end of each window.
+
+        :param now: Time of the sample from `time.ticks_us`
+        """
+        self.samples += 1
+        if self._window_start is None:
+            self._window_start = now
+            return
+
+        self._window_samples += 1
+        elapsed = time.ticks_diff(now, self._window_start)
+        if elapsed >= SampleGroup.RATE_WINDOW:
+            self.rate = self._window_samples * 1000000 / elapsed
+            self._window_start = now
+            self._window_samples = 0
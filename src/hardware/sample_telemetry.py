@@ -0,0 +1,132 @@
+from array import array
+
+import time
+
+
+class SampleTelemetry:
+    """
+    Timing of the sampling passes over a rolling window of the most recent passes. Records how long each pass took,
+    how far its start drifted from the sampling period, and the number of bus transactions it made. Passes that take
+    longer than the sampling period are counted as overruns.
+
+    ... code-block:: python
+
+        telemetry = pin_manager.telemetry
+        if telemetry.percentile(99) > 1000:
+            Log.warning(str(telemetry))
+    """
+
+    def __init__(self, window: int = 128):
+        """
+        :param window: Number of the most recent passes the statistics are taken over
+        """
+        self.window = window
+        self._durations = array('I', [0] * window)
+        self._jitter = array('I', [0] * window)
+        self._transactions = array('H', [0] * window)
+        self._index = 0
+        self._filled = 0
+        self._last_start = None
+
+        self.period = 0  # us
+        self.passes = 0
+        self.overruns = 0
+
+    def record(self, start: int, end: int, transactions: int, period: int) -> None:
+        """
+        :param start: Start of the pass from `time.ticks_us`
+        :param end: End of the pass from `time.ticks_us`
+        :param transactions: Bus transactions made by the pass
+        :param period: Sampling period in us that the pass had to fit in
+        """
+        duration = time.ticks_diff(end, start)
+        if self._last_start is None or period != self.period:
+            jitter = 0
+        else:
+            jitter = abs(time.ticks_diff(start, self._last_start) - period)
+        self._last_start = start
+        self.period = period
+
+        index = self._index
+        self._durations[index] = duration
+        self._jitter[index] = jitter
+        self._transactions[index] = min(transactions, 0xFFFF)
+        self._index = (index + 1) % self.window
+        if self._filled < self.window:
+            self._filled += 1
+
+        self.passes += 1
+        if duration > period:
+            self.overruns += 1
+
+    def reset(self) -> None:
+        self._index = 0
+        self._filled = 0
+        self._last_start = None
+        self.passes = 0
+        self.overruns = 0
+
+    @property
+    def last_duration(self) -> int:
+        return self._durations[(self._index - 1) % self.window] if self._filled else 0
+
+    def average(self) -> float:
+        """
+        :return: Average pass duration in us over the window
+        """
+        return self._average(self._durations)
+
+    def maximum(self) -> int:
+        """
+        :return: Longest pass duration in us over the window
+        """
+        return self._maximum(self._durations)
+
+    def percentile(self, percent: int) -> int:
+        """
+        :param percent: Percentile from 0 to 100
+        :return: Pass duration in us that the given percent of the passes in the window finished within
+        """
+        if not self._filled:
+            return 0
+        durations = sorted(self._durations[:self._filled])
+        return durations[min(self._filled - 1, self._filled * percent // 100)]
+
+    def max_jitter(self) -> int:
+        """
+        :return: Largest difference in us between the time between two pass starts and the sampling period
+        """
+        return self._maximum(self._jitter)
+
+    def average_transactions(self) -> float:
+        """
+        :return: Average bus transactions per pass over the window
+        """
+        return self._average(self._transactions)
+
+    def max_transactions(self) -> int:
+        """
+        :return: Most bus transactions made by a single pass in the window
+        """
+        return self._maximum(self._transactions)
+
+    def _average(self, values: array) -> float:
+        if not self._filled:
+            return 0.0
+        total = 0
+        for index in range(self._filled):
+            total += values[index]
+        return total / self._filled
+
+    def _maximum(self, values: array) -> int:
+        maximum = 0
+        for index in range(self._filled):
+            if values[index] > maximum:
+                maximum = values[index]
+        return maximum
+
+    def __str__(self) -> str:
+        return (f'Sampling {self.passes} passes, {self.overruns} overruns of {self.period} us | '
+                f'duration avg {self.average():.0f} us, p99 {self.percentile(99)} us, max {self.maximum()} us | '
+                f'jitter max {self.max_jitter()} us | '
+                f'bus transactions avg {self.average_transactions():.1f}, max {self.max_transactions()}')
@@ -0,0 +1,91 @@
+import _thread
+from array import array
+
+
+class Snapshot:
+    """
+    The state of the pins after one sampling pass. Digital pins are packed into a word with bit `gpio - 1` for each
+    pin, and analog readings are stored by gpio.
+    """
+
+    def __init__(self, analog_count: int):
+        """
+        :param analog_count: Number of analog values, one more than the highest analog gpio
+        """
+        self.digital = 0
+        self.analog = array('H', [0] * analog_count)
+        self.timestamp = 0  # time.ticks_us of the sampling pass
+        self.sequence = 0
+
+    def copy_from(self, other: 'Snapshot') -> None:
+        self.digital = other.digital
+        self.analog[:] = other.analog
+        self.timestamp = other.timestamp
+        self.sequence = other.sequence
+
+
+class SnapshotBuffer:
+    """
+    Double buffer that hands the snapshots from the sampling core to the core that publishes the events. The producer
+    fills the back buffer without locking and swaps it to the front when the consumer isn't copying out of the front.
+    The consumer only ever sees complete snapshots, and when it falls behind it gets the newest one.
+
+    ... code-block:: python
+
+        # Sampling core
+        buffer.back().copy_from(working)
+        buffer.publish()
+
+        # Publishing core
+        if buffer.take(received):
+            handle(received)
+    """
+
+    def __init__(self, analog_count: int):
+        """
+        :param analog_count: Number of analog values in each snapshot
+        """
+        self._lock = _thread.allocate_lock()
+        self._buffers = (Snapshot(analog_count), Snapshot(analog_count))
+        self._front = 0
+        self._fresh = False
+
+        # Snapshots that were replaced by a newer one before they were taken
+        self.skipped = 0
+
+    def back(self) -> Snapshot:
+        """
+        :return: The snapshot that the producer writes the next pass into
+        """
+        return self._buffers[self._front ^ 1]
+
+    def publish(self) -> bool:
+        """
+        Swap the back buffer to the front. The producer never waits on the consumer, when the consumer is copying out
+        of the front the swap is skipped and the next pass is written into the same back buffer.
+
+        :return: True when the snapshot was handed over
+        """
+        if not self._lock.acquire(0):
+            return False
+
+        if self._fresh:
+            self.skipped += 1
+        self._front ^= 1
+        self._fresh = True
+        self._lock.release()
+        return True
+
+    def take(self, snapshot: Snapshot) -> bool:
+        """
+        Copy the newest snapshot out of the front buffer if there is one that hasn't been taken yet.
+
+        :param snapshot: Snapshot to copy into
+        :return: True when a new snapshot was copied
+        """
+        with self._lock:
+            if not self._fresh:
+                return False
+            snapshot.copy_from(self._buffers[self._front])
+            self._fresh = False
+            return True
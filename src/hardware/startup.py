@@ -0,0 +1,138 @@
+from typing import Callable, Iterator, List, Tuple
+
+import time
+
+
+class Startup:
+    """
+    Brings up the devices on an I2C bus with a single bus scan shared between them. Devices that have to wait between
+    steps, like an LCD powering up, give their steps as a generator that yields the time in us to wait before the next
+    step. The waits are spent on the steps of the other devices instead of sleeping, and every step is recorded on a
+    timeline of the startup.
+
+    The devices are ready once `finish` returns.
+
+    ... code-block:: python
+
+        startup = Startup(i2c)
+        gauge = LiquidGauge(i2c, startup=startup)
+        pin_manager = PinManager(i2c, startup=startup)
+        startup.finish()
+        Log.info(startup.report())
+    """
+
+    WAIT = 'wait'
+    """Label of the time spent sleeping because no device was ready."""
+
+    def __init__(self, i2c):
+        """
+        :param i2c: The I2C bus, it is scanned once for the addresses of all devices
+        """
+        self.i2c = i2c
+        self.start_us = time.ticks_us()
+        self.end_us = self.start_us
+
+        # Steps taken as `(label, start, end)` in us since the start
+        self.timeline: List[Tuple[str, int, int]] = []
+
+        # Devices waiting for their next step as `[deadline, device, steps]`, the queued generators run in order
+        self._waiting: List[list] = []
+        self._labels = {}
+
+        self.devices: List[int] = self.run('I2C scan', i2c.scan)
+
+    def run(self, label: str, step: Callable, *args):
+        """
+        Run a step now. Devices that are done waiting take their next step first.
+
+        :param label: Name of the step on the timeline
+        :param step: Called with the arguments
+        :return: The result of the step
+        """
+        self._step_ready()
+        start = time.ticks_us()
+        result = step(*args)
+        self._record(label, start)
+        return result
+
+    def begin(self, device, label: str, steps: Iterator[int]) -> None:
+        """
+        Start a device that waits between its steps. The first step is taken now.
+
+        :param device: The object being initialized, used to queue more steps with `then`
+        :param label: Name of the steps of the device on the timeline
+        :param steps: Generator that takes a step each time it is resumed and yields the us to wait before the next one
+        """
+        self._labels[device] = label
+        self._advance([time.ticks_us(), device, [steps]])
+
+    def then(self, device, steps: Iterator[int]) -> None:
+        """
+        Queue steps to run after the steps a device was started with, like setting up a display after its LCD.
+
+        :param device: A device started with `begin`
+        :param steps: Generator of the steps, in the same form as for `begin`
+        """
+        for waiting in self._waiting:
+            if waiting[1] is device:
+                waiting[2].append(steps)
+                return
+        self._advance([time.ticks_us(), device, [steps]])
+
+    def finish(self) -> None:
+        """ Run the devices that are still waiting to the end, sleeping only when none of them is ready. """
+        while self._waiting:
+            deadline = self._waiting[0][0]
+            for waiting in self._waiting:
+                if time.ticks_diff(waiting[0], deadline) < 0:
+                    deadline = waiting[0]
+
+            start = time.ticks_us()
+            wait = time.ticks_diff(deadline, start)
+            if wait > 0:
+                time.sleep_us(wait)
+                self._record(Startup.WAIT, start)
+            self._step_ready()
+
+    @property
+    def total_us(self) -> int:
+        return time.ticks_diff(self.end_us, self.start_us)
+
+    @property
+    def waited_us(self) -> int:
+        return sum(end - start for label, start, end in self.timeline if label == Startup.WAIT)
+
+    def report(self) -> str:
+        """
+        :return: The total and waiting time of the startup, followed by a line for each step with its start and duration
+        """
+        lines = [f'Startup in {self.total_us / 1000:.1f} ms, {self.waited_us / 1000:.1f} ms waiting on devices']
+        for label, start, end in self.timeline:
+            lines.append(f'{start / 1000:8.1f} ms {(end - start) / 1000:+7.1f} ms  {label}')
+        return '\n'.join(lines)
+
+    def _step_ready(self) -> None:
+        now = time.ticks_us()
+        for waiting in self._waiting[:]:
+            if time.ticks_diff(now, waiting[0]) >= 0:
+                self._waiting.remove(waiting)
+                self._advance(waiting)
+
+    def _advance(self, waiting: list) -> None:
+        # Take the next step of the device, and put it back in the queue if it has to wait for another one
+        _, device, queue = waiting
+        start = time.ticks_us()
+        delay = None
+        while queue and delay is None:
+            delay = next(queue[0], None)
+            if delay is None:
+                queue.pop(0)
+        self._record(self._labels.get(device, str(device)), start)
+
+        if queue:
+            waiting[0] = time.ticks_add(time.ticks_us(), delay)
+            self._waiting.append(waiting)
+
+    def _record(self, label: str, start: int) -> None:
+        self.end_us = time.ticks_us()
+        self.timeline.append((label, time.ticks_diff(start, self.start_us), time.ticks_diff(self.end_us, self.start_us)))
@@ -20,9 +20,9 @@ class PinLogger:
         self.pin_manager.sub_analog_change(48, PinLogger.on_analog_change)
 
     @staticmethod
-    def on_digital_change(pin: int) -> None:
+    def on_digital_change(pin: int, value: int, timestamp: int) -> None:
         Log.debug(f'Digital Change on Pin: {pin}')
 
     @staticmethod
-    def on_analog_change(pin: int, value: int) -> None:
+    def on_analog_change(pin: int, value: int, timestamp: int) -> None:
         Log.debug(f"Analog Pin Change: {pin} at {value}")
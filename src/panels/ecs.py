@@ -53,12 +53,13 @@ class ECS:
 
     # ---- Event Handling ----------------------------------------------------------------------------------------------
 
-    def _on_digital_change(self, pin: int, value: int):
+    def _on_digital_change(self, pin: int, value: int, timestamp: int):
         """
         Callback for when one of the digital pins in the flight control panel is activated (active low, 0).
 
         :param pin:
         :param value:
+        :param timestamp:
         """
         button_state = states.Button.PRESSED if value == 0 else states.Button.RELEASED
 
@@ -54,7 +54,7 @@ class Engine:
 
     # ---- Event Handling ----------------------------------------------------------------------------------------------
 
-    def _on_off_toggle(self, pin: int, value: int):
+    def _on_off_toggle(self, pin: int, value: int, timestamp: int):
         """ Callback for when the on/off switch is toggled. """
         if value == 1:
             self.engine = states.Button.PRESSED
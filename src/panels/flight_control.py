@@ -88,12 +88,13 @@ class FlightControl:
 
     # ---- Event Handling ----------------------------------------------------------------------------------------------
 
-    def _on_digital_change(self, pin: int, value: int) -> None:
+    def _on_digital_change(self, pin: int, value: int, timestamp: int) -> None:
         """
         Callback for when one of the digital pins in the flight control panel is activated (active low, 0).
 
         :param pin:
         :param value:
+        :param timestamp:
         """
         button_state = states.Button.PRESSED if value == 0 else states.Button.RELEASED
 
@@ -141,12 +142,13 @@ class FlightControl:
                 self.y_axis_invert = button_state
                 self.publisher.send_message(self._y_axis_invert_event())
 
-    def _on_analog_change(self, pin: int, value: int) -> None:
+    def _on_analog_change(self, pin: int, value: int, timestamp: int) -> None:
         """
         Callback for when one of the analog pins in the flight control panel is activated (active low, 0).
 
         :param pin:
         :param value:
+        :param timestamp:
         """
         normalized_value = value / 65535.
 
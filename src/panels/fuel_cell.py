@@ -42,14 +42,16 @@ class FuelCell:
     def _turned_off_event(self):
         return FuelCell._event_name(FuelCell.Event.TURNED_OFF, self.on_off_pin)
 
-    def _on_off_switch_toggled(self, on_off_pin_state: int) -> None:
+    def _on_off_switch_toggled(self, pin: int, value: int, timestamp: int) -> None:
         """
         Triggered event that is run whenever the fuel cell on/off switch changes.
         Update the fuel cell state to correlate with the on/off switch state.
 
-        :param on_off_pin_state: The state of the on/off switch. The switch is active low (0) when the switch is on.
+        :param pin: The on/off switch pin
+        :param value: The state of the on/off switch. The switch is active low (0) when the switch is on.
+        :param timestamp:
         """
-        if on_off_pin_state == 0:
+        if value == 0:
             self.state = FuelCell.State.ON
             self.publisher.send_message(self._turned_on_event())
         else:
@@ -59,16 +61,18 @@ class FuelCell:
     def _cleared_fault_event(self):
         return FuelCell._event_name(FuelCell.Event.CLEARED_FAULT, self.cycle_pin)
 
-    def _cycle_button_pressed(self, cycle_pin_state: int) -> None:
+    def _cycle_button_pressed(self, pin: int, value: int, timestamp: int) -> None:
         """
         Triggered event that is run whenever the engine cycle switch changes.
         Update the fuel cell state to correlate with the cycle switch state.
         If the fuel cell was cycled, the fuel cell fault will be cleared.
 
-        :param cycle_pin_state:
+        :param pin: The cycle switch pin
+        :param value: The state of the cycle switch
+        :param timestamp:
         """
 
-        if cycle_pin_state == 1 and self.state == FuelCell.State.FAULT:
+        if value == 1 and self.state == FuelCell.State.FAULT:
             self.state = FuelCell.State.ON
             self.publisher.send_message(self._cleared_fault_event())
 
@@ -45,7 +45,7 @@ class Launch:
 
     # ---- Modifiers ---------------------------------------------------------------------------------------------------
 
-    def _on_digital_change(self, pin: int, value: int) -> None:
+    def _on_digital_change(self, pin: int, value: int, timestamp: int) -> None:
         button_state = states.Button.PRESSED if value == 0 else states.Button.RELEASED
 
         match pin:
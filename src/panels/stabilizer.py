@@ -31,7 +31,7 @@ class Stabilizer:
         self.p2 = p2
         self.p3 = p3
         self.p4 = p4
-        self.rotary_encoder = RotaryEncoder(p1, p2, p3, p4)
+        self.rotary_encoder = RotaryEncoder(p1, p2, p3, p4, pin_manager)
         self.rotary_encoder.sub_encoder_change(self._on_encoder_change)
         self.publisher = Publisher()
 
@@ -1,4 +1,4 @@
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, Hashable, Tuple
 
 from loggers.log import Log
 
@@ -25,51 +25,58 @@ class Publisher:
         >>> 'Listener received: Published Message'
     """
 
-    subscribers: Dict[(int, str), Callable[[Any], Any]]
+    subscribers: Dict[Hashable, Tuple[Callable[[Any], Any], ...]]
     """
-    Subscriber dictionary containing the listener hash and the callback string as the keys. The value stored
-    in the dictionary contains the callback listener function that subscribed to the event.
+    Subscriber dictionary indexed by the message. Messages are usually strings, but any hashable value such as an
+    interned integer topic can be used. The value stored in the dictionary is a tuple of all the callback listener
+    functions that subscribed to the message, in the order that they subscribed. Publishing a message only touches the
+    listeners of that message, so the cost of sending does not grow with the number of subscriptions to other messages.
     """
 
     def __init__(self):
         self.subscribers = {}
 
-    def subscribe(self, message: str, listener: Callable) -> None:
+    def subscribe(self, message: Hashable, listener: Callable) -> None:
         """
         Subscribe to a given message and callback the listener function
 
         :param message:
         :param listener:
         """
-        key = hash(listener), message
-        if key in self.subscribers:
-            Log.info(f'Subscription failed, listener already subscribed: {key}.')
+        listeners = self.subscribers.get(message, ())
+        if listener in listeners:
+            Log.info(f'Subscription failed, listener already subscribed: {message}.')
             return
 
-        self.subscribers[key] = listener
-        Log.info(f'Subscribed to event: {key}')
+        # Tuples are rebuilt on subscription so that sending a message can iterate over the listeners without copying
+        self.subscribers[message] = listeners + (listener,)
+        Log.info(f'Subscribed to event: {message}')
 
-    def unsubscribe(self, message: str, listener: Callable) -> None:
-        key = hash(listener), message
-        if key not in self.subscribers:
-            Log.info(f'Unable to unsubscribe from message, instance not found: {key}')
+    def unsubscribe(self, message: Hashable, listener: Callable) -> None:
+        listeners = self.subscribers.get(message, ())
+        if listener not in listeners:
+            Log.info(f'Unable to unsubscribe from message, instance not found: {message}')
             return
 
-        self.subscribers.pop(key)
-        Log.info(f'Unsubscribed from event: {key}')
+        remaining = tuple(callback for callback in listeners if callback != listener)
+        if remaining:
+            self.subscribers[message] = remaining
+        else:
+            self.subscribers.pop(message)
+        Log.info(f'Unsubscribed from event: {message}')
 
-    def send_message(self, message: str, **kwargs) -> None:
+    def send_message(self, message: Hashable, **kwargs) -> None:
         """
         Send a message and serve all callbacks that are registers.
 
         :param message: The message that is being sent. All listeners tied to this message will be called.
         :param kwargs: All the parameters that will be passed to the callback functions.
         """
-        messages_sent = 0
+        listeners = self.subscribers.get(message, ())
 
-        for callback, key in self.subscribers.items():
-            if key == message:
-                messages_sent = messages_sent + 1
-                callback(**kwargs)
+        for callback in listeners:
+            callback(**kwargs)
 
-        Log.info(f'Sending message to {messages_sent} recipients: {message}')
+        # Only format the log message when it will be printed, publishing happens inside the pin sampling loop
+        if Log.severity >= Log.Severity.INFO:
+            Log.info(f'Sending message to {len(listeners)} recipients: {message}')
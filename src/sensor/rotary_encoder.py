@@ -1,6 +1,6 @@
 from typing import Callable
-from pubsub import pub
 
+from pubsub.publisher import Publisher
 from hardware.pin_manager import PinManager
 
 
@@ -24,7 +24,7 @@ class RotaryEncoder:
     position: int
     encoded_bits: [int]
 
-    def __init__(self, p1: int, p2: int, p3: int, p4: int):
+    def __init__(self, p1: int, p2: int, p3: int, p4: int, pin_manager: PinManager):
         """
         Create a rotary encoder from all the 6 pin wired to it.
 
@@ -32,8 +32,11 @@ class RotaryEncoder:
         :param p2: Pin position 2
         :param p3: Pin position 3
         :param p4: Pin position 4 (LSB)
+        :param pin_manager: Pin manager that the encoder pins are read through
         """
 
+        self.pin_manager = pin_manager
+        self.publisher = Publisher()
         self.p1 = p1
         self.p2 = p2
         self.p3 = p3
@@ -60,7 +63,7 @@ class RotaryEncoder:
 
     # ---- Event Handling ----------------------------------------------------------------------------------------------
 
-    def _on_pin_change(self, pin: int, value: int) -> None:
+    def _on_pin_change(self, pin: int, value: int, timestamp: int) -> None:
         # We need to take the inverse of the pin value because 0 indicates an active state
         pin_encoding = inverse(value)
         match pin:
@@ -1,24 +1,42 @@
 import machine
 
+from hardware.i2c_arbiter import I2cArbiter
 from hardware.pin_manager import PinManager
+from hardware.startup import Startup
 from loggers.pin_logger import PinLogger
 from loggers.log import Log
 
 
 class SpaceTeam:
 
-    def __init__(self):
+    def __init__(self, dual_core: bool = False):
+        """
+        :param dual_core: Sample the pins on the second core and publish their events from the main loop
+        """
         Log.severity = Log.Severity.DEBUG
 
         sda = 16
         scl = 17
         freq = 400000
-        self.i2c = machine.I2C(0, sda=machine.Pin(sda), scl=machine.Pin(scl), freq=freq)
+        i2c = machine.I2C(0, sda=machine.Pin(sda), scl=machine.Pin(scl), freq=freq)
         Log.info(f'Initialized I2C with SDA:{sda}, SCL:{scl}, at Frequency:{freq}')
 
-        self.pin_manager = PinManager(self.i2c)
+        # Everything on the bus goes through the arbiter. The panels and displays are given `i2c`, a display client, and
+        # the bus itself is only used by the arbiter.
+        self.bus = I2cArbiter(i2c, freq=freq)
+        self.i2c = self.bus.client(I2cArbiter.Priority.DISPLAY)
+        sampling = self.bus.client(I2cArbiter.Priority.SAMPLING)
+
+        startup = Startup(sampling)
+        self.pin_manager = PinManager(sampling, startup=startup)
+        startup.finish()
+        Log.info(startup.report())
         self.pin_logger = PinLogger(self.pin_manager)
 
+        if dual_core:
+            self.pin_manager.start_second_core()
+            Log.info('Sampling pins on the second core')
+
         self.running = True
 
     def run(self):
@@ -26,4 +44,5 @@ class SpaceTeam:
             self.loop()
 
     def loop(self):
-        pass
+        self.pin_manager.dispatch()
+        self.bus.flush()
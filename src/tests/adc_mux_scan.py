@@ -0,0 +1,70 @@
+# Host-side test of the scan mode of the analog multiplexer.
+# An emulated 16 channel multiplexer needs 20 us to settle after a channel change. The scan has to read every channel
+# after it settled, change a single select line per channel, reuse the same result array, and handle each sample while
+# the next channel settles.
+#
+# Run from the src directory with CPython: python -m tests.adc_mux_scan
+
+import emulation
+
+emulation.install()
+
+import time
+
+import machine
+from emulation.analog_mux import AnalogMuxModel
+from hardware.adcmux import AdcMux
+
+SELECT_PINS = (10, 11, 12, 13)
+SETTLE = 20  # us
+PROCESSING = 15  # us spent handling each sample
+
+
+def main():
+    machine.reset()
+    model = AnalogMuxModel(adc_channel=0, select_pins=SELECT_PINS, settle_us=SETTLE)
+    for channel in range(16):
+        model.channels[channel] = channel * 1000 + 7
+
+    adc_mux = AdcMux(0, *SELECT_PINS, settle_us=SETTLE)
+
+    values = adc_mux.scan()
+    assert list(values) == model.channels, list(values)
+    assert adc_mux.scan() is values, 'The scan allocated a new result array'
+
+    # Reading before the channel settles picks up the previous channel
+    adc_mux.settle_us = 0
+    assert list(adc_mux.scan()) != model.channels, 'The emulated multiplexer did not need to settle'
+    adc_mux.settle_us = SETTLE
+
+    # A single select line changes for each channel
+    model.select_changes = 0
+    adc_mux.scan()
+    select_changes = model.select_changes
+    assert select_changes <= 16, f'{select_changes} select line changes for one scan'
+
+    # Only the requested channels are sampled, in scan order
+    sampled = []
+    adc_mux.scan(channels=0b1010_0000_0000_0110, callback=lambda channel, value: sampled.append(channel))
+    assert sampled == [1, 2, 13, 15], sampled
+
+    # Each sample is handled while the next channel settles
+    def process(channel, value):
+        time.sleep_us(PROCESSING)
+
+    start = time.ticks_us()
+    values = adc_mux.scan(callback=process)
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    assert list(values) == model.channels
+    assert elapsed < 16 * (SETTLE + PROCESSING), f'Settling and processing did not overlap: {elapsed} us'
+
+    assert adc_mux.read(5) == 5007
+
+    print(f'Scan of 16 channels with {SETTLE} us settling and {PROCESSING} us processing: {elapsed} us, '
+          f'{16 * (SETTLE + PROCESSING)} us one after the other')
+    print(f'Select line changes per scan: {select_changes}')
+    print('ADC multiplexer scan test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+# Host-side test of the analog filter stage of the pin manager.
+# A pot on the local analog pin 47 holds still with ADC noise, then turns, then holds still again. Unfiltered every
+# noisy sample is published. With oversampling, a deadband, and hysteresis only the turn is published and the last
+# published value follows the pot to within the deadband.
+#
+# Run from the src directory with CPython: python -m tests.analog_filter
+
+import emulation
+
+emulation.install()
+
+import random
+
+import machine
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+POT = 47  # Local ADC 1
+NOISE = 150  # Standard deviation of the ADC noise in counts
+HOLD = 500  # Samples held still before and after turning
+TURN = 200  # Samples spent turning
+START = 30000
+END = 40000
+
+
+class NoisyPot:
+    """ ADC source for a pot position with gaussian noise on every reading. """
+
+    def __init__(self, seed: int):
+        self.position = START
+        self._random = random.Random(seed)
+
+    def __call__(self) -> int:
+        return max(0, min(0xFFFF, round(self.position + self._random.gauss(0, NOISE))))
+
+
+def run_pot(**filter_settings):
+    machine.reset()
+    for address in (0x20, 0x21, 0x22):
+        Mcp23017Model(bus=0, address=address)
+
+    pot = NoisyPot(seed=1)
+    machine.set_adc_source(1, pot)
+
+    pin_manager = PinManager(machine.I2C(0))
+    pin_manager.set_analog_filter([POT], **filter_settings)
+
+    events = []
+    pin_manager.sub_analog_change(POT, lambda pin, value, timestamp: events.append(value))
+
+    still, turning = 0, 0
+    for sample in range(2 * HOLD + TURN):
+        if HOLD <= sample < HOLD + TURN:
+            pot.position = START + (END - START) * (sample - HOLD + 1) // TURN
+        count = len(events)
+        pin_manager.sample_timer.fire()
+        if HOLD < sample < HOLD + TURN:
+            turning += len(events) - count
+        elif sample > HOLD + TURN + 10:
+            still += len(events) - count
+
+    return events, still, turning
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+
+    raw, raw_still, _ = run_pot()
+    filtered, still, turning = run_pot(oversample=8, deadband=256, hysteresis=128)
+
+    assert len(filtered) * 20 < len(raw), f'Filter only dropped the events from {len(raw)} to {len(filtered)}'
+    assert still == 0, f'{still} events published while the pot was still'
+    assert turning >= 20, f'Only {turning} events published while the pot turned'
+    assert abs(filtered[-1] - END) <= 256 + 128, f'Last published value {filtered[-1]} did not follow the pot'
+
+    print(f'Pot with ADC noise of {NOISE} counts, {2 * HOLD + TURN} samples')
+    print(f'  unfiltered: {len(raw)} events, {raw_still} while still')
+    print(f'  filtered:   {len(filtered)} events, {still} while still, {turning} while turning, '
+          f'settled at {filtered[-1]}')
+    print('Analog filter test passed')
+
+
+if __name__ == '__main__':
+    main()
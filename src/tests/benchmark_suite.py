@@ -0,0 +1,229 @@
+# Host-side benchmark suite of the hot paths of the shuttle control module, run on the emulated board.
+# Measures a sampling pass of the pin manager with N changing pins, publishing a message with M subscribers, a frame of
+# the stability and liquid gauge displays, and starting up an expander. Each benchmark reports the wall time per
+# operation, the I2C transactions, bytes, and bus time per operation, and the memory allocated by one operation. The
+# wall time and allocations include the emulated devices, the bus metrics are the same as on the Pico.
+#
+# The results can be saved as a JSON baseline and a later run compared against it:
+#     python -m tests.benchmark_suite --save baseline.json
+#     python -m tests.benchmark_suite --compare baseline.json
+#
+# Run from the src directory with CPython: python -m tests.benchmark_suite
+
+import emulation
+
+emulation.install()
+
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import machine
+from display.liquid_gauge import LiquidGauge
+from display.stability import Stability
+from emulation.board import ShuttleBoard
+from emulation.bus_timing import BusTiming
+from hardware.mcp23017 import MCP23017
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+from pubsub.publisher import Publisher
+
+BUS = ShuttleBoard.I2C_BUS
+
+METRICS = ('wall_us', 'transactions', 'bytes', 'bus_us', 'alloc_bytes')
+"""Metrics of every result, all per operation."""
+
+DETERMINISTIC = ('transactions', 'bytes', 'bus_us')
+"""Metrics that are the same on every run, a change in them is a change in the code."""
+
+
+def measure(name: str, operation: Callable[[], None], iterations: int, timing: BusTiming, **params) -> Dict:
+    """
+    Run an operation and measure it.
+
+    :param name: Name of the benchmark
+    :param operation: The operation, called once per iteration
+    :param iterations: Number of times the operation is timed
+    :param timing: Bus timing model installed on the board
+    :param params: Parameters of the benchmark, stored with the result
+    :return: The result with every metric in `METRICS` per operation
+    """
+    # Warm up so one time set up like the first pin states doesn't count
+    operation()
+
+    machine.reset_i2c_traffic()
+    timing.reset()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    elapsed = time.perf_counter() - start
+    transactions, byte_count = machine.i2c_traffic(BUS)
+
+    # Allocations are measured on a separate run, tracing slows down the operation
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    operation()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'name': name,
+        'params': params,
+        'iterations': iterations,
+        'wall_us': elapsed / iterations * 1e6,
+        'transactions': transactions / iterations,
+        'bytes': byte_count / iterations,
+        'bus_us': timing.bus_us() / iterations,
+        'alloc_bytes': peak - base,
+    }
+
+
+def new_board() -> Tuple[ShuttleBoard, BusTiming]:
+    board = ShuttleBoard()
+    timing = BusTiming()
+    machine.set_bus_timing(timing)
+    return board, timing
+
+
+# ---- Benchmarks ------------------------------------------------------------------------------------------------------
+
+def bench_sample_pins(changing: int, iterations: int = 500) -> Dict:
+    """ A sampling pass of the pin manager while `changing` expander pins toggle between every pass. """
+    board, timing = new_board()
+    pin_manager = PinManager(machine.I2C(BUS))
+    for gpio in range(1, PinManager.PIN_COUNT + 1):
+        pin_manager.sub_digital_change(gpio, lambda pin, value, timestamp: None)
+
+    pins = [(board.expanders[index // 16], index % 16) for index in range(changing)]
+    level = [0]
+
+    def operation():
+        level[0] ^= 1
+        for expander, pin in pins:
+            expander.set_input(pin, level[0])
+        pin_manager._sample_pins(None)
+
+    return measure('PinManager._sample_pins', operation, iterations, timing, changing_pins=changing)
+
+
+def bench_send_message(subscribers: int, iterations: int = 10000) -> Dict:
+    """ Publishing one message to `subscribers` listeners. """
+    _, timing = new_board()
+    publisher = Publisher()
+    for _ in range(subscribers):
+        publisher.subscribe('Benchmark.Message', lambda pin, value, timestamp: None)
+
+    def operation():
+        publisher.send_message('Benchmark.Message', pin=1, value=0, timestamp=0)
+
+    return measure('Publisher.send_message', operation, iterations, timing, subscribers=subscribers)
+
+
+def bench_stability_display(iterations: int = 20) -> Dict:
+    """ One frame of the stability display. """
+    _, timing = new_board()
+    stability = Stability(machine.I2C(BUS), ShuttleBoard.LCD_ADDRESS)
+    return measure('Stability.display', stability.display, iterations, timing)
+
+
+def bench_liquid_gauge_display(iterations: int = 20) -> Dict:
+    """ One frame of the liquid gauge display. """
+    _, timing = new_board()
+    gauge = LiquidGauge(machine.I2C(BUS), ShuttleBoard.LCD_ADDRESS)
+    return measure('LiquidGauge.display', gauge.display, iterations, timing)
+
+
+def bench_mcp23017_init(iterations: int = 200) -> Dict:
+    """ Starting up an expander, from the bus scan to writing the reset configuration. """
+    _, timing = new_board()
+    i2c = machine.I2C(BUS)
+    return measure('MCP23017.init', lambda: MCP23017(i2c, 0x20), iterations, timing)
+
+
+def run_all() -> List[Dict]:
+    results = []
+    for changing in (0, 1, 8, 32):
+        results.append(bench_sample_pins(changing))
+    for subscribers in (1, 8, 32):
+        results.append(bench_send_message(subscribers))
+    results.append(bench_stability_display())
+    results.append(bench_liquid_gauge_display())
+    results.append(bench_mcp23017_init())
+    return results
+
+
+# ---- Reporting -------------------------------------------------------------------------------------------------------
+
+def label(result: Dict) -> str:
+    params = ', '.join(f'{key}={value}' for key, value in result['params'].items())
+    return f'{result["name"]}({params})'
+
+
+def print_results(results: List[Dict]) -> None:
+    print('Benchmark suite (per operation)')
+    print(f'{"benchmark":>48} | {"wall us":>10} | {"trans":>7} | {"bytes":>8} | {"bus ms":>8} | {"alloc B":>8}')
+    for result in results:
+        print(f'{label(result):>48} | {result["wall_us"]:>10.2f} | {result["transactions"]:>7.1f} | '
+              f'{result["bytes"]:>8.1f} | {result["bus_us"] / 1000:>8.3f} | {result["alloc_bytes"]:>8}')
+
+    for result in results:
+        if result['name'].endswith('.display'):
+            bus_fps = 1e6 / result['bus_us'] if result['bus_us'] else 0
+            print(f'{result["name"]}: {1e6 / result["wall_us"]:.1f} fps on the host, '
+                  f'{bus_fps:.1f} fps limited by the bus')
+
+
+def compare(results: List[Dict], baseline: List[Dict]) -> bool:
+    """
+    Print the change of every metric from the baseline.
+
+    :return: False when a deterministic metric got worse
+    """
+    baseline_results = {label(result): result for result in baseline}
+    passed = True
+    print('Change from baseline')
+    for result in results:
+        previous = baseline_results.get(label(result))
+        if previous is None:
+            print(f'{label(result):>48} | new')
+            continue
+
+        changes = []
+        for metric in METRICS:
+            before = previous[metric]
+            after = result[metric]
+            change = (after - before) / before * 100 if before else 0.0
+            changes.append(f'{metric} {change:+.1f}%')
+            if metric in DETERMINISTIC and after > before + 1e-9:
+                passed = False
+        print(f'{label(result):>48} | {", ".join(changes)}')
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the hot paths on the emulated board')
+    parser.add_argument('--save', metavar='PATH', help='Save the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='Compare the results against a JSON baseline')
+    args = parser.parse_args()
+
+    Log.severity = Log.Severity.NOLOG
+    results = run_all()
+    print_results(results)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        if not compare(results, baseline):
+            raise SystemExit('Bus use went up from the baseline')
+
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump({'results': results}, baseline_file, indent=2)
+        print(f'Saved the baseline to {args.save}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Host-side test of the I2C bus timing model.
+# Checks the bit count of each kind of transaction, that the bus time is charged to the subsystem that made it
+# (expander start up, pin sampling, and LCD rendering), and that the virtual clock can be moved by the bus time so the
+# sampling telemetry sees the time on the wire.
+#
+# Run from the src directory with CPython: python -m tests.bus_timing
+
+import emulation
+
+emulation.install()
+
+import machine
+from display.liquid_gauge import LiquidGauge
+from emulation import clock
+from emulation.board import ShuttleBoard
+from emulation.bus_timing import BusTiming
+from loggers.log import Log
+from spaceteam import SpaceTeam
+
+TICKS = 50
+
+
+def test_transaction_bits():
+    # Register write: start, address, register, data, stop
+    assert BusTiming.transaction_bits(2) == 1 + 3 * 9 + 1
+    # Register read: start, address, register, repeated start, address, data, stop
+    assert BusTiming.transaction_bits(1, 2, register=True) == 1 + 2 * 9 + 1 + 3 * 9 + 1
+    # Plain read: start, address, data, stop
+    assert BusTiming.transaction_bits(0, 1) == 1 + 2 * 9 + 1
+
+    machine.reset()
+    timing = BusTiming()
+    machine.set_bus_timing(timing)
+    ShuttleBoard(reset=False)
+
+    # 29 bits at 400 kHz
+    i2c = machine.I2C(0, freq=400000)
+    i2c.writeto_mem(0x20, 0x00, b'\x00')
+    assert timing.bus_us() == 72.5, timing.bus_us()
+
+    # The same transaction takes 4 times as long at 100 kHz
+    machine.I2C(0, freq=100000).writeto_mem(0x20, 0x00, b'\x00')
+    assert timing.bus_us() == 72.5 * 5, timing.bus_us()
+
+
+def test_subsystems():
+    machine.reset()
+    timing = BusTiming()
+    machine.set_bus_timing(timing)
+    board = ShuttleBoard(reset=False)
+
+    space_team = SpaceTeam()
+    Log.severity = Log.Severity.NOLOG
+    init_us = timing.bus_us('MCP23017.init')
+    assert init_us > 0, timing.occupancy
+
+    pin_manager = space_team.pin_manager
+    pin_manager.sub_digital_change(1, lambda pin, value, timestamp: None)
+    for tick in range(TICKS):
+        board.set_input(1, tick % 2)
+        pin_manager.sample_timer.fire()
+        space_team.loop()
+    sampling_us = timing.bus_us('PinManager sampling')
+    assert sampling_us > 0, timing.occupancy
+
+    gauge = LiquidGauge(space_team.i2c)
+    gauge.set_position(0.5)
+    # The main loop sends the queued display writes within the display budget
+    while space_team.bus.queued:
+        clock.advance_us(space_team.bus.period_us)
+        space_team.loop()
+    assert timing.bus_us('I2cLcd rendering') > 0, timing.occupancy
+
+    with timing.subsystem('Test'):
+        space_team.i2c.readfrom_mem(0x20, 0x09, 1)
+    assert timing.bus_us('Test') == BusTiming.transaction_bits(1, 1, register=True) * 1000000 / 400000
+
+    # Nothing else touched the expanders while the pins were sampled
+    assert timing.bus_us('MCP23017.init') == init_us
+    assert BusTiming.OTHER not in timing.occupancy, timing.occupancy
+
+    print(timing.report(ticks=TICKS))
+
+
+def test_advance_clock():
+    board = ShuttleBoard()
+    timing = BusTiming(advance_clock=True)
+    machine.set_bus_timing(timing)
+
+    space_team = SpaceTeam()
+    Log.severity = Log.Severity.NOLOG
+    pin_manager = space_team.pin_manager
+    pin_manager.sub_digital_change(1, lambda pin, value, timestamp: None)
+    pin_manager.sample_timer.fire()
+
+    timing.reset()
+    start = clock.ticks_us()
+    pin_manager._sample_pins(None)
+    elapsed = clock.ticks_diff(clock.ticks_us(), start)
+    # The pass also waits on the analog multiplexer, but never takes less than its time on the bus
+    assert timing.bus_us() > 0 and elapsed >= timing.bus_us(), (elapsed, timing.bus_us())
+    assert pin_manager.telemetry.last_duration == elapsed
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    test_transaction_bits()
+    test_subsystems()
+    test_advance_clock()
+    print('Bus timing test passed')
+
+
+if __name__ == '__main__':
+    main()
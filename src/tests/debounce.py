@@ -0,0 +1,85 @@
+# Host-side test of the digital input debouncing of the pin manager.
+# Bouncy switch waveforms sampled at 1 kHz are fed to the emulated expander one sample per sampling cycle. Without
+# debouncing every bounce is published, with a 4 sample debounce each press and release is published once and short
+# glitches are dropped.
+#
+# Run from the src directory with CPython: python -m tests.debounce
+
+import emulation
+
+emulation.install()
+
+import machine
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+# One character per 1 ms sample, the level seen on the expander pin
+WAVEFORMS = {
+    # Toggle switch closing, a burst of bounces before settling low
+    1: '11111111110100101100010000000000000000000000000000',
+    # Push button released, the contacts chatter while opening
+    2: '00000000001011011101011110111111111111111111111111',
+    # Noise spikes shorter than the debounce time on a switch that does not move
+    3: '11111111110111111111011001111111111111111111111111',
+    # Press and release of a push button with bounce on both edges
+    4: '11111110100000000000000000000000101101111111111111',
+}
+
+# (pin, value) events expected from each waveform once debounced
+DEBOUNCED_EVENTS = {
+    1: [(1, 0)],
+    2: [(2, 1)],
+    3: [],
+    4: [(4, 0), (4, 1)],
+}
+
+
+def run_waveforms(debounce_samples: int):
+    machine.reset()
+    expander = Mcp23017Model(bus=0, address=0x20)
+    for address in (0x21, 0x22):
+        Mcp23017Model(bus=0, address=address)
+
+    pin_manager = PinManager(machine.I2C(0), debounce_samples=debounce_samples)
+    pin_manager.add_sample_group('switches', 1, digital_pins=WAVEFORMS)
+
+    events = []
+    for gpio in WAVEFORMS:
+        pin_manager.sub_digital_change(gpio, lambda pin, value, timestamp: events.append((pin, value)))
+
+    # Settle on the starting levels before recording
+    for gpio, waveform in WAVEFORMS.items():
+        expander.set_input(gpio - 1, int(waveform[0]))
+    for _ in range(debounce_samples + 1):
+        pin_manager.sample_timer.fire()
+    events.clear()
+
+    for sample in range(len(WAVEFORMS[1])):
+        for gpio, waveform in WAVEFORMS.items():
+            expander.set_input(gpio - 1, int(waveform[sample]))
+        pin_manager.sample_timer.fire()
+
+    return events
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+
+    raw = run_waveforms(1)
+    raw_edges = sum(sum(a != b for a, b in zip(waveform, waveform[1:])) for waveform in WAVEFORMS.values())
+    assert len(raw) == raw_edges, f'Expected every one of the {raw_edges} edges, got {len(raw)} events'
+
+    debounced = run_waveforms(4)
+    for gpio, expected in DEBOUNCED_EVENTS.items():
+        published = [event for event in debounced if event[0] == gpio]
+        assert published == expected, f'gpio {gpio}: {published}, expected {expected}'
+
+
+    print(f'Raw events:       {len(raw)}')
+    print(f'Debounced events: {len(debounced)} {debounced}')
+    print('Debounce test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# Host-side benchmark of debouncing all 64 digital inputs each sampling cycle.
+# Compares the vertical counter debouncer of the pin manager with a counter kept for each pin in a loop.
+#
+# Run from the src directory with CPython: python -m tests.debounce_benchmark
+
+import random
+import time
+
+from hardware.debouncer import Debouncer
+
+PIN_COUNT = 64
+SAMPLES = 4
+SLOW_PINS = range(0, PIN_COUNT, 3)
+SLOW_SAMPLES = 7
+CYCLES = 2000
+
+
+class PerPinDebouncer:
+    """ Integrating debouncer that keeps a counter for each pin and visits every pin each cycle. """
+
+    def __init__(self, width: int, samples: int):
+        self.width = width
+        self.samples = [samples] * width
+        self.counters = [0] * width
+
+    def update(self, state: int, raw: int, sampled: int) -> int:
+        for bit in range(self.width):
+            if not sampled >> bit & 1:
+                continue
+            if (raw ^ state) >> bit & 1:
+                self.counters[bit] += 1
+                if self.counters[bit] >= self.samples[bit]:
+                    self.counters[bit] = 0
+                    state ^= 1 << bit
+            else:
+                self.counters[bit] = 0
+        return state
+
+
+def bouncy_words(count: int):
+    """ Input words where a few pins change each cycle and bounce while they change. """
+    generator = random.Random(1)
+    level = (1 << PIN_COUNT) - 1
+    words = []
+    for _ in range(count):
+        if generator.random() < 0.05:
+            level ^= 1 << generator.randrange(PIN_COUNT)
+        noise = 0
+        for _ in range(generator.randrange(3)):
+            noise |= 1 << generator.randrange(PIN_COUNT)
+        words.append(level ^ noise)
+    return words
+
+
+def time_debouncer(debouncer, words) -> (float, list):
+    all_pins = (1 << PIN_COUNT) - 1
+    state = words[0]
+    states = []
+    start = time.perf_counter()
+    for word in words:
+        state = debouncer.update(state, word, all_pins)
+        states.append(state)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(words) * 1e6, states
+
+
+def main():
+    words = bouncy_words(CYCLES)
+
+    vertical = Debouncer(PIN_COUNT, SAMPLES)
+    per_pin = PerPinDebouncer(PIN_COUNT, SAMPLES)
+
+    # Slower switches on every third pin
+    vertical.set_samples(SLOW_PINS, SLOW_SAMPLES)
+    for bit in SLOW_PINS:
+        per_pin.samples[bit] = SLOW_SAMPLES
+
+    vertical_time, vertical_states = time_debouncer(vertical, words)
+    per_pin_time, per_pin_states = time_debouncer(per_pin, words)
+    assert vertical_states == per_pin_states, 'The debouncers disagree'
+
+    print(f'Debouncing {PIN_COUNT} pins with {SAMPLES} or {SLOW_SAMPLES} stable samples (us / cycle)')
+    print(f'  per pin counters:  {per_pin_time:8.3f}')
+    print(f'  vertical counters: {vertical_time:8.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+# Host-side test that the MCP23017 and LCD drivers don't allocate transfer buffers on the sampling and rendering paths.
+# After start up, sampling the subscribed pins and drawing the liquid gauge must not create any buffer in the drivers.
+# The bus must only see the buffers the drivers allocated while starting up, and never the read calls that return a new
+# bytes object. This is not a check that the paths don't allocate at all: publishing the events, the 64-bit pin words
+# and the input trace still allocate, which the allocation figures of the benchmark suite show.
+#
+# Run from the src directory with CPython: python -m tests.driver_buffers
+
+import emulation
+
+emulation.install()
+
+import builtins
+
+import machine
+from display import lcd_pico
+from display.liquid_gauge import LiquidGauge
+from emulation.board import ShuttleBoard
+from hardware import mcp23017
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+DRIVERS = (mcp23017, lcd_pico)
+BUFFER_TYPES = ('bytearray', 'bytes', 'memoryview')
+
+allocations = []
+
+
+def counting(name):
+    allocate = getattr(builtins, name)
+
+    def wrapper(*args, **kwargs):
+        allocations.append(name)
+        return allocate(*args, **kwargs)
+
+    return wrapper
+
+
+def install_counters() -> None:
+    for module in DRIVERS:
+        for name in BUFFER_TYPES:
+            setattr(module, name, counting(name))
+
+
+def remove_counters() -> None:
+    for module in DRIVERS:
+        for name in BUFFER_TYPES:
+            delattr(module, name)
+
+
+class BufferCheckI2C(machine.I2C):
+    """ I2C bus that records the buffers handed to it, and rejects the reads that allocate the result. """
+
+    def __init__(self, id: int):
+        super().__init__(id)
+        self.buffers = set()
+        self.allocating_reads = 0
+
+    def _buffer(self, buf) -> None:
+        self.buffers.add(id(buf.obj if isinstance(buf, memoryview) else buf))
+
+    def writeto(self, address, buf, stop=True):
+        self._buffer(buf)
+        return super().writeto(address, buf, stop)
+
+    def writeto_mem(self, address, memaddr, buf, addrsize=8):
+        self._buffer(buf)
+        super().writeto_mem(address, memaddr, buf, addrsize)
+
+    def readfrom_into(self, address, buf, stop=True):
+        self._buffer(buf)
+        super().readfrom_into(address, buf, stop)
+
+    def readfrom_mem_into(self, address, memaddr, buf, addrsize=8):
+        self._buffer(buf)
+        super().readfrom_mem_into(address, memaddr, buf, addrsize)
+
+    def readfrom(self, address, nbytes, stop=True):
+        self.allocating_reads += 1
+        return super().readfrom(address, nbytes, stop)
+
+    def readfrom_mem(self, address, memaddr, nbytes, addrsize=8):
+        self.allocating_reads += 1
+        return super().readfrom_mem(address, memaddr, nbytes, addrsize)
+
+
+def check_steady_state(i2c: BufferCheckI2C, run) -> None:
+    run(0)
+    start_up_buffers = set(i2c.buffers)
+    allocations.clear()
+    i2c.allocating_reads = 0
+
+    for index in range(1, 200):
+        run(index)
+
+    assert not allocations, f'The drivers allocated {len(allocations)} buffers: {sorted(set(allocations))}'
+    assert i2c.allocating_reads == 0, f'{i2c.allocating_reads} reads allocated their result'
+    assert i2c.buffers == start_up_buffers, 'A buffer from outside the drivers was sent on the bus'
+
+
+def test_sampling_buffers():
+    board = ShuttleBoard()
+    i2c = BufferCheckI2C(ShuttleBoard.I2C_BUS)
+    pin_manager = PinManager(i2c)
+
+    # Only the pins with subscribers are read, so subscribe to pins on every expander and to the analog pins
+    events = []
+
+    def listener(pin, value, timestamp):
+        events.append(pin)
+
+    for gpio in (*range(1, 33), 49, 64):
+        pin_manager.sub_digital_change(gpio, listener)
+    for gpio in (47, 48):
+        pin_manager.sub_analog_change(gpio, listener)
+
+    def sample(index):
+        board.set_input(1 + index % 32, index // 32 & 1)
+        pin_manager.sample_timer.fire()
+        pin_manager.dispatch()
+
+    i2c.reset_counters()
+    check_steady_state(i2c, sample)
+    assert i2c.transactions >= 3 * 200, f'{i2c.transactions} transactions, the expanders were not read every pass'
+    assert events, 'No pin changes were published'
+
+
+def test_rendering_buffers():
+    ShuttleBoard()
+    i2c = BufferCheckI2C(ShuttleBoard.I2C_BUS)
+    gauge = LiquidGauge(i2c)
+
+    def render(index):
+        gauge.set_position((index % 21) / 10 - 1)
+
+    check_steady_state(i2c, render)
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    install_counters()
+    try:
+        test_sampling_buffers()
+        test_rendering_buffers()
+    finally:
+        remove_counters()
+    print('Driver buffer test passed')
+
+
+if __name__ == '__main__':
+    main()
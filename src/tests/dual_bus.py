@@ -0,0 +1,126 @@
+# Host-side test of spreading the expanders and the LCD over both I2C controllers.
+# With the third expander and the liquid gauge on I2C 1, the pin manager has to publish the changes on both buses, write
+# the outputs of the expander on the second bus, and read that expander on the bus worker thread. While the worker runs
+# it is the only thread that writes the outputs of the expander on its bus. Sampling the same session with everything
+# on I2C 0 has to keep the busier bus occupied for longer than the split does.
+#
+# Run from the src directory with CPython: python -m tests.dual_bus
+
+import emulation
+
+emulation.install()
+
+import _thread
+
+import machine
+from display.liquid_gauge import LiquidGauge
+from emulation import mcp23017 as model
+from emulation.board import ShuttleBoard
+from emulation.bus_timing import BusTiming
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+PASSES = 200
+PINS = (3, 20, 50, 60)
+SECOND_BUS = (0x22, ShuttleBoard.LCD_ADDRESS)
+
+
+class ThreadRecordingI2C(machine.I2C):
+    """ Records the threads that read from and write to the bus. """
+
+    def __init__(self, id: int):
+        super().__init__(id)
+        self.threads = set()
+        self.write_threads = set()
+
+    def readfrom_mem_into(self, address, memaddr, buf, addrsize=8):
+        self.threads.add(_thread.get_ident())
+        super().readfrom_mem_into(address, memaddr, buf, addrsize)
+
+    def writeto_mem(self, address, memaddr, buf, addrsize=8):
+        self.write_threads.add(_thread.get_ident())
+        super().writeto_mem(address, memaddr, buf, addrsize)
+
+
+def new_session(second_bus):
+    board = ShuttleBoard(second_bus=second_bus)
+    i2c0 = machine.I2C(ShuttleBoard.I2C_BUS)
+    i2c1 = ThreadRecordingI2C(ShuttleBoard.SECOND_I2C_BUS)
+    pin_manager = PinManager(i2c0, devices=board.device_map(i2c0, i2c1))
+    gauge = LiquidGauge(i2c1 if ShuttleBoard.LCD_ADDRESS in second_bus else i2c0)
+
+    events = []
+    for gpio in PINS:
+        pin_manager.sub_digital_change(gpio, lambda pin, value, timestamp: events.append((pin, value)))
+    return board, pin_manager, gauge, i2c1, events
+
+
+def run_session(board, pin_manager, gauge) -> None:
+    for index in range(PASSES):
+        board.set_input(PINS[index % len(PINS)], index // len(PINS) & 1)
+        pin_manager.sample_timer.fire()
+        if index % 20 == 0:
+            gauge.set_position((index % 21) / 10 - 1)
+
+
+def test_routing():
+    board, pin_manager, gauge, i2c1, events = new_session(SECOND_BUS)
+    pin_manager.start_bus_worker()
+    try:
+        for gpio in PINS:
+            board.set_input(gpio, 1)
+        i2c1.threads.clear()
+        pin_manager.sample_timer.fire()
+        assert sorted(events) == [(gpio, 1) for gpio in PINS], events
+        assert i2c1.threads and _thread.get_ident() not in i2c1.threads, 'The second bus was read on the sampling thread'
+
+        # An output on the second bus is written by the worker at the start of the next pass, flushing from the main
+        # loop leaves it to the worker
+        i2c1.write_threads.clear()
+        pin_manager.set_pin_mode(57, 0)
+        pin_manager.digital_write(57, 1)
+        pin_manager.flush()
+        assert not i2c1.write_threads, 'The second bus was written outside the bus worker'
+        pin_manager.sample_timer.fire()
+        assert board.expanders[2].registers[1][model.OLAT] & 1, 'The output on the second bus was not written'
+        assert not board.expanders[2].registers[1][model.IODIR] & 1
+        assert i2c1.write_threads and _thread.get_ident() not in i2c1.write_threads, i2c1.write_threads
+    finally:
+        pin_manager.stop_bus_worker()
+
+    # Without the worker the second bus is read on the sampling thread
+    events.clear()
+    board.set_input(60, 0)
+    pin_manager.sample_timer.fire()
+    assert events == [(60, 0)], events
+
+
+def critical_bus_us(second_bus) -> float:
+    board, pin_manager, gauge, _, _ = new_session(second_bus)
+    timing = BusTiming()
+    machine.set_bus_timing(timing)
+    pin_manager.start_bus_worker()
+    try:
+        run_session(board, pin_manager, gauge)
+    finally:
+        pin_manager.stop_bus_worker()
+        machine.set_bus_timing(None)
+    print(f'I2C 0: {timing.bus_us(bus=0) / 1000:.1f} ms, I2C 1: {timing.bus_us(bus=1) / 1000:.1f} ms')
+    return max(timing.buses.values())
+
+
+def test_capacity():
+    single = critical_bus_us(())
+    dual = critical_bus_us(SECOND_BUS)
+    assert dual < single * 0.75, f'{dual:.0f} us on the busier bus split, {single:.0f} us on one bus'
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    test_routing()
+    test_capacity()
+    print('Dual bus test passed')
+
+
+if __name__ == '__main__':
+    main()
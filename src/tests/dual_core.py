@@ -0,0 +1,144 @@
+# Host-side test of sampling on the second core, with a host thread standing in for core 1.
+# The snapshot handoff must never give the consumer a torn or out of order snapshot, and the pin manager must keep
+# sampling while a slow callback runs on the first core.
+#
+# Run from the src directory with CPython: python -m tests.dual_core
+
+import emulation
+
+emulation.install()
+
+import _thread
+import time
+
+import machine
+from emulation import clock
+from emulation import mcp23017 as model
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from hardware.sample_group import SampleGroup
+from hardware.snapshot_buffer import Snapshot, SnapshotBuffer
+from loggers.log import Log
+
+SNAPSHOTS = 20000
+TIMEOUT = 5  # s of host time
+
+
+def test_handoff():
+    buffer = SnapshotBuffer(65)
+    finished = []
+
+    def produce():
+        for sequence in range(1, SNAPSHOTS + 1):
+            back = buffer.back()
+            # Written one value at a time so a consumer reading the same buffer would see it half written
+            back.sequence = sequence
+            back.digital = sequence * 0x0001_0001_0001_0001
+            for index in range(len(back.analog)):
+                back.analog[index] = sequence & 0xFFFF
+            published = buffer.publish()
+        # A pass that found the consumer copying is handed over by the next pass, so the last one is repeated until it
+        # gets through
+        while not published:
+            published = buffer.publish()
+        finished.append(True)
+
+    _thread.start_new_thread(produce, ())
+
+    received = Snapshot(65)
+    taken = 0
+    last = 0
+    deadline = time.monotonic() + TIMEOUT
+    while True:
+        assert time.monotonic() < deadline, 'The producer did not finish'
+        done = bool(finished)
+        if not buffer.take(received):
+            if done:
+                break
+            continue
+
+        sequence = received.sequence
+        assert sequence > last, f'Snapshot {sequence} arrived after {last}'
+        assert received.digital == sequence * 0x0001_0001_0001_0001, f'Torn digital state in snapshot {sequence}'
+        assert all(value == sequence & 0xFFFF for value in received.analog), f'Torn analog values in {sequence}'
+        last = sequence
+        taken += 1
+
+    assert last == SNAPSHOTS, f'The newest snapshot {SNAPSHOTS} was never taken, last was {last}'
+    print(f'Handoff: {taken} of {SNAPSHOTS} snapshots taken, {buffer.skipped} replaced by a newer one, none torn')
+
+
+def test_pin_manager():
+    machine.reset()
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    for pin in range(16):
+        expanders[1].set_input(pin, 1)
+
+    pin_manager = PinManager(machine.I2C(0), sample_rate=1)
+    events = []
+
+    def slow_listener(pin, value, timestamp):
+        events.append((pin, value))
+        clock.host_sleep(0.05)
+
+    pin_manager.sub_digital_change(20, slow_listener)
+    pin_manager.start_second_core()
+    group = pin_manager.sample_group(SampleGroup.DIGITAL)
+
+    def dispatch_until(condition):
+        deadline = time.monotonic() + TIMEOUT
+        while not condition():
+            assert time.monotonic() < deadline, 'Timed out waiting for the second core'
+            pin_manager.dispatch()
+
+    # gpio 20 is pin 3 of the second expander. It was already high when it was subscribed to, so only the change is
+    # published
+    expanders[1].set_input(3, 0)
+    samples = group.samples
+    dispatch_until(lambda: events)
+    assert events == [(20, 0)], events
+    assert group.samples > samples + 1, 'Sampling stopped while the callback was running'
+    print(f'Second core: {group.samples - samples} sampling passes while the main loop handled one slow callback')
+
+    # A pin subscribed to while the second core is sampling starts from its current value as well
+    late = []
+    pin_manager.sub_digital_change(21, lambda pin, value, timestamp: late.append((pin, value)))
+    samples = group.samples
+    dispatch_until(lambda: group.samples > samples + 2)
+    expanders[1].set_input(4, 0)
+    dispatch_until(lambda: late)
+    assert late == [(21, 0)], late
+
+    # Output written from the first core goes onto the bus under the bus lock, batched or not
+    expander = pin_manager._expanders[0][0]
+    flush = expander.flush
+    locked = []
+
+    def checked_flush():
+        locked.append(pin_manager.bus_lock.locked())
+        flush()
+
+    expander.flush = checked_flush
+    with pin_manager.batch():
+        pin_manager.set_pin_mode(1, 0)
+        pin_manager.digital_write(1, 1)
+    pin_manager.dispatch()
+    del expander.flush
+    assert locked and all(locked), 'An expander was flushed without the bus lock'
+    assert expanders[0].registers[0][model.OLAT] & 1, 'The batched output was not written'
+
+    pin_manager.stop_second_core()
+    expanders[1].set_input(3, 1)
+    pin_manager.sample_timer.fire()
+    assert events[-1] == (20, 1), 'The timer did not take over sampling'
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    test_handoff()
+    test_pin_manager()
+    print('Dual core test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# Host-side test of the emulated shuttle control module.
+# Runs SpaceTeam, every panel, and the liquid gauge LCD unmodified on the emulated board. Pin changes driven on the
+# expanders and local pins have to reach the panels, the LCD model has to show what the gauge drew, a scripted ADC
+# source has to follow the virtual clock, and the traffic to each device has to be counted.
+#
+# Run from the src directory with CPython: python -m tests.emulated_board
+
+import emulation
+
+emulation.install()
+
+import machine
+from display.liquid_gauge import LiquidGauge
+from emulation import clock
+from emulation.adc_script import AdcScript
+from emulation.board import ShuttleBoard
+from hardware.i2c_arbiter import I2cArbiter
+from hardware.i2c_peripheral import I2cPeripheral
+from loggers.log import Log
+from panels.ecs import ECS
+from panels.engine import Engine
+from panels.flight_control import FlightControl
+from panels.launch import Launch
+from panels.stabilizer import LeftStabilizer, RightStabilizer
+from spaceteam import SpaceTeam
+
+
+def test_panels():
+    board = ShuttleBoard()
+    space_team = SpaceTeam()
+    Log.severity = Log.Severity.NOLOG
+
+    # The panels share the bus through the display client of the arbiter
+    pin_manager = space_team.pin_manager
+    i2c = space_team.i2c
+    assert i2c.arbiter is space_team.bus and i2c.priority == I2cArbiter.Priority.DISPLAY
+    panels = [ECS(pin_manager), Engine(i2c, pin_manager), FlightControl(pin_manager), Launch(pin_manager),
+              LeftStabilizer(i2c, pin_manager), RightStabilizer(i2c, pin_manager)]
+    engine = panels[1]
+
+    events = []
+    engine.sub_cabin_pressure_toggled(lambda state: events.append(state))
+
+    # The expander inputs float low without their pull-ups, so the switch starts out high
+    board.set_input(28, 1)
+    pin_manager.sample_timer.fire()
+    space_team.loop()
+    events.clear()
+
+    # The engine on/off switch is gpio 28 on the second expander, the fuel cell 1 cycle button is local gpio 33
+    board.set_input(28, 0)
+    board.set_input(33, 0)
+    pin_manager.sample_timer.fire()
+    space_team.loop()
+    assert events, 'The engine did not see its switch change'
+    assert pin_manager.digital_read(33) == 0
+
+    traffic = board.traffic()
+    assert set(traffic) == {0x20, 0x21, 0x22, ShuttleBoard.LCD_ADDRESS}, traffic
+    transactions, byte_count = machine.i2c_traffic(ShuttleBoard.I2C_BUS)
+    assert transactions == sum(count for count, _ in traffic.values()) and byte_count > transactions
+    print(board.report())
+
+
+def test_lcd():
+    board = ShuttleBoard()
+    i2c = machine.I2C(ShuttleBoard.I2C_BUS)
+
+    start = clock.ticks_ms()
+    gauge = LiquidGauge(i2c)
+    assert clock.ticks_diff(clock.ticks_ms(), start) >= 100, 'The LCD start up delays did not run on the virtual clock'
+    assert board.lcd.four_bit and board.lcd.display_on and board.lcd.backlight
+    assert board.lcd.custom_char(2) == bytes(LiquidGauge.TOP_LEFT_ARROW)
+
+    gauge.set_position(0)
+    top, bottom = board.lcd.lines()
+    # The middle of the gauge is column 8
+    assert top == chr(0) * 7 + chr(2) + chr(1) + chr(3) + chr(0) * 6, repr(top)
+    assert bottom == chr(4) * 7 + chr(6) + chr(5) + chr(7) + chr(4) * 6, repr(bottom)
+
+    transactions, byte_count = machine.i2c_traffic(ShuttleBoard.I2C_BUS, ShuttleBoard.LCD_ADDRESS)
+    # The address byte of each transaction and a byte for each port write, a whole command or character in one write
+    assert byte_count == transactions + board.lcd.port_writes
+    assert transactions < board.lcd.commands + board.lcd.characters + 10
+    print(f'LCD: {board.lcd.commands} commands, {board.lcd.characters} characters in {transactions} transactions')
+
+
+def test_adc_script():
+    board = ShuttleBoard()
+    board.set_analog(47, AdcScript([(0, 0), (100, 10000)], ramp=True))
+    adc = machine.ADC(1)
+
+    assert adc.read_u16() == 0
+    clock.advance_ms(50)
+    assert adc.read_u16() == 5000
+    clock.advance_ms(100)
+    assert adc.read_u16() == 10000
+
+
+def test_mem32():
+    machine.reset()
+    peripheral = I2cPeripheral(i2c_id=0, address=0x41)
+
+    assert machine.mem32[I2cPeripheral.I2C0_BASE | I2cPeripheral.IC_SAR] == 0x41
+    assert machine.mem32[I2cPeripheral.I2C0_BASE | I2cPeripheral.IC_ENABLE] == 1
+    assert not peripheral.any_read()
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    test_panels()
+    test_lcd()
+    test_adc_script()
+    test_mem32()
+    print('Emulated board test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Host-side test of the timestamps delivered with pin events and the latency statistics.
+# Changes seen in the same sample pass share its timestamp, later passes carry later timestamps, and the time spent in
+# the callbacks shows up in the latency from detecting a change to the end of its callbacks.
+#
+# Run from the src directory with CPython: python -m tests.event_timestamps
+
+import emulation
+
+emulation.install()
+
+import time
+
+import machine
+from emulation import clock
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+CALLBACK_TIME = 300  # us spent in each callback
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    machine.reset()
+
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    for expander in expanders:
+        for pin in range(16):
+            expander.set_input(pin, 1)
+    machine.set_adc_value(1, 1000)
+
+    pin_manager = PinManager(machine.I2C(0), sample_rate=1)
+
+    events = []
+
+    def listener(pin, value, timestamp):
+        events.append((pin, value, timestamp))
+        clock.advance_us(CALLBACK_TIME)
+
+    # gpio 20 and 50 are on different expanders
+    for gpio in (20, 50):
+        pin_manager.sub_digital_change(gpio, listener)
+    pin_manager.sub_analog_change(47, listener)
+
+    pin_manager.sample_timer.fire()
+    events.clear()
+    pin_manager.latency.reset()
+
+    # Both expanders change before the same pass
+    expanders[1].set_input(3, 0)
+    expanders[2].set_input(1, 0)
+    pass_time = time.ticks_us() + 1000
+    pin_manager.sample_timer.fire()
+    assert [event[:2] for event in events] == [(20, 0), (50, 0)], events
+    assert events[0][2] == events[1][2] == pass_time, events
+
+    # Five passes later
+    for _ in range(4):
+        pin_manager.sample_timer.fire()
+    expanders[1].set_input(3, 1)
+    machine.set_adc_value(1, 2000)
+    pass_time = time.ticks_us() + 1000
+    pin_manager.sample_timer.fire()
+    assert [event[:2] for event in events[2:]] == [(20, 1), (47, 2000)], events
+    assert events[2][2] == pass_time, events
+    assert events[3][2] == events[2][2], 'Analog and digital changes of the same pass have different timestamps'
+
+    latency = pin_manager.latency
+    assert latency.count == 4, latency.count
+    assert latency.minimum == CALLBACK_TIME and latency.maximum == 2 * CALLBACK_TIME, str(latency)
+
+    print(f'Events: {events}')
+    print(f'Latency: {latency}')
+    print('Event timestamp test passed')
+
+
+if __name__ == '__main__':
+    main()
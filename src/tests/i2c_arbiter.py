@@ -0,0 +1,221 @@
+# Host-side test of the I2C bus arbiter.
+# A liquid gauge drawn through a display client has to show the same frame as one drawn on the bus directly, with its
+# writes combined into far fewer transactions that never exceed the burst size. Drawing a frame must not wait for the
+# display budget, the writes are queued and sent by flushing the bus, within the budget of each period. A sampling pass
+# fired from a timer callback in the middle of a display transaction has to get onto the bus and see the pin changes. A
+# pass fired while the bus is locked without an owner has to be put off instead of waiting forever. When the bus is
+# released, a waiting sampling client has to get it before a display client that was waiting longer.
+#
+# Run from the src directory with CPython: python -m tests.i2c_arbiter
+
+import emulation
+
+emulation.install()
+
+import _thread
+import time
+
+import machine
+from display.liquid_gauge import LiquidGauge
+from emulation import clock
+from emulation.board import ShuttleBoard
+from emulation.bus_timing import BusTiming
+from hardware.i2c_arbiter import I2cArbiter
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+FRAMES = 40
+TIMEOUT = 5  # s of host time
+DISPLAY_REGISTER = 0x12  # GPIOA
+SAMPLING_REGISTER = 0x13  # GPIOB
+
+
+class RecordingI2C(machine.I2C):
+    """
+    The bus under the arbiter, records the largest write and the registers read, and runs a hook before each write to
+    the LCD.
+    """
+
+    def __init__(self, id: int):
+        super().__init__(id)
+        self.largest_write = 0
+        self.registers_read = []
+        self.before_lcd_write = None
+
+    def readfrom_mem_into(self, address, memaddr, buf, addrsize=8):
+        self.registers_read.append(memaddr)
+        super().readfrom_mem_into(address, memaddr, buf, addrsize)
+
+    def writeto(self, address, buf, stop=True):
+        self.largest_write = max(self.largest_write, len(buf))
+        if address == ShuttleBoard.LCD_ADDRESS and self.before_lcd_write is not None:
+            self.before_lcd_write()
+        return super().writeto(address, buf, stop)
+
+
+def draw_frames(gauge: LiquidGauge) -> None:
+    for frame in range(FRAMES):
+        gauge.set_position((frame % 21) / 10 - 1)
+
+
+def send_queue(arbiter: I2cArbiter) -> None:
+    # Flush the bus from the main loop once each period until the display writes are sent
+    while arbiter.queued:
+        arbiter.flush()
+        clock.advance_us(arbiter.period_us)
+
+
+def lcd_transactions() -> int:
+    transactions, _ = machine.i2c_traffic(ShuttleBoard.I2C_BUS, ShuttleBoard.LCD_ADDRESS)
+    return transactions
+
+
+def test_coalescing():
+    board = ShuttleBoard()
+    gauge = LiquidGauge(machine.I2C(ShuttleBoard.I2C_BUS))
+    machine.reset_i2c_traffic()
+    draw_frames(gauge)
+    direct = lcd_transactions()
+    direct_lines = board.lcd.lines()
+
+    board = ShuttleBoard()
+    i2c = RecordingI2C(ShuttleBoard.I2C_BUS)
+    arbiter = I2cArbiter(i2c, budget_us=1000000)
+    gauge = LiquidGauge(arbiter.client(I2cArbiter.Priority.DISPLAY))
+    send_queue(arbiter)
+    machine.reset_i2c_traffic()
+    draw_frames(gauge)
+    send_queue(arbiter)
+    arbitrated = lcd_transactions()
+
+    assert board.lcd.lines() == direct_lines, board.lcd.lines()
+    assert arbitrated < direct / 4, f'{arbitrated} transactions through the arbiter, {direct} directly'
+    assert i2c.largest_write <= arbiter.burst_size
+    assert arbiter.coalesced > 0
+    print(f'Drew {FRAMES} frames in {arbitrated} transactions, {direct} directly')
+
+
+def test_budget():
+    board = ShuttleBoard()
+    machine.set_bus_timing(BusTiming(advance_clock=True))
+    i2c = machine.I2C(ShuttleBoard.I2C_BUS)
+    arbiter = I2cArbiter(i2c, period_us=20000, budget_us=2000)
+    gauge = LiquidGauge(arbiter.client(I2cArbiter.Priority.DISPLAY))
+    send_queue(arbiter)
+
+    start = clock.ticks_us()
+    arbiter.bus_us[I2cArbiter.Priority.DISPLAY] = 0
+    arbiter.throttled_us = 0
+    # A frame over the budget of a period is queued, drawing it doesn't wait for the next period
+    gauge.set_position(0.5)
+    drawn = clock.ticks_diff(clock.ticks_us(), start)
+    assert drawn < arbiter.period_us and arbiter.queued, f'Drawing took {drawn} us, {arbiter.queued} bytes queued'
+    assert arbiter.throttled_us == 0
+
+    # Drawing faster than the budget for a while fills the queue, and then waits for the budget
+    draw_frames(gauge)
+    send_queue(arbiter)
+    elapsed = clock.ticks_diff(clock.ticks_us(), start)
+
+    display_us = arbiter.bus_us[I2cArbiter.Priority.DISPLAY]
+    periods = elapsed / arbiter.period_us
+    assert arbiter.throttled_us > 0, 'The display was never held back'
+    # Each period can start with one burst over the budget
+    limit = (arbiter.budget_us + arbiter.transaction_us(arbiter.burst_size)) * (periods + 1)
+    assert display_us <= limit, f'{display_us} us of display traffic in {periods:.1f} periods'
+    print(arbiter.report())
+
+
+def test_timer_preemption():
+    board = ShuttleBoard()
+    i2c = RecordingI2C(ShuttleBoard.I2C_BUS)
+    arbiter = I2cArbiter(i2c, budget_us=1000000)
+    pin_manager = PinManager(arbiter.client(I2cArbiter.Priority.SAMPLING))
+    gauge = LiquidGauge(arbiter.client(I2cArbiter.Priority.DISPLAY))
+
+    events = []
+    pin_manager.sub_digital_change(20, lambda pin, value, timestamp: events.append((pin, value)))
+
+    def timer_callback():
+        # The sampling timer interrupts the display while it holds the bus
+        i2c.before_lcd_write = None
+        board.set_input(20, 1)
+        pin_manager.sample_timer.fire()
+
+    i2c.before_lcd_write = timer_callback
+    gauge.set_position(0.5)
+    send_queue(arbiter)
+    pin_manager.dispatch()
+
+    assert events == [(20, 1)], events
+    assert arbiter.transactions[I2cArbiter.Priority.SAMPLING] > 0
+
+
+def test_timer_in_lock_window():
+    board = ShuttleBoard()
+    arbiter = I2cArbiter(machine.I2C(ShuttleBoard.I2C_BUS), budget_us=1000000)
+    pin_manager = PinManager(arbiter.client(I2cArbiter.Priority.SAMPLING))
+    events = []
+    pin_manager.sub_digital_change(20, lambda pin, value, timestamp: events.append((pin, value)))
+
+    # The timer fires after a client on this core took the lock but before it owns the bus. Waiting for the bus
+    # would hang, so the pass is put off to the next tick.
+    board.set_input(20, 1)
+    arbiter._lock.acquire()
+    pin_manager.sample_timer.fire()
+    arbiter._lock.release()
+    assert pin_manager.skipped_passes == 1 and events == [], events
+
+    pin_manager.sample_timer.fire()
+    assert events == [(20, 1)], events
+
+
+def test_class_precedence():
+    ShuttleBoard()
+    i2c = RecordingI2C(ShuttleBoard.I2C_BUS)
+    arbiter = I2cArbiter(i2c, budget_us=1000000)
+    display = arbiter.client(I2cArbiter.Priority.DISPLAY)
+    finished = []
+
+    def read(priority, register):
+        arbiter.client(priority).readfrom_mem_into(0x20, register, bytearray(1))
+        finished.append(priority)
+
+    def wait_for(condition):
+        deadline = time.monotonic() + TIMEOUT
+        while not condition():
+            assert time.monotonic() < deadline, 'Timed out waiting for the clients'
+            clock.host_sleep(0.001)
+
+    def hold_bus():
+        # The display holds the bus while another display client and then a sampling client start waiting for it
+        i2c.before_lcd_write = None
+        _thread.start_new_thread(read, (I2cArbiter.Priority.DISPLAY, DISPLAY_REGISTER))
+        wait_for(lambda: arbiter._waiting[I2cArbiter.Priority.DISPLAY])
+        _thread.start_new_thread(read, (I2cArbiter.Priority.SAMPLING, SAMPLING_REGISTER))
+        wait_for(lambda: arbiter._waiting[I2cArbiter.Priority.SAMPLING])
+
+    i2c.before_lcd_write = hold_bus
+    display.writeto(ShuttleBoard.LCD_ADDRESS, b'\x08')
+    display.flush()
+    wait_for(lambda: len(finished) == 2)
+
+    assert i2c.registers_read == [SAMPLING_REGISTER, DISPLAY_REGISTER], i2c.registers_read
+    assert not any(arbiter._waiting)
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    test_coalescing()
+    try:
+        test_budget()
+    finally:
+        machine.set_bus_timing(None)
+    test_timer_preemption()
+    test_timer_in_lock_window()
+    test_class_precedence()
+    print('I2C arbiter test passed')
+
+
+if __name__ == '__main__':
+    main()
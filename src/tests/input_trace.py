@@ -0,0 +1,150 @@
+# Host-side test of recording and replaying input traces.
+# Records a session of toggling switches and a ramping analog input on the emulated board, then replays the trace on a
+# fresh board as fast as possible. The replay has to publish the same events at the same times as the recording, and
+# the trace has to stay small. Records that don't fit in the ring of the recorder before it is flushed are dropped
+# without breaking the trace.
+#
+# Run from the src directory with CPython: python -m tests.input_trace
+
+import emulation
+
+emulation.install()
+
+import io
+import random
+
+import machine
+from emulation import clock
+from emulation.adc_script import AdcScript
+from emulation.board import ShuttleBoard
+from emulation.trace_player import TracePlayer
+from hardware.input_trace import TraceReader, TraceRecorder, read_varint, unzigzag, write_varint, zigzag
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+PASSES = 2000
+SAMPLE_RATE = 10  # ms
+DIGITAL_PINS = (1, 20, 35, 44, 50, 64)
+ANALOG_PIN = 47
+
+
+def new_session():
+    board = ShuttleBoard()
+    pin_manager = PinManager(machine.I2C(ShuttleBoard.I2C_BUS), sample_rate=SAMPLE_RATE)
+    pin_manager.set_analog_filter([ANALOG_PIN], deadband=256)
+    events = []
+
+    def listener(pin, value, timestamp):
+        events.append((pin, value, timestamp))
+
+    for gpio in DIGITAL_PINS:
+        pin_manager.sub_digital_change(gpio, listener)
+    pin_manager.sub_analog_change(ANALOG_PIN, listener)
+    return board, pin_manager, events
+
+
+def relative(events):
+    start = events[0][2]
+    return [(pin, value, clock.ticks_diff(timestamp, start)) for pin, value, timestamp in events]
+
+
+def test_varint():
+    buffer = bytearray()
+    values = (0, 1, 127, 128, 300, (1 << 63) | 1, (1 << 64) - 1)
+    for value in values:
+        write_varint(buffer, value)
+
+    index = 0
+    for value in values:
+        decoded, index = read_varint(buffer, index)
+        assert decoded == value, (decoded, value)
+    assert index == len(buffer)
+
+    for value in (0, 1, -1, 65535, -65535):
+        assert unzigzag(zigzag(value)) == value
+    assert zigzag(-1) == 1 and zigzag(1) == 2
+
+
+def test_record_and_replay():
+    # ---- Record ----
+    board, pin_manager, recorded = new_session()
+    board.set_analog(ANALOG_PIN, AdcScript([(0, 0), (PASSES * SAMPLE_RATE, 65535)], ramp=True, noise=64))
+    stream = io.BytesIO()
+    recorder = pin_manager.start_trace(stream)
+
+    rng = random.Random(7)
+    for _ in range(PASSES):
+        if rng.random() < 0.05:
+            board.set_input(rng.choice(DIGITAL_PINS), rng.randint(0, 1))
+        pin_manager.sample_timer.fire()
+        pin_manager.dispatch()
+    pin_manager.stop_trace()
+
+    data = stream.getvalue()
+    assert recorder.dropped == 0, f'{recorder.dropped} records did not fit in the ring'
+    assert recorder.records < PASSES, 'Passes without any change were recorded'
+    assert len(data) == recorder.bytes_written
+    # A raw record is a 4 byte timestamp, the 8 byte digital word, and 2 bytes for each analog channel
+    raw_size = 4 + 8 + 2 * len(recorder.analog_gpios)
+    assert len(data) / recorder.records < raw_size / 4, f'{len(data)} bytes for {recorder.records} records'
+    assert len(list(TraceReader(data))) == recorder.records
+    print(f'Recorded {recorder.records} records of {PASSES} passes in {len(data)} bytes')
+
+    # ---- Replay ----
+    board, pin_manager, replayed = new_session()
+    player = TracePlayer(data, board)
+    player.play(pin_manager, speed=None)
+
+    assert player.records == recorder.records
+    assert player.passes <= PASSES
+    assert relative(replayed) == relative(recorded), 'The replay published different events'
+    print(player.report())
+
+
+def test_full_ring():
+    stream = io.BytesIO()
+    recorder = TraceRecorder(stream, analog_gpios=(ANALOG_PIN,), ring_size=16)
+    header = stream.getvalue()
+    for index in range(1, 20):
+        recorder.record(index * 1000, index, {ANALOG_PIN: index * 100})
+    assert stream.getvalue() == header, 'A record was written to the stream outside of flush'
+    assert recorder.dropped > 0
+
+    # The changes of the dropped passes are in the first record after the flush
+    recorder.flush()
+    recorder.record(20000, 20, {ANALOG_PIN: 2000})
+    recorder.flush()
+    assert recorder.bytes_written == len(stream.getvalue())
+    records = [(elapsed, digital, tuple(analog)) for elapsed, digital, analog in TraceReader(stream.getvalue())]
+    assert len(records) == recorder.records
+    assert records[-1] == (19000, 20, (2000,)), records
+
+
+def test_real_time():
+    board, pin_manager, recorded = new_session()
+    stream = io.BytesIO()
+    pin_manager.start_trace(stream)
+    for index in range(20):
+        board.set_input(1, index % 2)
+        pin_manager.sample_timer.fire()
+        pin_manager.dispatch()
+    pin_manager.stop_trace()
+
+    board, pin_manager, replayed = new_session()
+    player = TracePlayer(stream.getvalue(), board)
+    player.play(pin_manager, speed=1.0)
+    assert player.wall_s >= player.virtual_us / 1e6 * 0.9, 'The 1x replay ran faster than real time'
+    assert relative(replayed) == relative(recorded)
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    test_varint()
+    test_record_and_replay()
+    test_full_ring()
+    test_real_time()
+    print('Input trace test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Host-side test of the interrupt driven input mode of the pin manager.
+# Three emulated MCP23017 expanders have their INT lines wired to emulated Pico pins. Polling must not touch the I2C bus
+# and an input change must be delivered by reading only the expander that raised its interrupt.
+#
+# Run from the src directory with CPython: python -m tests.interrupt_mode
+
+import emulation
+
+emulation.install()
+
+import machine
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+INTERRUPT_PINS = (2, 3, 4)
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    machine.reset()
+
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    for expander, pin in zip(expanders, INTERRUPT_PINS):
+        expander.connect_interrupt(int_a=pin)
+        for expander_pin in range(16):
+            expander.set_input(expander_pin, 1)
+
+    i2c = machine.I2C(0, sda=machine.Pin(16), scl=machine.Pin(17), freq=400000)
+    pin_manager = PinManager(i2c, sample_mode=PinManager.SampleMode.INTERRUPT, interrupt_pins=INTERRUPT_PINS)
+
+    events = []
+    pin_manager.sub_digital_change(20, lambda pin, value, timestamp: events.append((pin, value)))
+    pin_manager.sub_digital_change(64, lambda pin, value, timestamp: events.append((pin, value)))
+    pin_manager.sub_digital_change(33, lambda pin, value, timestamp: events.append((pin, value)))
+
+    # Idle sampling cycles only sample the analog pins, which are not on the I2C bus
+    i2c.reset_counters()
+    for _ in range(20):
+        pin_manager.sample_timer.fire()
+    assert i2c.transactions == 0, f'Idle cycles used the I2C bus: {i2c.transactions} transactions'
+    print('Idle sampling: 0 I2C transactions')
+
+    # gpio 20 is pin 3 of the second expander
+    expanders[1].set_input(3, 0)
+    assert events == [(20, 0)], events
+    assert i2c.transactions == 1, f'Expected a single interrupt read, got {i2c.transactions} transactions'
+    print(f'Press on gpio 20: {i2c.transactions} I2C transaction, {i2c.bytes_transferred} bytes')
+
+    expanders[1].set_input(3, 1)
+    assert events[-1] == (20, 1), events
+
+    # gpio 64 is the last pin of the third expander
+    expanders[2].set_input(15, 0)
+    assert events[-1] == (64, 0), events
+
+    # Local pins are delivered by their own pin interrupt, gpio 33 is Pico pin 6
+    i2c.reset_counters()
+    machine.set_pin_level(6, 0)
+    assert events[-1] == (33, 0), events
+    assert i2c.transactions == 0
+    print(f'Events: {events}')
+
+    print('Interrupt mode test passed')
+
+
+if __name__ == '__main__':
+    main()
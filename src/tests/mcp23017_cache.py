@@ -0,0 +1,173 @@
+# Host-side test of the register cache and the paired port access of the MCP23017 driver.
+# Configuration reads have to come from the cache without touching the bus, and 16-bit registers have to take a single
+# 2-byte transaction in bank 0. In bank 1, and in bank 0 with sequential operation disabled, the ports are not adjacent
+# and every register still has to reach the right port. Starting the driver again on a chip left in bank 1 has to reset
+# every register. A flush called from a timer callback in the middle of another flush must not write anything, and the
+# writes made in between have to reach the chip with the next flush.
+#
+# Run from the src directory with CPython: python -m tests.mcp23017_cache
+
+import emulation
+
+emulation.install()
+
+import machine
+from emulation import mcp23017 as model
+from emulation.mcp23017 import Mcp23017Model
+from hardware.mcp23017 import MCP23017
+from loggers.log import Log
+
+
+def new_expander():
+    machine.reset()
+    chip = Mcp23017Model(bus=0, address=0x20)
+    i2c = machine.I2C(0)
+    expander = MCP23017(i2c, 0x20)
+    return chip, i2c, expander
+
+
+def check_registers(chip: Mcp23017Model, expander: MCP23017) -> None:
+    assert chip.registers[0][model.IODIR] | chip.registers[1][model.IODIR] << 8 == expander.mode
+    assert chip.registers[0][model.GPPU] | chip.registers[1][model.GPPU] << 8 == expander.pullup
+    assert chip.registers[0][model.OLAT] | chip.registers[1][model.OLAT] << 8 == expander.output_latch
+    assert chip.registers[0][model.GPINTEN] | chip.registers[1][model.GPINTEN] << 8 == expander.interrupt_enable
+
+
+def test_bank0():
+    chip, i2c, expander = new_expander()
+
+    # IOCON is cleared in both banks, then the whole register block is written in one burst
+    assert expander.transactions == 3, expander.transactions
+    check_registers(chip, expander)
+
+    # Cached configuration reads cost nothing
+    i2c.reset_counters()
+    assert expander.mode == 0xFFFF and expander.pullup == 0 and expander.io_config == 0
+    expander.pin(3, mode=0, value=1, pullup=0)
+    expander.pin(12, pullup=1, interrupt_enable=1)
+    # One write for each keyword, and the gpio read that `pin` returns when no value is given
+    assert i2c.transactions == 6, i2c.transactions
+
+    # A 16-bit register is one 2-byte write
+    i2c.reset_counters()
+    expander.mode = 0x0F0F
+    assert i2c.transactions == 1 and i2c.bytes_transferred == 3
+    check_registers(chip, expander)
+
+    # Both ports of the gpio are read together
+    chip.set_input(8, 1)
+    chip.set_input(0, 1)
+    i2c.reset_counters()
+    assert expander.read_gpio() & 0x0101 == 0x0101
+    assert i2c.transactions == 1
+
+
+def test_bank1():
+    chip, i2c, expander = new_expander()
+    expander.config(bank=1)
+    assert chip.registers[0][model.IOCON] & model.IOCON_BANK
+
+    i2c.reset_counters()
+    expander.mode = 0xF0F0
+    expander.pullup = 0xA500
+    expander.pin(9, mode=0, value=1)
+    expander.pin(1, interrupt_enable=1)
+    # The ports take a transaction each, the config registers still come from the cache
+    assert i2c.transactions == 2 + 2 + 2 + 2, i2c.transactions
+    check_registers(chip, expander)
+
+    chip.set_input(4, 1)
+    chip.set_input(12, 1)
+    assert expander.read_gpio() & 0x1010 == 0x1010
+
+
+def test_soft_reset():
+    # The chip keeps bank 1 without sequential operation through a soft reset of the Pico
+    chip, i2c, expander = new_expander()
+    expander.config(bank=1, sequential_operation=1)
+    expander.mode = 0x1234
+    expander = MCP23017(i2c, 0x20)
+
+    assert chip.registers[0][model.IOCON] == 0, chip.registers[0][model.IOCON]
+    assert expander.mode == 0xFFFF and expander.output_latch == 0
+    check_registers(chip, expander)
+
+
+def test_sequential_disabled():
+    chip, i2c, expander = new_expander()
+    expander.config(sequential_operation=1)
+
+    i2c.reset_counters()
+    expander.pullup = 0x8001
+    expander.output_latch = 0x4002
+    assert i2c.transactions == 4
+    check_registers(chip, expander)
+
+
+def test_deferred():
+    chip, i2c, expander = new_expander()
+    expander.deferred_writes = True
+
+    i2c.reset_counters()
+    expander.mode = 0x00FF
+    expander.output_latch = 0xFF00
+    assert i2c.transactions == 0
+    expander.flush()
+    assert i2c.transactions == 2
+    check_registers(chip, expander)
+
+
+class HookedI2C(machine.I2C):
+    """ Records the registers written, and runs a hook in the middle of the first write. """
+
+    def __init__(self, id: int):
+        super().__init__(id)
+        self.written = []
+        self.hook = None
+
+    def writeto_mem(self, address, memaddr, buf, addrsize=8):
+        self.written.append(memaddr)
+        if self.hook is not None:
+            hook, self.hook = self.hook, None
+            hook()
+        super().writeto_mem(address, memaddr, buf, addrsize)
+
+
+def test_reentrant_flush():
+    machine.reset()
+    chip = Mcp23017Model(bus=0, address=0x20)
+    i2c = HookedI2C(0)
+    expander = MCP23017(i2c, 0x20)
+    expander.deferred_writes = True
+    expander.mode = 0x00FF
+    expander.output_latch = 0xFF00
+
+    def timer_callback():
+        expander.pullup = 0x0101
+        expander.flush()
+
+    i2c.hook = timer_callback
+    i2c.written.clear()
+    expander.flush()
+    # The output latch is still written before the direction, once each
+    assert i2c.written == [model.OLAT << 1, model.IODIR << 1], i2c.written
+
+    i2c.written.clear()
+    expander.flush()
+    assert i2c.written == [model.GPPU << 1], i2c.written
+    check_registers(chip, expander)
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    test_bank0()
+    test_bank1()
+    test_soft_reset()
+    test_sequential_disabled()
+    test_deferred()
+    test_reentrant_flush()
+    print('MCP23017 cache test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Host-side test of the batched output API of the pin manager.
+# A panel refresh sets the mode and value of 32 expander pins and 4 local pins inside a batch. Sampling cycles that run
+# during the batch must not write any of the outputs, and the batch commits with one transaction for each changed
+# register of each expander.
+#
+# Run from the src directory with CPython: python -m tests.output_batch
+
+import emulation
+
+emulation.install()
+
+import machine
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+EXPANDER_PINS = range(1, 33)
+LOCAL_PINS = range(33, 37)
+
+
+def refresh_panel(pin_manager: PinManager, value: int) -> None:
+    for gpio in (*EXPANDER_PINS, *LOCAL_PINS):
+        pin_manager.set_pin_mode(gpio, 0)
+        pin_manager.digital_write(gpio, value)
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    machine.reset()
+
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    i2c = machine.I2C(0)
+    pin_manager = PinManager(i2c)
+
+    # Writing straight to the bus, the way digital_write worked before the shadow registers
+    for expander, _ in pin_manager._expanders:
+        expander.deferred_writes = False
+    i2c.reset_counters()
+    refresh_panel(pin_manager, 0)
+    unbatched = i2c.transactions
+    for expander, _ in pin_manager._expanders:
+        expander.deferred_writes = True
+
+    i2c.reset_counters()
+    with pin_manager.batch():
+        refresh_panel(pin_manager, 1)
+
+        # A sampling cycle in the middle of the batch reads the inputs but leaves the outputs alone
+        pin_manager.sample_timer.fire()
+        assert expanders[0].port_value(0) == 0x00 and expanders[1].port_value(1) == 0x00
+        assert machine.Pin(6).value() == 0, 'Local pin changed before the batch was committed'
+
+        # Nested batches commit with the outermost one
+        with pin_manager.batch():
+            pin_manager.digital_write(16, 0)
+        assert expanders[0].port_value(1) == 0x00
+
+        i2c.reset_counters()
+
+    batched = i2c.transactions
+    assert expanders[0].port_value(0) == 0xFF and expanders[0].port_value(1) == 0x7F
+    assert expanders[1].port_value(0) == 0xFF and expanders[1].port_value(1) == 0xFF
+    assert expanders[2].port_value(0) == 0x00
+    assert all(pin_manager.local_pins[gpio].value() == 1 for gpio in LOCAL_PINS)
+    assert all(pin_manager.local_pins[gpio].mode() == machine.Pin.OUT for gpio in LOCAL_PINS)
+
+    # Output latch and direction of the two expanders that changed
+    assert batched == 4, f'Expected 4 transactions for the batch, got {batched}'
+
+    print(f'Refreshing {len(EXPANDER_PINS)} expander pins and {len(LOCAL_PINS)} local pins')
+    print(f'  unbatched: {unbatched} I2C transactions')
+    print(f'  batched:   {batched} I2C transactions')
+    print('Output batch test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# Host-side test of the expander output latch shadow registers.
+# Lights 10 LEDs on the first expander and counts the I2C transactions. The read-modify-write through the GPIO register
+# costs two transactions per LED, the shadowed writes are flushed as a single transaction for the expander.
+#
+# Run from the src directory with CPython: python -m tests.output_latch
+
+import emulation
+
+emulation.install()
+
+import machine
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+LED_PINS = range(1, 11)
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    machine.reset()
+
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    i2c = machine.I2C(0)
+    pin_manager = PinManager(i2c)
+
+    for gpio in LED_PINS:
+        pin_manager.set_pin_mode(gpio, 0)
+    pin_manager.flush()
+
+    # Read-modify-write of the GPIO register for every LED, the way VirtualPin wrote pins before the shadow registers
+    pin_manager.pins1to16.deferred_writes = False
+    i2c.reset_counters()
+    for gpio in LED_PINS:
+        expander, port, bit = pin_manager._routes[gpio]
+        port.gpio = port.gpio | bit
+    read_modify_write = i2c.transactions
+    pin_manager.pins1to16.deferred_writes = True
+    assert expanders[0].port_value(0) == 0xFF and (expanders[0].port_value(1) & 0x03) == 0x03
+
+    for gpio in LED_PINS:
+        pin_manager.digital_write(gpio, 0)
+    pin_manager.flush()
+    assert expanders[0].port_value(0) == 0x00
+
+    # Shadowed writes reach the chip on the next sampling cycle
+    i2c.reset_counters()
+    for gpio in LED_PINS:
+        pin_manager.digital_write(gpio, 1)
+    assert i2c.transactions == 0, 'Writes went to the bus before the flush'
+    assert expanders[0].port_value(0) == 0x00
+
+    pin_manager.flush()
+    shadowed = i2c.transactions
+    assert expanders[0].port_value(0) == 0xFF and (expanders[0].port_value(1) & 0x03) == 0x03
+    assert shadowed == 1, f'Expected one transaction for the expander, got {shadowed}'
+
+    # Nothing is written when no outputs changed
+    i2c.reset_counters()
+    pin_manager.flush()
+    assert i2c.transactions == 0
+
+    print(f'Lighting {len(LED_PINS)} LEDs')
+    print(f'  read-modify-write: {read_modify_write} I2C transactions')
+    print(f'  shadow and flush:  {shadowed} I2C transaction')
+    print('Output latch test passed')
+
+
+if __name__ == '__main__':
+    main()
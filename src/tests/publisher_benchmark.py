@@ -0,0 +1,56 @@
+# Host-side benchmark of the publisher dispatch cost.
+# Publishes a single message while the total number of unrelated subscriptions grows. The time per publish should stay
+# flat because sending a message only visits the listeners subscribed to that message.
+#
+# Run from the src directory with CPython: python -m tests.publisher_benchmark
+
+import time
+
+from loggers.log import Log
+from pubsub.publisher import Publisher
+
+
+class Listener:
+    def __init__(self):
+        self.calls = 0
+
+    def callback(self, **kwargs):
+        self.calls += 1
+
+
+def time_publish(subscriptions: int, publishes: int = 10000) -> float:
+    """
+    Time publishing a message with a single listener on a publisher holding the given number of subscriptions.
+
+    :param subscriptions: Total number of subscriptions registered on the publisher
+    :param publishes: Number of messages sent for the measurement
+    :return: Average time per publish in microseconds
+    """
+    publisher = Publisher()
+    listeners = [Listener() for _ in range(subscriptions)]
+    for index, listener in enumerate(listeners):
+        publisher.subscribe(f'Benchmark.Message_{index}', listener.callback)
+
+    start = time.perf_counter()
+    for _ in range(publishes):
+        publisher.send_message('Benchmark.Message_0', pin=1, value=0)
+    elapsed = time.perf_counter() - start
+
+    assert listeners[0].calls == publishes
+    return elapsed / publishes * 1e6
+
+
+def main():
+    severity = Log.severity
+    Log.severity = Log.Severity.NOLOG
+
+    print('Publisher dispatch benchmark')
+    print(f'{"subscriptions":>14} | {"us / publish":>12}')
+    for subscriptions in (10, 100, 1000, 5000):
+        print(f'{subscriptions:>14} | {time_publish(subscriptions):>12.3f}')
+
+    Log.severity = severity
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,32 @@
 # Testing the functionality of the rotary encoder
+from machine import I2C, Pin
+
+from hardware.pin_manager import PinManager
 from sensor.rotary_encoder import RotaryEncoder
 
 # ---- Variables ----
 
-encoder = RotaryEncoder(5, 4, 2, 3)
+i2c = I2C(0, sda=Pin(16), scl=Pin(17), freq=400000)
+pin_manager = PinManager(i2c)
+encoder = RotaryEncoder(5, 4, 2, 3, pin_manager)
 
 
 # ---- Events ----
 
 
-def on_change():
-    print(f'Encoder Position: "{encoder.position}"')
+def on_change(value):
+    print(f'Encoder Position: "{value}"')
 
 
 # ---- Initialization ----
 
 def setup():
-    encoder.on_change(on_change)
+    encoder.sub_encoder_change(on_change)
 
 
 def loop():
-    encoder.update()
+    # The encoder pins are sampled by the pin manager, this only publishes when sampling on the second core
+    pin_manager.dispatch()
     print(f'Looping... Encoder Position: "{encoder.position}"')
 
 
@@ -0,0 +1,111 @@
+# Host-side benchmark of the per call overhead of routing a gpio to its device.
+# Compares the routing table of the pin manager with the if/elif ladders that it replaced. The expanders are pointed at
+# a bus that answers immediately so the timings only contain the routing and driver overhead.
+#
+# Run from the src directory with CPython: python -m tests.routing_benchmark
+
+import emulation
+
+emulation.install()
+
+import time
+
+import machine
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+
+class ImmediateI2C:
+    """ I2C bus that completes every transaction without any emulation cost. """
+
+    def readfrom_mem(self, address, memaddr, nbytes, addrsize=8):
+        return bytes(nbytes)
+
+    def readfrom_mem_into(self, address, memaddr, buf, addrsize=8):
+        pass
+
+    def writeto_mem(self, address, memaddr, buf, addrsize=8):
+        pass
+
+
+def ladder_digital_read(pin_manager: PinManager, gpio: int) -> int:
+    """ The if/elif ladder that `PinManager.digital_read` used before the routing table. """
+    if gpio <= 0:
+        return 0
+    elif gpio <= 16:
+        return pin_manager.pins1to16[gpio - 1].value()
+    elif gpio <= 32:
+        return pin_manager.pins17to32[gpio - 17].value()
+    elif gpio <= 46:
+        return pin_manager.local_pins[gpio].value()
+    elif gpio <= 48:
+        return 0
+    elif gpio <= 64:
+        # The ladder used `gpio - 48` here, which is off by one and fails on gpio 64
+        return pin_manager.pins49to64[gpio - 49].value()
+    else:
+        return 0
+
+
+def ladder_digital_write(pin_manager: PinManager, gpio: int, value: int) -> None:
+    """ The if/elif ladder that `PinManager.digital_write` used before the routing table. """
+    if gpio < 0:
+        return
+    elif gpio <= 16:
+        pin_manager.pins1to16[gpio - 1].value(value)
+    elif gpio <= 32:
+        pin_manager.pins17to32[gpio - 17].value(value)
+    elif gpio <= 46:
+        pin_manager.local_pins[gpio].value(value)
+    elif gpio <= 48:
+        return
+    elif gpio <= 64:
+        pin_manager.pins49to64[gpio - 49].value(value)
+
+
+def time_calls(call, repeats: int = 200) -> float:
+    """
+    Time calling a function for every gpio.
+
+    :return: Average time per call in microseconds
+    """
+    gpios = range(1, PinManager.PIN_COUNT + 1)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for gpio in gpios:
+            call(gpio)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeats * len(gpios)) * 1e6
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    machine.reset()
+
+    for address in (0x20, 0x21, 0x22):
+        Mcp23017Model(bus=0, address=address)
+
+    pin_manager = PinManager(machine.I2C(0))
+    for expander, _ in pin_manager._expanders:
+        expander._i2c = ImmediateI2C()
+
+    # Both paths have to agree on every pin before comparing their speed
+    for gpio in range(1, PinManager.PIN_COUNT + 1):
+        assert ladder_digital_read(pin_manager, gpio) == pin_manager.digital_read(gpio), gpio
+
+    results = (
+        ('digital_read', time_calls(lambda gpio: ladder_digital_read(pin_manager, gpio)),
+         time_calls(pin_manager.digital_read)),
+        ('digital_write', time_calls(lambda gpio: ladder_digital_write(pin_manager, gpio, 1)),
+         time_calls(lambda gpio: pin_manager.digital_write(gpio, 1))),
+    )
+
+    print('Pin routing benchmark (us / call)')
+    print(f'{"call":>14} | {"ladder":>8} | {"table":>8}')
+    for name, ladder, table in results:
+        print(f'{name:>14} | {ladder:>8.3f} | {table:>8.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# Host-side test of the per group sample rates of the pin manager.
+# The launch e-stop is sampled every 1 ms and a toggle on the second expander every 5 ms, the analog pots every 100 ms,
+# and the remaining pins stay on the default 50 ms period. Runs two seconds of virtual time and checks the measured
+# rates, the e-stop latency, and the bus transactions spent on sampling.
+#
+# Run from the src directory with CPython: python -m tests.sample_groups
+
+import emulation
+
+emulation.install()
+
+import machine
+from emulation.mcp23017 import Mcp23017Model
+from hardware.adcmux import AdcMux
+from hardware.pin_manager import PinManager
+from hardware.sample_group import SampleGroup
+from loggers.log import Log
+
+E_STOP = 36  # Local pin, Pico pin 9
+TOGGLE = 20  # Second expander, pin 3
+RUN_TIME = 2000  # ms
+ADC_MUX_PINS = (0, 2, 3, 4, 5)  # ADC 0, select lines on Pico pins 2 -> 5
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    machine.reset()
+
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    i2c = machine.I2C(0)
+    pin_manager = PinManager(i2c, sample_rate=50, adc_mux=AdcMux(*ADC_MUX_PINS))
+
+    pin_manager.add_sample_group('e-stop', 1, digital_pins=[E_STOP])
+    pin_manager.add_sample_group('toggle', 5, digital_pins=[TOGGLE])
+    pin_manager.add_sample_group('pots', 100, analog_pins=range(1, 9))
+    assert pin_manager.sample_timer.period == 1, pin_manager.sample_timer.period
+    assert not pin_manager.sample_group(SampleGroup.DIGITAL).digital_mask & (1 << (E_STOP - 1))
+
+    # Only pins with subscribers are sampled, watch every pin the way the pin logger does
+    for gpio in range(1, PinManager.PIN_COUNT + 1):
+        pin_manager.sub_digital_change(gpio, lambda pin, value, timestamp: None)
+    for gpio in range(1, 17):
+        pin_manager.sub_analog_change(gpio, lambda pin, value, timestamp: None)
+
+    events = []
+    pin_manager.sub_digital_change(E_STOP, lambda pin, value, timestamp: events.append((pin, value)))
+
+    i2c.reset_counters()
+    for cycle in range(RUN_TIME):
+        if cycle == 1000:
+            events.clear()
+            machine.set_pin_level(9, 0)
+            pin_manager.sample_timer.fire()
+            assert events == [(E_STOP, 0)], 'The e-stop was not seen on the next 1 ms cycle'
+            continue
+        pin_manager.sample_timer.fire()
+
+    rates = pin_manager.sample_rates()
+    for name, expected in (('e-stop', 1000), ('toggle', 200), ('pots', 10), (SampleGroup.DIGITAL, 20),
+                           (SampleGroup.ANALOG, 20)):
+        assert abs(rates[name] - expected) < expected * 0.01, f'{name}: {rates[name]} Hz, expected {expected} Hz'
+
+    # The toggle reads its expander 400 times, the default group reads all three expanders 40 times
+    assert i2c.transactions == 400 + 3 * 40, i2c.transactions
+
+    print('Measured sample rates')
+    for name, rate in rates.items():
+        print(f'  {name:>8}: {rate:7.1f} Hz')
+    print(f'I2C transactions in {RUN_TIME} ms: {i2c.transactions}, every pin at 1 ms would take {3 * RUN_TIME}')
+    print('Sample group test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# Host-side test of the sampling pass telemetry of the pin manager.
+# Samples every expander each 1 ms pass while a slow callback on one pin makes some passes overrun the period. The
+# telemetry has to count the overruns, report the slow passes in the maximum and p99, and count the bus transactions.
+#
+# Run from the src directory with CPython: python -m tests.sample_telemetry
+
+import emulation
+
+emulation.install()
+
+import machine
+from emulation import clock
+from emulation.mcp23017 import Mcp23017Model
+from hardware.pin_manager import PinManager
+from loggers.log import Log
+
+PASSES = 200
+SLOW_CALLBACK = 1500  # us
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    machine.reset()
+
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    pin_manager = PinManager(machine.I2C(0), sample_rate=1)
+
+    def slow_listener(pin, value, timestamp):
+        clock.advance_us(SLOW_CALLBACK)
+
+    for gpio in (1, 17, 49):
+        pin_manager.sub_digital_change(gpio, lambda pin, value, timestamp: None)
+    pin_manager.sub_digital_change(2, slow_listener)
+
+    pin_manager.sample_timer.fire()
+    pin_manager.telemetry.reset()
+
+    # Toggling gpio 2 on every 50th pass runs the slow callback
+    slow_passes = 0
+    for index in range(PASSES):
+        if index % 50 == 0:
+            expanders[0].set_input(1, 1 - index // 50 % 2)
+            slow_passes += 1
+        pin_manager.sample_timer.fire()
+
+    telemetry = pin_manager.telemetry
+    assert telemetry.passes == PASSES, telemetry.passes
+    assert telemetry.overruns == slow_passes, f'{telemetry.overruns} overruns, expected {slow_passes}'
+    assert telemetry.maximum() >= SLOW_CALLBACK
+    assert telemetry.percentile(99) >= SLOW_CALLBACK and telemetry.percentile(50) < SLOW_CALLBACK
+    assert telemetry.max_jitter() >= SLOW_CALLBACK, 'The passes after the slow ones did not start late'
+    assert telemetry.max_transactions() == 3 and telemetry.average_transactions() == 3.0
+
+    Log.severity = Log.Severity.INFO
+    pin_manager.log_telemetry()
+    print('Sample telemetry test passed')
+
+
+if __name__ == '__main__':
+    main()
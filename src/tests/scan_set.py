@@ -0,0 +1,126 @@
+# Host-side test of the subscription aware scan set of the pin manager.
+# Sampling cycles only read the expanders that hold pins with subscribers, and the scan set follows subscribing and
+# unsubscribing. In interrupt mode only the subscribed expander pins have interrupt-on-change enabled. Without an analog
+# multiplexer only the local ADC pins are sampled. Subscribing to a pin out of range raises a ValueError.
+#
+# Run from the src directory with CPython: python -m tests.scan_set
+
+import emulation
+
+emulation.install()
+
+import machine
+from emulation.mcp23017 import Mcp23017Model, GPINTEN
+from hardware.adcmux import AdcMux
+from hardware.pin_manager import PinManager
+from hardware.sample_group import SampleGroup
+from loggers.log import Log
+
+CYCLES = 10
+ADC_MUX_PINS = (0, 2, 3, 4, 5)  # ADC 0, select lines on Pico pins 2 -> 5
+
+
+def transactions_per_cycle(pin_manager: PinManager) -> float:
+    pin_manager.i2c.reset_counters()
+    for _ in range(CYCLES):
+        pin_manager.sample_timer.fire()
+    return pin_manager.i2c.transactions / CYCLES
+
+
+def listener(pin, value, timestamp):
+    pass
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    machine.reset()
+
+    for address in (0x20, 0x21, 0x22):
+        Mcp23017Model(bus=0, address=address)
+    pin_manager = PinManager(machine.I2C(0), adc_mux=AdcMux(*ADC_MUX_PINS))
+
+    assert transactions_per_cycle(pin_manager) == 0, 'Pins without subscribers were sampled'
+
+    pin_manager.sub_digital_rising(5, listener)
+    assert transactions_per_cycle(pin_manager) == 1
+
+    # Local pins are not on the bus, a second pin on the same expander shares its read
+    pin_manager.sub_digital_change(40, listener)
+    pin_manager.sub_digital_falling(12, listener)
+    assert transactions_per_cycle(pin_manager) == 1
+
+    pin_manager.sub_digital_change(50, listener)
+    assert transactions_per_cycle(pin_manager) == 2
+
+    pin_manager.unsub_digital_rising(5, listener)
+    pin_manager.unsub_digital_falling(12, listener)
+    assert transactions_per_cycle(pin_manager) == 1
+
+    digital = pin_manager.sample_group(SampleGroup.DIGITAL)
+    assert digital.scan_mask == (1 << 39) | (1 << 49), bin(digital.scan_mask)
+
+    pin_manager.sub_analog_change(3, listener)
+    pin_manager.sub_analog_change(47, listener)
+    assert pin_manager.sample_group(SampleGroup.ANALOG).analog_scan == (3, 47)
+    pin_manager.unsub_analog_change(3, listener)
+    assert pin_manager.sample_group(SampleGroup.ANALOG).analog_scan == (47,)
+
+    pin_manager.unsub_digital_change(40, listener)
+    pin_manager.unsub_digital_change(50, listener)
+    assert transactions_per_cycle(pin_manager) == 0
+
+    # A pin that sat high before it was subscribed to only publishes the changes after that
+    machine.reset()
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    pin_manager = PinManager(machine.I2C(0), debounce_samples=3)
+    expanders[0].set_input(5, 1)
+    pin_manager.sample_timer.fire()
+    events = []
+    pin_manager.sub_digital_change(6, lambda pin, value, timestamp: events.append((pin, value)))
+    for _ in range(CYCLES):
+        pin_manager.sample_timer.fire()
+    assert events == [], events
+    expanders[0].set_input(5, 0)
+    for _ in range(CYCLES):
+        pin_manager.sample_timer.fire()
+    assert events == [(6, 0)], events
+
+    # Interrupt-on-change follows the subscriptions
+    machine.reset()
+    expanders = [Mcp23017Model(bus=0, address=address) for address in (0x20, 0x21, 0x22)]
+    for expander, pin in zip(expanders, (2, 3, 4)):
+        expander.connect_interrupt(int_a=pin)
+    pin_manager = PinManager(machine.I2C(0), sample_mode=PinManager.SampleMode.INTERRUPT, interrupt_pins=(2, 3, 4))
+    assert all(expander.registers[port][GPINTEN] == 0 for expander in expanders for port in (0, 1))
+
+    pin_manager.sub_digital_change(20, listener)
+    assert expanders[1].registers[0][GPINTEN] == 0x08 and expanders[1].registers[1][GPINTEN] == 0x00
+    pin_manager.unsub_digital_change(20, listener)
+    assert expanders[1].registers[0][GPINTEN] == 0x00
+
+    # Without a multiplexer the pins 1 -> 16 have no analog input, only the local ADC pins are sampled
+    machine.reset()
+    for address in (0x20, 0x21, 0x22):
+        Mcp23017Model(bus=0, address=address)
+    pin_manager = PinManager(machine.I2C(0))
+    assert pin_manager.adc is None
+    assert pin_manager.sample_group(SampleGroup.ANALOG).analog_pins == (47, 48)
+    pin_manager.sub_analog_change(3, listener)
+    assert pin_manager.sample_group(SampleGroup.ANALOG).analog_scan == ()
+
+    # Subscribing to a pin out of range fails without leaving a subscription behind
+    subscribers = dict(pin_manager.publisher.subscribers)
+    for gpio in (0, -1, PinManager.PIN_COUNT + 1):
+        try:
+            pin_manager.sub_digital_change(gpio, listener)
+        except ValueError:
+            pass
+        else:
+            assert False, f'Subscribed to GPIO {gpio}'
+    assert pin_manager.publisher.subscribers == subscribers
+
+    print('Scan set test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# Host-side test of bringing up the module with a `Startup`.
+# Starts the expanders and two LCD displays one after the other, then again through a startup, on the virtual clock with
+# the bus time modelled. The startup has to scan the bus once, keep the power up delays of each LCD, leave every device
+# in the same state as the plain start, and take less time.
+#
+# Run from the src directory with CPython: python -m tests.startup
+
+import emulation
+
+emulation.install()
+
+import machine
+from display.liquid_gauge import LiquidGauge
+from display.stability import Stability
+from emulation import clock
+from emulation import mcp23017 as model
+from emulation.board import ShuttleBoard
+from emulation.bus_timing import BusTiming
+from emulation.pcf8574 import Pcf8574LcdModel
+from hardware.pin_manager import PinManager
+from hardware.startup import Startup
+from loggers.log import Log
+
+STABILITY_ADDRESS = 0x26
+
+
+class ScanCountI2C(machine.I2C):
+    def __init__(self, id: int):
+        super().__init__(id)
+        self.scans = 0
+
+    def scan(self):
+        self.scans += 1
+        return super().scan()
+
+
+def new_board():
+    board = ShuttleBoard()
+    stability_lcd = Pcf8574LcdModel(bus=ShuttleBoard.I2C_BUS, address=STABILITY_ADDRESS)
+    machine.set_bus_timing(BusTiming(advance_clock=True))
+    return board, stability_lcd, ScanCountI2C(ShuttleBoard.I2C_BUS)
+
+
+def check_devices(board: ShuttleBoard, stability_lcd: Pcf8574LcdModel) -> None:
+    for lcd in (board.lcd, stability_lcd):
+        assert lcd.four_bit and lcd.display_on and lcd.backlight
+        assert lcd.custom_char(2) == bytes(LiquidGauge.TOP_LEFT_ARROW)
+    for expander in board.expanders:
+        assert expander.registers[0][model.IODIR] == 0xFF and expander.registers[1][model.IODIR] == 0xFF
+        assert expander.registers[0][model.IOCON] == 0
+
+
+def plain_start() -> int:
+    board, stability_lcd, i2c = new_board()
+    start = clock.ticks_us()
+    LiquidGauge(i2c)
+    Stability(i2c, STABILITY_ADDRESS)
+    PinManager(i2c)
+    elapsed = clock.ticks_diff(clock.ticks_us(), start)
+
+    check_devices(board, stability_lcd)
+    assert i2c.scans == 1, 'The expanders did not share the bus scan'
+    return elapsed
+
+
+def test_startup():
+    plain_us = plain_start()
+
+    board, stability_lcd, i2c = new_board()
+    startup = Startup(i2c)
+    gauge = LiquidGauge(i2c, startup=startup)
+    Stability(i2c, STABILITY_ADDRESS, startup=startup)
+    PinManager(i2c, startup=startup)
+    startup.finish()
+
+    check_devices(board, stability_lcd)
+    assert i2c.scans == 1, i2c.scans
+    assert startup.total_us < plain_us / 1.5, f'{startup.total_us} us with the startup, {plain_us} us without'
+    assert 0 < startup.waited_us < startup.total_us
+
+    labels = [label for label, _, _ in startup.timeline]
+    for label in ('I2C scan', 'MCP23017 0x20', 'MCP23017 0x21', 'MCP23017 0x22', 'LCD 0x27', 'LCD 0x26'):
+        assert label in labels, label
+    # The expanders were started in the power up delay of the LCDs
+    assert labels.index('MCP23017 0x20') < len(labels) - labels[::-1].index('LCD 0x27') - 1
+
+    # Each LCD still got its power up delay before the first reset nibble
+    for label in ('LCD 0x27', 'LCD 0x26'):
+        steps = [start for step, start, _ in startup.timeline if step == label]
+        assert steps[1] - steps[0] >= 20000, (label, steps)
+
+    gauge.set_position(0)
+    top, _ = board.lcd.lines()
+    assert top[8] == chr(1), repr(top)
+
+    print(f'Plain start in {plain_us / 1000:.1f} ms')
+    print(startup.report())
+
+
+def main():
+    Log.severity = Log.Severity.NOLOG
+    try:
+        test_startup()
+    finally:
+        machine.set_bus_timing(None)
+    print('Startup test passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -33,3 +33,9 @@ def remap(x, from_min, from_max, to_min, to_max):
         result = new_max - portion
 
     return result
+
+
+def gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a